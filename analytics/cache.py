@@ -0,0 +1,120 @@
+"""Cached analytics results, keyed by parameters and the data version they were computed from.
+
+The data version is the watermark counters of the tables a result reads
+(see analytics.watermarks) plus today's date, so any write to those tables
+makes older results outdated without deleting anything. Recomputation is
+single-flight: one caller computes while the others wait for its result,
+or, within the stale window, are served the outdated result at once while
+one background thread refreshes it.
+
+Works with any Django cache backend. Waiting callers in one process queue on
+a lock; across processes a cache.add() marker does the same job, which is
+atomic on shared backends and best-effort on the file-based one.
+"""
+import hashlib
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils import timezone
+
+from . import watermarks
+
+logger = logging.getLogger(__name__)
+
+# How long a computing caller may hold the cross-process marker, and how long others wait on it
+LOCK_TIMEOUT = 60
+POLL_INTERVAL = 0.05
+
+# Striped so the lock table stays bounded however many parameter combinations appear
+_locks = [threading.Lock() for _ in range(64)]
+_refreshing = set()
+_refreshing_guard = threading.Lock()
+
+
+def _key(name, params):
+    digest = hashlib.sha1(repr(sorted(params.items())).encode()).hexdigest()
+    return f'analytics:{name}:{digest}'
+
+
+def data_version(tables):
+    """Watermark counters of tables plus today's ordinal, as a tuple that only grows"""
+    return tuple(version for version, _ in watermarks.versions(tables).values()) + (timezone.localdate().toordinal(),)
+
+
+def _covers(entry, version):
+    """True when entry was computed from data at least as new as version"""
+    return entry is not None and len(entry['version']) == len(version) and all(
+        have >= want for have, want in zip(entry['version'], version)
+    )
+
+
+def _store(key, version, compute):
+    value = compute()
+    cache.set(key, {'version': version, 'at': time.time(), 'value': value}, settings.ANALYTICS_CACHE_TIMEOUT)
+    return value
+
+
+def _compute_once(key, version, compute):
+    """compute()'s value for version, unless a concurrent caller produces it first"""
+    lock_key = f'{key}:lock'
+    with _locks[hash(key) % len(_locks)]:
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while True:
+            entry = cache.get(key)
+            if _covers(entry, version):
+                return entry['value']
+            # Another process is computing: wait for its result, or give up and compute too
+            if cache.add(lock_key, True, LOCK_TIMEOUT) or time.monotonic() > deadline:
+                break
+            time.sleep(POLL_INTERVAL)
+        try:
+            return _store(key, version, compute)
+        finally:
+            cache.delete(lock_key)
+
+
+def _refresh(key, version, compute):
+    try:
+        lock_key = f'{key}:lock'
+        # Someone is already recomputing this result; the stale copy stays in use until they finish
+        if cache.add(lock_key, True, LOCK_TIMEOUT):
+            try:
+                _store(key, version, compute)
+            finally:
+                cache.delete(lock_key)
+    except Exception:
+        logger.exception('Background refresh of %s failed', key)
+    finally:
+        with _refreshing_guard:
+            _refreshing.discard(key)
+        connections.close_all()
+
+
+def _refresh_in_background(key, version, compute):
+    with _refreshing_guard:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+    threading.Thread(target=_refresh, args=(key, version, compute), daemon=True).start()
+
+
+def cached(name, params, tables, compute):
+    """(compute()'s result for params, whether it is current), recomputed only after one of tables changes.
+
+    An outdated result younger than ANALYTICS_CACHE_STALE_SECONDS is
+    returned as is, flagged not current, while it is refreshed in the
+    background; older ones are recomputed before returning.
+    """
+    key = _key(name, params)
+    version = data_version(tables)
+    entry = cache.get(key)
+    if _covers(entry, version):
+        return entry['value'], True
+    if entry is not None and time.time() - entry['at'] <= settings.ANALYTICS_CACHE_STALE_SECONDS:
+        _refresh_in_background(key, version, compute)
+        return entry['value'], False
+    return _compute_once(key, version, compute), True
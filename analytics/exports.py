@@ -0,0 +1,109 @@
+import csv
+
+from vehicles.models import Vehicle
+from trips.models import Trip
+from maintenance.models import MaintenanceLog, FuelLog, Expense
+
+# Rows fetched per round trip; server-side cursors on PostgreSQL, fetchmany() on SQLite
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object whose write() hands the CSV line back instead of buffering it"""
+
+    def write(self, value):
+        return value
+
+
+def _vehicle_rows(queryset):
+    type_labels = dict(Vehicle.TYPE_CHOICES)
+    status_labels = dict(Vehicle.STATUS_CHOICES)
+    for vehicle in queryset.with_financials().iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            vehicle.name,
+            type_labels.get(vehicle.vehicle_type, vehicle.vehicle_type),
+            status_labels.get(vehicle.status, vehicle.status),
+            vehicle.revenue_total,
+            vehicle.costs_total,
+            round(vehicle.roi(), 2),
+        ]
+
+
+def _values_rows(fields, labels=None):
+    """Build a row generator over values_list() so no model instances are created"""
+    labels = labels or {}
+
+    def rows(queryset):
+        for row in queryset.values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            yield [labels[field].get(value, value) if field in labels else value
+                   for field, value in zip(fields, row)]
+
+    return rows
+
+
+EXPORTS = {
+    'vehicles': {
+        'model': Vehicle,
+        'date_field': None,
+        'header': ['Vehicle', 'Type', 'Status', 'Total Revenue', 'Total Costs', 'ROI %'],
+        'rows': _vehicle_rows,
+    },
+    'trips': {
+        'model': Trip,
+        'date_field': 'created_at__date',
+        'header': ['Trip ID', 'Vehicle', 'License Plate', 'Driver', 'Source', 'Destination',
+                   'Cargo (kg)', 'Revenue', 'Distance (km)', 'Status', 'Dispatched', 'Completed'],
+        'rows': _values_rows(
+            ['id', 'vehicle__name', 'vehicle__license_plate', 'driver__name', 'source', 'destination',
+             'cargo_weight', 'revenue', 'distance', 'status', 'dispatch_date', 'completion_date'],
+            {'status': dict(Trip.STATUS_CHOICES)},
+        ),
+    },
+    'fuel': {
+        'model': FuelLog,
+        'date_field': 'date',
+        'header': ['Date', 'Vehicle', 'License Plate', 'Liters', 'Fuel Cost', 'Odometer'],
+        'rows': _values_rows(
+            ['date', 'vehicle__name', 'vehicle__license_plate', 'liters', 'fuel_cost', 'odometer_reading'],
+        ),
+    },
+    'maintenance': {
+        'model': MaintenanceLog,
+        'date_field': 'date',
+        'header': ['Date', 'Vehicle', 'License Plate', 'Service Type', 'Cost', 'Status'],
+        'rows': _values_rows(
+            ['date', 'vehicle__name', 'vehicle__license_plate', 'service_type', 'cost', 'status'],
+            {'service_type': dict(MaintenanceLog.SERVICE_TYPES), 'status': dict(MaintenanceLog.STATUS_CHOICES)},
+        ),
+    },
+    'expenses': {
+        'model': Expense,
+        'date_field': 'date',
+        'header': ['Date', 'Vehicle', 'License Plate', 'Expense Type', 'Amount', 'Description'],
+        'rows': _values_rows(
+            ['date', 'vehicle__name', 'vehicle__license_plate', 'expense_type', 'amount', 'description'],
+            {'expense_type': dict(Expense.EXPENSE_TYPES)},
+        ),
+    },
+}
+
+
+def export_queryset(dataset, start_date=None, end_date=None):
+    """Queryset for an export, restricted to the date range when the dataset is dated"""
+    spec = EXPORTS[dataset]
+    queryset = spec['model'].objects.all()
+    date_field = spec['date_field']
+    if date_field and start_date:
+        queryset = queryset.filter(**{f'{date_field}__gte': start_date})
+    if date_field and end_date:
+        queryset = queryset.filter(**{f'{date_field}__lte': end_date})
+    return queryset
+
+
+def stream_csv(dataset, start_date=None, end_date=None):
+    """Yield the export one encoded CSV line at a time"""
+    spec = EXPORTS[dataset]
+    writer = csv.writer(Echo())
+    yield writer.writerow(spec['header'])
+    for row in spec['rows'](export_queryset(dataset, start_date, end_date)):
+        yield writer.writerow(row)
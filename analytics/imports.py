@@ -0,0 +1,413 @@
+"""Bulk import of vehicles, drivers, maintenance and fuel logs and expenses from CSV or NDJSON.
+
+Input is read as a stream and handled in batches: each value is checked
+with the create form's field and the model field's validators, vehicle
+references (by license plate) are resolved with one query per batch, unique
+columns are checked against the file and the table once per batch, and
+valid rows are written with one prepared INSERT per batch, each batch in its
+own transaction together with its rollup increments. Rejected rows go to an
+error report instead of stopping the import.
+
+Columns are the form's field names; a vehicle is referenced by its license
+plate. Empty values fall back to the model default where there is one.
+"""
+import csv
+import io
+import json
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from functools import partial
+from itertools import chain, islice
+
+from django import forms
+from django.db import IntegrityError, connection, models, transaction
+from django.utils import timezone
+
+from vehicles.forms import VehicleForm
+from vehicles.models import Vehicle
+from drivers.forms import DriverForm
+from drivers.models import Driver
+from maintenance.forms import MaintenanceLogForm, FuelLogForm, ExpenseForm
+from maintenance.models import MaintenanceLog, FuelLog, Expense
+from maintenance import services as maintenance_services
+from fleetflow import events
+from fleetflow.choices import invalidate_choices
+from fleetflow.geo import cell_for
+from . import rollups, status_counts, watermarks
+
+BATCH_SIZE = 5000
+# Distinct values per column whose validation result is remembered
+MEMO_SIZE = 10000
+_MISSING = object()
+ERROR_HEADER = ['line', 'field', 'error']
+
+
+def _after_maintenance(rows):
+    # What MaintenanceLog.save() does per row, once per batch
+    default_status = MaintenanceLog._meta.get_field('status').get_default()
+    statuses = [values.get('status', default_status) for values in rows]
+    maintenance_services.settle_vehicles(
+        [(values['vehicle_id'], status) for values, status in zip(rows, statuses)], cause='maintenance.import'
+    )
+    maintenance_services.record_completed(
+        [(values['vehicle_id'], values['date'], values['cost'], status) for values, status in zip(rows, statuses)]
+    )
+
+
+def _after_counted(model, rows):
+    # What the save hooks do per row: count the new statuses and announce them.
+    # Raw inserts return no ids, so these events go out without a pk
+    status_counts.inserted(model, rows)
+    entity = status_counts.entity_of(model)
+    default_status = model._meta.get_field('status').get_default()
+    events.publish([
+        events.status_change(entity, None, values.get('status', default_status), None, values.get('region'),
+                             f'{entity}.import')
+        for values in rows
+    ])
+
+
+# rollup: daily rollup field -> the imported column it sums; after_insert: run on each inserted batch
+IMPORTS = {
+    'vehicles': {'model': Vehicle, 'form': VehicleForm, 'unique': 'license_plate', 'rollup': None,
+                 'after_insert': partial(_after_counted, Vehicle)},
+    'drivers': {'model': Driver, 'form': DriverForm, 'unique': 'license_number', 'rollup': None,
+                'after_insert': partial(_after_counted, Driver)},
+    'fuel': {'model': FuelLog, 'form': FuelLogForm, 'unique': None,
+             'rollup': {'fuel_liters': 'liters', 'fuel_cost': 'fuel_cost'}},
+    'expenses': {'model': Expense, 'form': ExpenseForm, 'unique': None, 'rollup': {'expense_total': 'amount'}},
+    'maintenance': {'model': MaintenanceLog, 'form': MaintenanceLogForm, 'unique': None, 'rollup': None,
+                    'after_insert': _after_maintenance},
+}
+
+
+class ImportFormatError(ValueError):
+    """The input cannot be imported at all (unreadable, or required columns missing)"""
+
+
+def read_csv(stream):
+    """(line number, {column: value}) per CSV record of a binary stream"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    reader = csv.reader(text)
+    try:
+        header = [column.strip().lower() for column in next(reader)]
+        for row in reader:
+            if any(row):
+                yield reader.line_num, dict(zip(header, row))
+    except StopIteration:
+        return
+    except (UnicodeDecodeError, csv.Error) as exc:
+        raise ImportFormatError(f'Unreadable CSV near line {reader.line_num + 1}: {exc}')
+    finally:
+        # The wrapper would close the caller's stream when it is collected
+        if not stream.closed:
+            text.detach()
+
+
+def read_ndjson(stream):
+    """(line number, object) per line of a binary stream; a line that is not an object maps to None"""
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield number, record if isinstance(record, dict) else None
+
+
+READERS = {'csv': read_csv, 'ndjson': read_ndjson}
+
+
+def _cleaner(form_field, model_field):
+    """form_field.clean() plus the model field's validators, which a ModelForm runs in full_clean()"""
+    validators = list(form_field.validators)
+    validators += [v for v in model_field.validators if v not in validators]
+    to_python, validate = form_field.to_python, form_field.validate
+    if isinstance(form_field, forms.DecimalField):
+        def to_python(value, parse=form_field.to_python):
+            if isinstance(value, str):
+                try:
+                    return Decimal(value)
+                except InvalidOperation:
+                    pass
+            # Localized input, JSON numbers and the error message for garbage
+            return parse(value)
+
+        def validate(number, check=form_field.validate):
+            # Once parsed, only a non-finite number can fail DecimalField.validate()
+            if not (isinstance(number, Decimal) and number.is_finite()):
+                check(number)
+    elif isinstance(form_field, forms.DateField):
+        # ISO dates skip the form's strptime() over every input format
+        def to_python(value, parse=form_field.to_python):
+            if isinstance(value, str) and len(value) == 10:
+                try:
+                    return date.fromisoformat(value)
+                except ValueError:
+                    pass
+            return parse(value)
+    # Repeated values (types, statuses, dates) are checked once per import
+    memo = {}
+
+    def clean(value):
+        key = (type(value), value)
+        try:
+            result = memo[key]
+        except (KeyError, TypeError):
+            try:
+                result = to_python(value)
+                validate(result)
+                errors = []
+                # Like run_validators(), blank values are left to the required check
+                for validator in validators if result not in (None, '') else ():
+                    try:
+                        validator(result)
+                    except forms.ValidationError as exc:
+                        errors.extend(exc.error_list)
+                if errors:
+                    raise forms.ValidationError(errors)
+            except forms.ValidationError as exc:
+                result = exc
+            if len(memo) < MEMO_SIZE:
+                try:
+                    memo[key] = result
+                except TypeError:
+                    pass
+        if isinstance(result, forms.ValidationError):
+            raise result
+        return result
+    return clean
+
+
+def _plan(spec):
+    """Per column: (name, clean function or None for a vehicle reference, model default or None, required)"""
+    model = spec['model']
+    plan = []
+    for name, field in spec['form'].base_fields.items():
+        model_field = model._meta.get_field(name)
+        default = model_field.get_default() if model_field.has_default() else None
+        if isinstance(field, forms.ModelChoiceField):
+            plan.append((name, None, default, field.required))
+        else:
+            plan.append((name, _cleaner(field, model_field), default, field.required))
+    return plan
+
+
+def _required_columns(spec):
+    model = spec['model']
+    return [
+        name for name, field in spec['form'].base_fields.items()
+        if field.required and not model._meta.get_field(name).has_default()
+    ]
+
+
+class _Batch:
+    def __init__(self, spec, plan, vehicle_ids, seen):
+        self.spec = spec
+        self.plan = plan
+        self.vehicle_ids = vehicle_ids
+        self.seen = seen
+        self.rows = []
+        self.errors = []
+
+    def clean(self, records):
+        for line, record in records:
+            if record is None:
+                self.errors.append((line, '', 'Not a JSON object'))
+                continue
+            values, failed, plates = {}, False, {}
+            for name, clean, default, required in self.plan:
+                raw = record.get(name)
+                if isinstance(raw, str):
+                    raw = raw.strip()
+                if raw in (None, ''):
+                    if default is not None:
+                        continue
+                    if clean is None:
+                        if required:
+                            self.errors.append((line, name, 'This field is required.'))
+                            failed = True
+                        continue
+                if clean is None:
+                    plates[name] = str(raw)
+                    continue
+                try:
+                    values[name] = clean(raw)
+                except forms.ValidationError as exc:
+                    self.errors.append((line, name, '; '.join(exc.messages)))
+                    failed = True
+            if not failed:
+                self.rows.append((line, values, plates))
+
+    def resolve_vehicles(self):
+        """Turn license plates into vehicle ids, one query for the plates this batch has not met yet"""
+        wanted = {plate for _, _, plates in self.rows for plate in plates.values()}
+        missing = wanted - self.vehicle_ids.keys()
+        if missing:
+            self.vehicle_ids.update(Vehicle.objects.filter(license_plate__in=missing).values_list('license_plate', 'pk'))
+        resolved = []
+        for line, values, plates in self.rows:
+            unknown = [name for name, plate in plates.items() if plate not in self.vehicle_ids]
+            for name in unknown:
+                self.errors.append((line, name, f'No vehicle with license plate {plates[name]!r}.'))
+            if not unknown:
+                values.update({f'{name}_id': self.vehicle_ids[plate] for name, plate in plates.items()})
+                resolved.append((line, values))
+        self.rows = resolved
+
+    def check_unique(self):
+        """Reject values already in the table or earlier in the file, one query per batch"""
+        field = self.spec['unique']
+        if not field:
+            return
+        model = self.spec['model']
+        existing = set(model.objects.filter(**{f'{field}__in': [values[field] for _, values in self.rows]})
+                       .values_list(field, flat=True))
+        label = model._meta.verbose_name.capitalize()
+        unique = []
+        for line, values in self.rows:
+            value = values[field]
+            if value in existing or value in self.seen:
+                self.errors.append((line, field, f'{label} with this {field.replace("_", " ")} already exists.'))
+            else:
+                self.seen.add(value)
+                unique.append((line, values))
+        self.rows = unique
+
+    def rollup_totals(self):
+        """{(vehicle_id, date): {rollup field: amount}} of the rows about to be inserted"""
+        sources = self.spec['rollup']
+        totals = {}
+        for _, values in self.rows:
+            amounts = totals.setdefault((values['vehicle_id'], values['date']), dict.fromkeys(sources, 0))
+            for target, source in sources.items():
+                amounts[target] += values[source]
+        return totals
+
+
+class _Insert:
+    """One prepared INSERT of the model's columns, run over a batch with executemany().
+
+    bulk_create() would build a model instance per row and prepare every
+    value through the field again; the values here are already cleaned.
+    """
+
+    def __init__(self, model):
+        ops = connection.ops
+        self.fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+        columns = ', '.join(ops.quote_name(field.column) for field in self.fields)
+        self.sql = (f'INSERT INTO {ops.quote_name(model._meta.db_table)} ({columns}) '
+                    f'VALUES ({", ".join(["%s"] * len(self.fields))})')
+        self.adapters = [self._adapter(field, ops) for field in self.fields]
+
+    @staticmethod
+    def _adapter(field, ops):
+        if isinstance(field, models.DecimalField):
+            return lambda value: ops.adapt_decimalfield_value(value, field.max_digits, field.decimal_places)
+        if isinstance(field, models.DateTimeField):
+            return ops.adapt_datetimefield_value
+        if isinstance(field, models.DateField):
+            return ops.adapt_datefield_value
+        return None
+
+    def _fills(self):
+        """Database value of every column a row leaves out: auto timestamps, then model defaults"""
+        now = timezone.now()
+        fills = []
+        for field, adapt in zip(self.fields, self.adapters):
+            auto = getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+            value = now if auto else field.get_default()
+            fills.append(adapt(value) if adapt else value)
+        return fills
+
+    def execute(self, rows):
+        columns = list(zip([field.attname for field in self.fields], self._fills(), self.adapters))
+        params = [
+            [fill if (value := values.get(attname, _MISSING)) is _MISSING else adapt(value) if adapt else value
+             for attname, fill, adapt in columns]
+            for values in rows
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(self.sql, params)
+
+
+def import_rows(dataset, records, errors=None, batch_size=BATCH_SIZE, progress=None):
+    """Import (line number, record) pairs into dataset; returns (rows created, rows rejected).
+
+    errors, when given, is a file object that receives the CSV error report.
+    progress, when given, is called with the number of records read after each batch.
+    """
+    spec = IMPORTS[dataset]
+    model = spec['model']
+    plan = _plan(spec)
+    report = csv.writer(errors) if errors is not None else None
+    if report:
+        report.writerow(ERROR_HEADER)
+
+    records = iter(records)
+    first = next(records, None)
+    if first is None:
+        return 0, 0
+    if first[1] is not None:
+        missing = [name for name in _required_columns(spec) if name not in first[1]]
+        if missing:
+            raise ImportFormatError(f'Missing columns: {", ".join(missing)}')
+    records = chain([first], records)
+
+    insert = _Insert(model)
+    vehicle_ids, seen = {}, set()
+    created = rejected = read = 0
+    while True:
+        chunk = list(islice(records, batch_size))
+        if not chunk:
+            break
+        read += len(chunk)
+        batch = _Batch(spec, plan, vehicle_ids, seen)
+        batch.clean(chunk)
+        batch.resolve_vehicles()
+        batch.check_unique()
+        rows = [values for _, values in batch.rows]
+        if model is Vehicle:
+            # Vehicle.save() normally sets the cell
+            for values in rows:
+                values['geo_cell'] = cell_for(values.get('latitude'), values.get('longitude'))
+        try:
+            with transaction.atomic():
+                if rows:
+                    insert.execute(rows)
+                if spec['rollup'] and rows:
+                    # New source rows only add to their days, so the rollups are incremented rather than recomputed
+                    rollups.add(batch.rollup_totals())
+                if spec.get('after_insert') and rows:
+                    spec['after_insert'](rows)
+        except IntegrityError as exc:
+            # A concurrent writer took a unique value after the check; the whole batch rolled back
+            batch.errors.extend((line, '', f'Batch rejected by the database: {exc}') for line, _ in batch.rows)
+            rows = []
+        created += len(rows)
+
+        rejected += len({line for line, _, _ in batch.errors})
+        if report:
+            report.writerows(sorted(batch.errors))
+        if progress:
+            progress(read)
+
+    if created:
+        # The inserts sent no signals: do what the per-row signals would have
+        watermarks.bump(model)
+        if model in (Vehicle, Driver):
+            invalidate_choices(model)
+    return created, rejected
+
+
+def import_file(dataset, stream, fmt='csv', errors=None, batch_size=BATCH_SIZE, progress=None):
+    """import_rows() over a binary stream in csv or ndjson format"""
+    if fmt not in READERS:
+        raise ImportFormatError(f'Unknown format {fmt!r}')
+    return import_rows(dataset, READERS[fmt](stream), errors, batch_size, progress)
+
+
+def guess_format(filename):
+    return 'ndjson' if filename.lower().endswith(('.ndjson', '.jsonl', '.json')) else 'csv'
@@ -0,0 +1,176 @@
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from vehicles.models import Vehicle
+from drivers.models import Driver
+from trips.models import Trip
+from maintenance.models import MaintenanceLog, FuelLog, Expense
+
+COUNTED_MODELS = [Vehicle, Driver, Trip, MaintenanceLog, FuelLog, Expense]
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Request every view through the test client and report latency, query count and peak memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=10, help='Timed requests per view')
+        parser.add_argument('--warmup', type=int, default=1, help='Untimed requests per view before timing')
+        parser.add_argument('--username', help='User to log in as. Defaults to the first superuser.')
+        parser.add_argument('--only', action='append', help='Only benchmark views whose name contains this')
+        parser.add_argument('--output', help='Write machine-readable results to this JSON file')
+        parser.add_argument('--compare', help='Earlier --output file to compare p95 latency and query counts with')
+        parser.add_argument('--max-regression', type=float, default=1.25,
+                            help='Fail when p95 latency grows by more than this factor against --compare')
+
+    def _targets(self):
+        """(name, url) for every GET view, using the first row of each table for detail pages"""
+        targets = [
+            ('vehicle_list', reverse('vehicle_list')),
+            ('vehicle_create', reverse('vehicle_create')),
+            ('driver_list', reverse('driver_list')),
+            ('driver_create', reverse('driver_create')),
+            ('trip_list', reverse('trip_list')),
+            ('trip_create', reverse('trip_create')),
+            ('maintenance_list', reverse('maintenance_list')),
+            ('maintenance_create', reverse('maintenance_create')),
+            ('fuel_list', reverse('fuel_list')),
+            ('fuel_create', reverse('fuel_create')),
+            ('expense_list', reverse('expense_list')),
+            ('expense_create', reverse('expense_create')),
+            ('analytics_dashboard', reverse('analytics_dashboard')),
+            ('chart_data:vehicle_status', reverse('chart_data') + '?type=vehicle_status'),
+            ('chart_data:monthly_revenue', reverse('chart_data') + '?type=monthly_revenue'),
+            ('timeseries', reverse('timeseries') + '?bucket=month&metrics=revenue,distance,fuel,cost'),
+            ('export_csv', reverse('export_csv')),
+            ('export_csv:trips', reverse('export_csv') + '?dataset=trips'),
+            ('export_pdf', reverse('export_pdf')),
+        ]
+        details = [
+            ('vehicle_detail', Vehicle), ('driver_detail', Driver), ('trip_detail', Trip),
+        ]
+        for name, model in details:
+            pk = model.objects.order_by().values_list('pk', flat=True).first()
+            if pk is not None:
+                targets.append((name, reverse(name, args=[pk])))
+        return targets
+
+    def _request(self, client, url):
+        response = client.get(url)
+        size = sum(len(chunk) for chunk in response.streaming_content) if response.streaming else len(response.content)
+        return response.status_code, size
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        if options['username']:
+            user = User.objects.filter(username=options['username']).first()
+        else:
+            user = User.objects.filter(is_superuser=True).order_by('pk').first()
+        if user is None:
+            raise CommandError('No user to log in as; create a superuser or pass --username')
+
+        hosts = [h for h in settings.ALLOWED_HOSTS if h and h != '*' and not h.startswith('.')]
+        client = Client(HTTP_HOST=hosts[0] if hosts else 'localhost')
+        client.force_login(user)
+
+        targets = self._targets()
+        if options['only']:
+            targets = [t for t in targets if any(part in t[0] for part in options['only'])]
+
+        results = []
+        for name, url in targets:
+            for _ in range(options['warmup']):
+                self._request(client, url)
+
+            timings = []
+            for _ in range(options['iterations']):
+                started = time.perf_counter()
+                status, size = self._request(client, url)
+                timings.append((time.perf_counter() - started) * 1000)
+
+            # Query count and peak memory come from a separate run so tracing does not skew latency
+            tracemalloc.start()
+            with CaptureQueriesContext(connection) as queries:
+                self._request(client, url)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            result = {
+                'view': name,
+                'url': url,
+                'status': status,
+                'bytes': size,
+                'p50_ms': round(_percentile(timings, 0.50), 2),
+                'p95_ms': round(_percentile(timings, 0.95), 2),
+                'queries': len(queries),
+                'peak_memory_kb': round(peak / 1024, 1),
+            }
+            results.append(result)
+            self.stdout.write(
+                f"{name:<28} {status} p50 {result['p50_ms']:>9.2f}ms  p95 {result['p95_ms']:>9.2f}ms  "
+                f"{result['queries']:>5} queries  {result['peak_memory_kb']:>10.1f} KB"
+            )
+
+        report = {
+            'revision': _git_revision(),
+            'timestamp': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'row_counts': {model._meta.db_table: model.objects.count() for model in COUNTED_MODELS},
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(report, handle, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if options['compare']:
+            self._compare(report, options['compare'], options['max_regression'])
+
+    def _compare(self, report, path, max_regression):
+        with open(path) as handle:
+            baseline = {result['view']: result for result in json.load(handle)['results']}
+
+        regressions = []
+        self.stdout.write(f'\nCompared with {path}:')
+        for result in report['results']:
+            before = baseline.get(result['view'])
+            if not before:
+                continue
+            ratio = result['p95_ms'] / before['p95_ms'] if before['p95_ms'] else 1.0
+            query_delta = result['queries'] - before['queries']
+            line = f"{result['view']:<28} p95 x{ratio:.2f}  queries {query_delta:+d}"
+            if ratio > max_regression or query_delta > 0:
+                regressions.append(result['view'])
+                line = self.style.ERROR(line)
+            self.stdout.write(line)
+
+        if regressions:
+            raise CommandError(f"Regressions in: {', '.join(regressions)}")
@@ -0,0 +1,38 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.queryplans import check_plans
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN every analytics and list-view query and fail if an unexpected full table scan appears'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', help='User the views run as. Defaults to the first superuser.')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print the plan of every query')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        if options['username']:
+            user = User.objects.filter(username=options['username']).first()
+        else:
+            user = User.objects.filter(is_superuser=True).order_by('pk').first()
+        if user is None:
+            raise CommandError('No user to run the views as; create a superuser or pass --username')
+
+        results = check_plans(user)
+        failures = [result for result in results if result['violations']]
+
+        for result in results:
+            if not (result['violations'] or options['verbose_plans']):
+                continue
+            label = result['view'] + (f"?{result['query_string']}" if result['query_string'] else '')
+            self.stdout.write(f"\n{label}\n  {result['sql']}")
+            for line in result['plan']:
+                self.stdout.write(f'    {line}')
+            if result['violations']:
+                self.stdout.write(self.style.ERROR(f"  full scan of: {', '.join(result['violations'])}"))
+
+        if failures:
+            raise CommandError(f'{len(failures)} of {len(results)} queries fall back to a full table scan')
+        self.stdout.write(self.style.SUCCESS(f'Checked {len(results)} query plans, no unexpected full table scans'))
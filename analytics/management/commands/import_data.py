@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.imports import BATCH_SIZE, IMPORTS, READERS, ImportFormatError, guess_format, import_file
+
+
+class Command(BaseCommand):
+    help = 'Bulk import vehicles, drivers, maintenance or fuel logs, or expenses from a CSV or NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=IMPORTS)
+        parser.add_argument('path', help='File to import; columns are the create form field names')
+        parser.add_argument('--format', choices=READERS, help='Defaults to ndjson for .ndjson/.jsonl files, else csv')
+        parser.add_argument('--errors', help='Write rejected rows with their errors to this CSV file')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Rows validated and inserted per transaction')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        fmt = options['format'] or guess_format(options['path'])
+
+        started = time.monotonic()
+        errors = open(options['errors'], 'w', newline='', encoding='utf-8') if options['errors'] else None
+        try:
+            with open(options['path'], 'rb') as stream:
+                created, rejected = import_file(options['dataset'], stream, fmt, errors, options['batch_size'])
+        except (OSError, ImportFormatError) as exc:
+            raise CommandError(str(exc))
+        finally:
+            if errors:
+                errors.close()
+
+        elapsed = time.monotonic() - started
+        rate = (created + rejected) / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {created} {options["dataset"]}, rejected {rejected} rows in {elapsed:.1f}s ({rate:.0f} rows/s)'
+        ))
+        if rejected and not options['errors']:
+            self.stdout.write('Re-run with --errors report.csv to see why rows were rejected')
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from trips.models import Trip
+from maintenance.models import MaintenanceLog, FuelLog, Expense
+from analytics import rollups
+from jobs.queue import enqueue
+
+
+class Command(BaseCommand):
+    help = 'Backfill or repair the per-vehicle daily analytics rollups from the raw logs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='First day to rebuild (YYYY-MM-DD). Defaults to the oldest record.')
+        parser.add_argument('--until', help='Last day to rebuild (YYYY-MM-DD). Defaults to today.')
+        parser.add_argument('--vehicle', type=int, action='append', dest='vehicles',
+                            help='Only rebuild this vehicle id (repeatable)')
+        parser.add_argument('--window-days', type=int, default=31,
+                            help='Days aggregated per pass, bounds memory on large histories')
+        parser.add_argument('--enqueue', action='store_true',
+                            help='Queue one background job per window instead of rebuilding here, so run_jobs workers share the work')
+
+    def _parse(self, value, name):
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is None:
+            raise CommandError(f'--{name} must be a date in YYYY-MM-DD format')
+        return day
+
+    def _oldest_day(self):
+        candidates = [
+            Trip.objects.aggregate(first=Min('completion_date'))['first'],
+            FuelLog.objects.aggregate(first=Min('date'))['first'],
+            MaintenanceLog.objects.aggregate(first=Min('date'))['first'],
+            Expense.objects.aggregate(first=Min('date'))['first'],
+        ]
+        days = [c.date() if isinstance(c, datetime) else c for c in candidates if c]
+        return min(days) if days else None
+
+    def handle(self, *args, **options):
+        until = self._parse(options['until'], 'until') if options['until'] else timezone.now().date()
+        since = self._parse(options['since'], 'since') if options['since'] else self._oldest_day()
+        if since is None:
+            self.stdout.write('Nothing to roll up.')
+            return
+        if since > until:
+            raise CommandError('--since must not be after --until')
+        if options['window_days'] < 1:
+            raise CommandError('--window-days must be at least 1')
+
+        if options['enqueue']:
+            self._enqueue(since, until, options['vehicles'], options['window_days'])
+            return
+
+        written = rollups.rebuild(since, until, vehicle_ids=options['vehicles'],
+                                  window_days=options['window_days'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} daily rollup rows from {since} to {until}'))
+
+    def _enqueue(self, since, until, vehicles, window_days):
+        jobs = []
+        window_start = since
+        while window_start <= until:
+            window_end = min(window_start + timedelta(days=window_days - 1), until)
+            jobs.append(enqueue('analytics.rebuild_rollups', {
+                'since': window_start.isoformat(), 'until': window_end.isoformat(),
+                'vehicles': vehicles, 'window_days': window_days,
+            }))
+            window_start = window_end + timedelta(days=1)
+        self.stdout.write(self.style.SUCCESS(
+            f'Queued {len(jobs)} rollup jobs from {since} to {until}; run_jobs will process them'
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from analytics import status_counts
+
+
+class Command(BaseCommand):
+    help = 'Recount the vehicle and driver status counters from the vehicles and drivers tables'
+
+    def handle(self, *args, **options):
+        corrected = status_counts.reconcile()
+        if corrected:
+            self.stdout.write(self.style.WARNING(f'Corrected {corrected} status counters'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Status counters are correct'))
@@ -0,0 +1,300 @@
+import random
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from vehicles.models import Vehicle
+from drivers.models import Driver
+from trips.models import Trip
+from trips.assignment import LICENSE_RANK
+from maintenance.models import MaintenanceLog, FuelLog, Expense
+from analytics import rollups, status_counts, watermarks
+from fleetflow.geo import cell_for
+
+# Row counts per preset; every other table scales off the trip count
+SCALES = {
+    'small': {'vehicles': 50, 'drivers': 60, 'trips': 1000},
+    'medium': {'vehicles': 2000, 'drivers': 2400, 'trips': 100000},
+    'large': {'vehicles': 20000, 'drivers': 24000, 'trips': 10000000},
+}
+
+REGIONS = ['North', 'South', 'East', 'West', 'Central']
+CITIES = ['Mumbai', 'Delhi', 'Bengaluru', 'Chennai', 'Kolkata', 'Hyderabad', 'Pune', 'Ahmedabad', 'Jaipur', 'Surat']
+
+# vehicle type: (weight, capacity range kg, acquisition cost range, km per liter)
+VEHICLE_PROFILES = {
+    'TRUCK': (40, (5000, 25000), (1500000, 4500000), 4.5),
+    'VAN': (45, (800, 3000), (600000, 1500000), 9.0),
+    'BIKE': (15, (20, 150), (60000, 150000), 40.0),
+}
+LICENSE_FOR_TYPE = {'TRUCK': 'C', 'VAN': 'B', 'BIKE': 'A'}
+
+# ON_TRIP and IN_SHOP are plans: each becomes a dispatched trip or an open maintenance log
+VEHICLE_STATUS_WEIGHTS = [('AVAILABLE', 70), ('ON_TRIP', 20), ('IN_SHOP', 7), ('RETIRED', 3)]
+# Drivers go ON_TRIP only by being paired with a vehicle on a dispatched trip
+DRIVER_STATUS_WEIGHTS = [('ON_DUTY', 70), ('OFF_DUTY', 25), ('SUSPENDED', 5)]
+# A vehicle is on one trip at a time, so dispatched trips are one per ON_TRIP vehicle and the rest spread over these
+TRIP_STATUS_WEIGHTS = [('COMPLETED', 80), ('CANCELLED', 5), ('DRAFT', 10)]
+OPEN_MAINTENANCE_WEIGHTS = [('PENDING', 5), ('IN_PROGRESS', 3)]
+
+
+def _money(value):
+    return Decimal(value).quantize(Decimal('0.01'))
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Seed a reproducible synthetic fleet with bulk_create for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=SCALES, default='small',
+                            help='Preset size: small (1k trips), medium (100k), large (10M)')
+        parser.add_argument('--vehicles', type=int, help='Override the preset vehicle count')
+        parser.add_argument('--drivers', type=int, help='Override the preset driver count')
+        parser.add_argument('--trips', type=int, help='Override the preset trip count')
+        parser.add_argument('--days', type=int, default=730, help='Days of history to spread records over')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed, same seed gives the same fleet')
+        parser.add_argument('--prefix', default='SYN', help='Prefix for generated license plates and numbers')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--skip-rollups', action='store_true', help='Do not rebuild analytics rollups afterwards')
+
+    def handle(self, *args, **options):
+        counts = dict(SCALES[options['scale']])
+        for name in counts:
+            if options[name] is not None:
+                counts[name] = options[name]
+        if min(counts.values()) <= 0:
+            raise CommandError('Vehicle, driver and trip counts must be positive')
+
+        prefix = options['prefix']
+        if Vehicle.objects.filter(license_plate__startswith=f'{prefix}-').exists():
+            raise CommandError(f'Synthetic data with prefix {prefix!r} already exists; use another --prefix')
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.days = options['days']
+
+        trips = counts['trips']
+        # Statuses are planned before any row exists, so ON_TRIP and IN_SHOP match the trips and logs below
+        types = list(VEHICLE_PROFILES)
+        vehicle_types = self.rng.choices(types, [VEHICLE_PROFILES[t][0] for t in types], k=counts['vehicles'])
+        vehicle_plan = self._plan(counts['vehicles'], VEHICLE_STATUS_WEIGHTS)
+        driver_plan = self._plan(counts['drivers'], DRIVER_STATUS_WEIGHTS)
+        driver_licenses = self._driver_licenses(counts['drivers'])
+        dispatched = self._pair_dispatched(vehicle_types, vehicle_plan, driver_plan, driver_licenses, trips)
+        vehicles = self._seed_vehicles(prefix, vehicle_types, vehicle_plan)
+        drivers = self._seed_drivers(prefix, driver_plan, driver_licenses)
+        # bulk_create skips the signals that keep the status counters
+        status_counts.reconcile()
+        self._bulk(Trip, self._trips(vehicles, drivers, dispatched, trips), 'trips')
+        # Roughly one fill-up per three trips and one service per forty
+        self._bulk(FuelLog, self._fuel_logs(vehicles, max(1, trips // 3)), 'fuel logs')
+        in_shop = [vehicles[i][0] for i, status in enumerate(vehicle_plan) if status == 'IN_SHOP']
+        self._bulk(MaintenanceLog, self._maintenance_logs(vehicles, in_shop, max(1, trips // 40)), 'maintenance logs')
+        self._bulk(Expense, self._expenses(vehicles, max(1, trips // 10)), 'expenses')
+
+        if not options['skip_rollups']:
+            today = self.now.date()
+            written = rollups.rebuild(today - timedelta(days=self.days), today)
+            self.stdout.write(f'Rebuilt {written} rollup rows')
+
+        self.stdout.write(self.style.SUCCESS('Synthetic fleet ready'))
+
+    def _bulk(self, model, rows, label):
+        created = 0
+        for batch in _batched(rows, self.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(batch, batch_size=self.batch_size)
+            created += len(batch)
+        watermarks.bump(model)
+        self.stdout.write(f'Created {created} {label}')
+
+    def _random_day(self):
+        return self.now - timedelta(days=self.rng.random() * self.days)
+
+    def _plan(self, count, weights):
+        return self.rng.choices([value for value, _ in weights], [weight for _, weight in weights], k=count)
+
+    def _driver_licenses(self, count):
+        """(category, expiry) per driver"""
+        categories = list(LICENSE_FOR_TYPE.values())
+        today = self.now.date()
+        # About 5% of licenses already expired
+        return [
+            (self.rng.choices(categories, [45, 40, 15])[0], today + timedelta(days=self.rng.randint(-60, 1800)))
+            for _ in range(count)
+        ]
+
+    def _pair_dispatched(self, vehicle_types, vehicle_statuses, driver_statuses, driver_licenses, limit):
+        """(vehicle, driver) index pairs of the dispatched trips, at most limit.
+
+        Each vehicle planned ON_TRIP takes an on-duty driver with a valid
+        license for it, the lowest sufficient category first, and that driver
+        goes ON_TRIP; vehicles left without one become AVAILABLE.
+        """
+        today = self.now.date()
+        free = defaultdict(list)
+        for j, (status, (category, expiry)) in enumerate(zip(driver_statuses, driver_licenses)):
+            if status == 'ON_DUTY' and expiry >= today:
+                free[category].append(j)
+        by_rank = sorted(free, key=LICENSE_RANK.get)
+        pairs = []
+        for i, (vehicle_type, status) in enumerate(zip(vehicle_types, vehicle_statuses)):
+            if status != 'ON_TRIP':
+                continue
+            needed = LICENSE_RANK[LICENSE_FOR_TYPE[vehicle_type]]
+            pool = next((free[c] for c in by_rank if LICENSE_RANK[c] >= needed and free[c]), None)
+            if pool is None or len(pairs) >= limit:
+                vehicle_statuses[i] = 'AVAILABLE'
+                continue
+            j = pool.pop(self.rng.randrange(len(pool)))
+            driver_statuses[j] = 'ON_TRIP'
+            pairs.append((i, j))
+        return pairs
+
+    def _seed_vehicles(self, prefix, vehicle_types, statuses):
+        def rows():
+            for i, (vehicle_type, status) in enumerate(zip(vehicle_types, statuses)):
+                _, capacity, cost, _ = VEHICLE_PROFILES[vehicle_type]
+                vehicle = Vehicle(
+                    name=f'{vehicle_type.title()} {i + 1}',
+                    license_plate=f'{prefix}-{i:08d}',
+                    vehicle_type=vehicle_type,
+                    max_capacity=_money(self.rng.uniform(*capacity)),
+                    acquisition_cost=_money(self.rng.uniform(*cost)),
+                    odometer=_money(self.rng.uniform(0, 200000)),
+                    status=status,
+                    region=self.rng.choice(REGIONS),
+                    latitude=Decimal(f'{self.rng.uniform(8.0, 32.0):.6f}'),
+                    longitude=Decimal(f'{self.rng.uniform(68.0, 90.0):.6f}'),
+                )
+                # bulk_create skips Vehicle.save(), which normally sets the cell
+                vehicle.geo_cell = cell_for(vehicle.latitude, vehicle.longitude)
+                yield vehicle
+
+        self._bulk(Vehicle, rows(), 'vehicles')
+        # Plates number the vehicles, so the list lines up with the plan
+        return list(
+            Vehicle.objects.filter(license_plate__startswith=f'{prefix}-')
+            .order_by('license_plate').values_list('pk', 'vehicle_type', 'max_capacity')
+        )
+
+    def _seed_drivers(self, prefix, statuses, licenses):
+        def rows():
+            for i, (status, (category, expiry)) in enumerate(zip(statuses, licenses)):
+                yield Driver(
+                    name=f'Driver {i + 1}',
+                    license_number=f'{prefix}-DL-{i:08d}',
+                    license_category=category,
+                    license_expiry=expiry,
+                    phone=f'9{self.rng.randint(0, 999999999):09d}',
+                    status=status,
+                )
+
+        self._bulk(Driver, rows(), 'drivers')
+        return list(
+            Driver.objects.filter(license_number__startswith=f'{prefix}-DL-')
+            .order_by('license_number').values_list('pk', flat=True)
+        )
+
+    def _trips(self, vehicles, drivers, dispatched, count):
+        for i, j in dispatched:
+            # Out on the road now: dispatched within the last two days
+            yield self._trip(vehicles[i], drivers[j], 'DISPATCHED', self.now - timedelta(hours=self.rng.uniform(1, 48)))
+        statuses = [s for s, _ in TRIP_STATUS_WEIGHTS]
+        weights = [w for _, w in TRIP_STATUS_WEIGHTS]
+        for _ in range(count - len(dispatched)):
+            status = self.rng.choices(statuses, weights)[0]
+            yield self._trip(
+                self.rng.choice(vehicles), self.rng.choice(drivers), status,
+                self._random_day() if status != 'DRAFT' else None,
+            )
+
+    def _trip(self, vehicle, driver_id, status, dispatched):
+        _, _, capacity = vehicle
+        # Log-normal trip lengths: mostly short hauls with a long tail
+        distance = min(self.rng.lognormvariate(4.0, 0.9), 3000)
+        source, destination = self.rng.sample(CITIES, 2)
+        return Trip(
+            vehicle_id=vehicle[0],
+            driver_id=driver_id,
+            cargo_weight=_money(float(capacity) * self.rng.uniform(0.2, 1.0)),
+            source=source,
+            destination=destination,
+            pickup_latitude=Decimal(f'{self.rng.uniform(8.0, 32.0):.6f}'),
+            pickup_longitude=Decimal(f'{self.rng.uniform(68.0, 90.0):.6f}'),
+            revenue=_money(distance * self.rng.uniform(25, 60)),
+            distance=_money(distance) if status == 'COMPLETED' else 0,
+            status=status,
+            dispatch_date=dispatched,
+            completion_date=(
+                dispatched + timedelta(hours=distance / self.rng.uniform(30, 60))
+                if status == 'COMPLETED' else None
+            ),
+        )
+
+    def _fuel_logs(self, vehicles, count):
+        # Fill-ups per vehicle walk forward in time with a rising odometer
+        per_vehicle = max(1, count // len(vehicles))
+        start = self.now.date() - timedelta(days=self.days)
+        for vehicle_id, vehicle_type, _ in vehicles:
+            km_per_liter = VEHICLE_PROFILES[vehicle_type][3]
+            odometer = self.rng.uniform(1000, 50000)
+            step = self.days / per_vehicle
+            for n in range(per_vehicle):
+                km = self.rng.lognormvariate(5.5, 0.4)
+                odometer += km
+                liters = km / (km_per_liter * self.rng.uniform(0.85, 1.15))
+                yield FuelLog(
+                    vehicle_id=vehicle_id,
+                    liters=_money(liters),
+                    fuel_cost=_money(liters * self.rng.uniform(95, 110)),
+                    date=start + timedelta(days=int(n * step)),
+                    odometer_reading=_money(odometer),
+                )
+
+    def _maintenance_logs(self, vehicles, in_shop, count):
+        service_types = [code for code, _ in MaintenanceLog.SERVICE_TYPES]
+        statuses = [s for s, _ in OPEN_MAINTENANCE_WEIGHTS]
+        weights = [w for _, w in OPEN_MAINTENANCE_WEIGHTS]
+        # The open service that keeps each IN_SHOP vehicle in the shop, booked in the last fortnight
+        for vehicle_id in in_shop:
+            yield self._maintenance_log(
+                vehicle_id, service_types, self.now - timedelta(days=self.rng.uniform(0, 14)),
+                self.rng.choices(statuses, weights)[0],
+            )
+        for _ in range(max(0, count - len(in_shop))):
+            yield self._maintenance_log(self.rng.choice(vehicles)[0], service_types, self._random_day(), 'COMPLETED')
+
+    def _maintenance_log(self, vehicle_id, service_types, day, status):
+        return MaintenanceLog(
+            vehicle_id=vehicle_id,
+            service_type=self.rng.choice(service_types),
+            cost=_money(self.rng.lognormvariate(8.5, 0.8)),
+            date=day.date(),
+            status=status,
+        )
+
+    def _expenses(self, vehicles, count):
+        expense_types = ['INSURANCE', 'REGISTRATION', 'PARKING', 'TOLLS', 'OTHER']
+        for _ in range(count):
+            yield Expense(
+                vehicle_id=self.rng.choice(vehicles)[0],
+                expense_type=self.rng.choices(expense_types, [5, 2, 30, 55, 8])[0],
+                amount=_money(self.rng.lognormvariate(6.0, 1.0)),
+                date=self._random_day().date(),
+            )
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('vehicles', '0002_vehicle_last_location_update_vehicle_latitude_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VehicleDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('distance', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('fuel_liters', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('fuel_cost', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('maintenance_cost', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('expense_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='vehicles.vehicle')),
+            ],
+            options={
+                'db_table': 'vehicle_daily_stats',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['date'], name='vehicle_dai_date_c8cb66_idx')],
+                'unique_together': {('vehicle', 'date')},
+            },
+        ),
+    ]
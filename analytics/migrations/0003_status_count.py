@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:07
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_statuses(apps, schema_editor):
+    StatusCount = apps.get_model('analytics', 'StatusCount')
+    Vehicle = apps.get_model('vehicles', 'Vehicle')
+    Driver = apps.get_model('drivers', 'Driver')
+    rows = [
+        StatusCount(entity='vehicle', status=status, region=region, vehicle_type=vehicle_type, count=total)
+        for status, region, vehicle_type, total in Vehicle.objects.order_by()
+        .values_list('status', 'region', 'vehicle_type').annotate(total=Count('pk'))
+    ]
+    rows += [
+        StatusCount(entity='driver', status=status, count=total)
+        for status, total in Driver.objects.order_by().values_list('status').annotate(total=Count('pk'))
+    ]
+    StatusCount.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_watermark'),
+        ('drivers', '0002_driver_drivers_status_created_idx_and_more'),
+        ('vehicles', '0006_vehicletrackchunk'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatusCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(max_length=10)),
+                ('status', models.CharField(max_length=15)),
+                ('region', models.CharField(blank=True, max_length=50)),
+                ('vehicle_type', models.CharField(blank=True, max_length=10)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'status_counts',
+                'unique_together': {('entity', 'status', 'region', 'vehicle_type')},
+            },
+        ),
+        migrations.RunPython(count_statuses, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,57 @@
 from django.db import models
+from vehicles.models import Vehicle
 
-# Analytics uses aggregated data from other models
+# Analytics uses aggregated data from other models. VehicleDailyStat holds
+# per-vehicle per-day rollups of those models, kept current by analytics.signals.
+
+class VehicleDailyStat(models.Model):
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    # Completed trips, bucketed by completion date
+    distance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    fuel_liters = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    fuel_cost = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # Completed maintenance only, matching the dashboard's cost figures
+    maintenance_cost = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    expense_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.vehicle_id} - {self.date}"
+    
+    class Meta:
+        db_table = 'vehicle_daily_stats'
+        ordering = ['-date']
+        unique_together = ['vehicle', 'date']
+        indexes = [models.Index(fields=['date'])]
+
+
+class Watermark(models.Model):
+    """Change counter for one table (or a narrower scope of one), see analytics.watermarks"""
+    table = models.CharField(max_length=100, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    changed_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"{self.table} v{self.version}"
+    
+    class Meta:
+        db_table = 'watermarks'
+
+
+class StatusCount(models.Model):
+    """Vehicles or drivers currently in one status, see analytics.status_counts"""
+    entity = models.CharField(max_length=10)
+    status = models.CharField(max_length=15)
+    # Blank for drivers, which are counted by status only
+    region = models.CharField(max_length=50, blank=True)
+    vehicle_type = models.CharField(max_length=10, blank=True)
+    count = models.BigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.entity} {self.status} {self.region} {self.vehicle_type}: {self.count}"
+    
+    class Meta:
+        db_table = 'status_counts'
+        unique_together = ['entity', 'status', 'region', 'vehicle_type']
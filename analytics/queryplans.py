@@ -0,0 +1,108 @@
+import re
+
+from django.db import connection
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+# (url name, query string, tables that may legitimately be read in full)
+PLAN_TARGETS = [
+    # Ranking the roster has to look at every driver once
+    ('analytics_dashboard', '', {'drivers'}),
+    ('chart_data', 'type=vehicle_status', set()),
+    ('chart_data', 'type=vehicle_status&region=North&vehicle_type=TRUCK', set()),
+    ('chart_data', 'type=monthly_revenue', set()),
+    ('timeseries', 'bucket=week&metrics=revenue,distance,fuel,cost', set()),
+    # The fleet scan reads every fill-up by definition
+    ('fuel_efficiency', '', {'fuel_logs'}),
+    ('fuel_efficiency', 'vehicle=1', set()),
+    # Whole-fleet exports read every vehicle by definition
+    ('export_csv', '', {'vehicles'}),
+    ('export_csv', 'dataset=trips&start=2000-01-01', set()),
+    ('export_csv', 'dataset=fuel&start=2000-01-01', set()),
+    ('export_csv', 'dataset=maintenance&start=2000-01-01', set()),
+    ('export_csv', 'dataset=expenses&start=2000-01-01', set()),
+    ('vehicle_list', '', set()),
+    ('vehicle_list', 'status=AVAILABLE', set()),
+    ('vehicle_nearby', 'lat=20.5&lon=78.9&k=10&status=AVAILABLE&type=TRUCK', set()),
+    ('vehicle_nearby', 'lat=20.5&lon=78.9&radius_km=25', set()),
+    ('vehicle_nearby', 'lat=20.5&lon=78.9&k=10&status=RETIRED', set()),
+    ('vehicle_nearby', 'lat=20.5&lon=78.9&radius_km=25&type=BIKE', set()),
+    ('driver_list', '', set()),
+    ('driver_list', 'status=ON_DUTY', set()),
+    ('trip_list', '', set()),
+    ('trip_list', 'status=DISPATCHED', set()),
+    ('maintenance_list', '', set()),
+    ('maintenance_list', 'status=PENDING', set()),
+    ('fuel_list', '', set()),
+    ('expense_list', '', set()),
+    ('expense_list', 'type=TOLLS', set()),
+]
+
+# SQLite "SCAN <table>" without an index, PostgreSQL "Seq Scan on <table>"
+FULL_SCAN_PATTERNS = [
+    re.compile(r'\bSCAN (?:TABLE )?"?(\w+)"?(?: AS \w+)?\s*$'),
+    re.compile(r'Seq Scan on "?(\w+)"?'),
+]
+
+
+def explain(sql, params):
+    """Plan lines for one captured statement"""
+    if connection.vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    else:
+        prefix = 'EXPLAIN '
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql, params)
+        return [str(row[-1]) for row in cursor.fetchall()]
+
+
+def full_scans(plan):
+    tables = set()
+    for line in plan:
+        for pattern in FULL_SCAN_PATTERNS:
+            match = pattern.search(line)
+            if match:
+                tables.add(match.group(1))
+    return tables
+
+
+def _captured_statements(user, name, query_string):
+    """Run a view in-process and return the (sql, params) of every query it sent"""
+    path = reverse(name)
+    request = RequestFactory().get(f'{path}?{query_string}')
+    request.user = user
+    match = resolve(path)
+
+    statements = []
+
+    def record(execute, sql, params, many, context):
+        statements.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(record):
+        response = match.func(request, *match.args, **match.kwargs)
+        if getattr(response, 'streaming', False):
+            for _ in response.streaming_content:
+                pass
+    return statements
+
+
+def check_plans(user, targets=PLAN_TARGETS):
+    """Explain every query behind each target view.
+
+    Returns one dict per statement with its plan and any unexpected full scans.
+    """
+    results = []
+    for name, query_string, allowed in targets:
+        for sql, params in _captured_statements(user, name, query_string):
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            plan = explain(sql, params)
+            results.append({
+                'view': name,
+                'query_string': query_string,
+                'sql': sql,
+                'plan': plan,
+                'violations': sorted(full_scans(plan) - set(allowed)),
+            })
+    return results
@@ -0,0 +1,167 @@
+"""PDF fleet report, drawn one page-sized table at a time and kept on disk per data version.
+
+Rows come from the vehicles CSV export, so both formats show the same
+figures. Each page gets its own small Table drawn straight onto the canvas,
+so no flowable list for the whole fleet is ever built, and the finished file
+is renamed into place so readers never see a half-written report.
+"""
+import hashlib
+import os
+import tempfile
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Paragraph, Table, TableStyle
+
+from vehicles.models import Vehicle
+from trips.models import Trip
+from maintenance.models import MaintenanceLog, FuelLog, Expense
+from .cache import data_version
+from .exports import EXPORTS
+
+REPORT_TABLES = (Vehicle, Trip, MaintenanceLog, FuelLog, Expense)
+MARGIN = 72
+COLUMN_WIDTHS = [128, 56, 64, 80, 80, 60]
+
+TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+])
+
+
+def report_dir():
+    path = Path(settings.REPORTS_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def report_name():
+    """File name of the report for the current data"""
+    version = hashlib.sha1(repr(data_version(REPORT_TABLES)).encode()).hexdigest()[:16]
+    return f'fleet-report-{version}.pdf'
+
+
+def report_path(name):
+    """Path of a finished report, or None if it does not exist (or the name is not one of ours)"""
+    if not name.startswith('fleet-report-') or os.sep in name or '/' in name:
+        return None
+    path = report_dir() / name
+    return path if path.is_file() else None
+
+
+def open_report(name):
+    """A finished report opened for reading, or None if it does not exist (or the name is not one of ours).
+
+    An open report stays readable after a newer one prunes it.
+    """
+    path = report_path(name)
+    if path is None:
+        return None
+    try:
+        return open(path, 'rb')
+    except FileNotFoundError:
+        # Pruned since the check
+        return None
+
+
+def _cells(row):
+    name, vehicle_type, status, revenue, costs, roi = row
+    return [name, vehicle_type, status, f"₹{revenue:.2f}", f"₹{costs:.2f}", f"{roi:.2f}%"]
+
+
+def _height(rows):
+    table = Table(rows, colWidths=COLUMN_WIDTHS)
+    table.setStyle(TABLE_STYLE)
+    return table.wrap(0, 0)[1]
+
+
+def _rows_per_page(header, title_height):
+    """(rows on the first page, rows on later pages) for single-line rows"""
+    header_height = _height([header])
+    row_height = _height([header, header]) - header_height
+    body = letter[1] - 2 * MARGIN - header_height
+    return int((body - title_height) // row_height), int(body // row_height)
+
+
+def _draw(path, progress=None):
+    spec = EXPORTS['vehicles']
+    header = spec['header']
+    title = Paragraph('FleetFlow Analytics Report', getSampleStyleSheet()['Title'])
+    title_height = title.wrap(letter[0] - 2 * MARGIN, letter[1])[1] + 12
+    first_rows, page_rows = _rows_per_page(header, title_height)
+
+    pdf = canvas.Canvas(str(path), pagesize=letter, pageCompression=1)
+    pdf.setTitle('FleetFlow Analytics Report')
+    total = Vehicle.objects.count() if progress else 0
+    done = 0
+    rows = spec['rows'](Vehicle.objects.all())
+    top = letter[1] - MARGIN - title_height
+    title.drawOn(pdf, MARGIN, top + 12)
+    chunk = list(islice(rows, first_rows))
+    page = 1
+    while True:
+        table = Table([header] + [_cells(row) for row in chunk], colWidths=COLUMN_WIDTHS)
+        table.setStyle(TABLE_STYLE)
+        _, height = table.wrap(0, 0)
+        table.drawOn(pdf, MARGIN, top - height)
+        pdf.setFont('Helvetica', 8)
+        pdf.drawRightString(letter[0] - MARGIN, MARGIN / 2, f'Page {page}')
+        done += len(chunk)
+        if progress and total:
+            progress(done / total, f'Page {page}')
+        chunk = list(islice(rows, page_rows))
+        if not chunk:
+            break
+        pdf.showPage()
+        page += 1
+        top = letter[1] - MARGIN
+    pdf.save()
+
+
+def _prune(latest):
+    """Remove the reports written before latest, which are for older data versions and never served again"""
+    if latest.name != report_name():
+        # The data changed while drawing, a report for the newer version may be on disk already
+        return
+    written = latest.stat().st_mtime_ns
+    for old in latest.parent.glob('fleet-report-*.pdf'):
+        try:
+            if old.stat().st_mtime_ns < written:
+                old.unlink()
+        except OSError:
+            pass
+
+
+def generate(name, progress=None):
+    """Write the report under name unless it already exists; returns it opened for reading.
+
+    progress, when given, is called as progress(fraction done, message) after every page.
+    """
+    report = open_report(name)
+    if report is not None:
+        return report
+    directory = report_dir()
+    path = directory / name
+    handle, temp = tempfile.mkstemp(prefix='.tmp-', suffix='.pdf', dir=directory)
+    os.close(handle)
+    try:
+        _draw(temp, progress)
+        os.replace(temp, path)
+    finally:
+        if os.path.exists(temp):
+            os.remove(temp)
+    # Opened before pruning, so a concurrent generate() cannot remove it before it is served
+    report = open(path, 'rb')
+    _prune(path)
+    return report
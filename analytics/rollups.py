@@ -0,0 +1,136 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from trips.models import Trip
+from maintenance.models import MaintenanceLog, FuelLog, Expense
+from .models import VehicleDailyStat
+from . import watermarks
+
+ROLLUP_FIELDS = ['distance', 'revenue', 'fuel_liters', 'fuel_cost', 'maintenance_cost', 'expense_total']
+
+BATCH_SIZE = 1000
+
+
+def _source_totals(vehicle_ids=None, start=None, end=None):
+    """Per (vehicle_id, date) totals straight from the raw tables, one GROUP BY per table"""
+    trips = Trip.objects.filter(status='COMPLETED', completion_date__isnull=False).annotate(
+        day=TruncDate('completion_date')
+    )
+    sources = [
+        (trips, 'day', {'distance': Sum('distance'), 'revenue': Sum('revenue')}),
+        (FuelLog.objects.all(), 'date', {'fuel_liters': Sum('liters'), 'fuel_cost': Sum('fuel_cost')}),
+        (MaintenanceLog.objects.filter(status='COMPLETED'), 'date', {'maintenance_cost': Sum('cost')}),
+        (Expense.objects.all(), 'date', {'expense_total': Sum('amount')}),
+    ]
+
+    totals = defaultdict(dict)
+    for queryset, day_field, aggregates in sources:
+        if vehicle_ids is not None:
+            queryset = queryset.filter(vehicle_id__in=vehicle_ids)
+        if start:
+            queryset = queryset.filter(**{f'{day_field}__gte': start})
+        if end:
+            queryset = queryset.filter(**{f'{day_field}__lte': end})
+        rows = queryset.order_by().values('vehicle_id', day_field).annotate(**aggregates)
+        for row in rows:
+            totals[(row['vehicle_id'], row[day_field])].update(
+                {name: row[name] or 0 for name in aggregates}
+            )
+    return totals
+
+
+def _write(keys, totals):
+    """Upsert the rollup rows for keys, deleting the ones that no longer have any activity"""
+    rows = []
+    empty = defaultdict(list)
+    for vehicle_id, day in keys:
+        values = totals.get((vehicle_id, day))
+        if values:
+            rows.append(VehicleDailyStat(vehicle_id=vehicle_id, date=day, **values))
+        else:
+            empty[day].append(vehicle_id)
+
+    with transaction.atomic():
+        for day, vehicle_ids in empty.items():
+            VehicleDailyStat.objects.filter(date=day, vehicle_id__in=vehicle_ids).delete()
+        VehicleDailyStat.objects.bulk_create(
+            rows,
+            batch_size=BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['vehicle', 'date'],
+            update_fields=ROLLUP_FIELDS + ['updated_at'],
+        )
+        watermarks.bump(VehicleDailyStat)
+
+
+def refresh(keys):
+    """Recompute the rollup rows for the given (vehicle_id, date) pairs"""
+    keys = {key for key in keys if key[0] and key[1]}
+    if not keys:
+        return
+    days = [day for _, day in keys]
+    totals = _source_totals({vehicle_id for vehicle_id, _ in keys}, min(days), max(days))
+    _write(keys, totals)
+
+
+def add(totals):
+    """Add {(vehicle_id, date): {rollup field: amount}} onto the rollup rows, creating missing ones.
+
+    Only for source rows that were just inserted: refresh() recomputes a day
+    from scratch, this increments it with one prepared upsert over the batch.
+    """
+    if not totals:
+        return
+    ops = connection.ops
+    meta = VehicleDailyStat._meta
+    table = ops.quote_name(meta.db_table)
+
+    def column(name):
+        return ops.quote_name(meta.get_field(name).column)
+
+    names = ['vehicle', 'date'] + ROLLUP_FIELDS + ['updated_at']
+    sql = (
+        f"INSERT INTO {table} ({', '.join(column(name) for name in names)}) "
+        f"VALUES ({', '.join(['%s'] * len(names))}) "
+        f"ON CONFLICT ({column('vehicle')}, {column('date')}) DO UPDATE SET "
+        + ', '.join(f'{column(name)} = {table}.{column(name)} + excluded.{column(name)}' for name in ROLLUP_FIELDS)
+        + f", {column('updated_at')} = excluded.{column('updated_at')}"
+    )
+    now = ops.adapt_datetimefield_value(timezone.now())
+    params = [
+        (vehicle_id, ops.adapt_datefield_value(day),
+         *(ops.adapt_decimalfield_value(amounts.get(name, 0), 14, 2) for name in ROLLUP_FIELDS), now)
+        # In key order, so the upserts walk the unique index instead of jumping around it
+        for (vehicle_id, day), amounts in sorted(totals.items())
+    ]
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, params)
+        watermarks.bump(VehicleDailyStat)
+
+
+def rebuild(start, end, vehicle_ids=None, window_days=31):
+    """Backfill or repair every rollup row between start and end, one window at a time.
+
+    Returns the number of rollup rows written.
+    """
+    written = 0
+    window_start = start
+    while window_start <= end:
+        window_end = min(window_start + timedelta(days=window_days - 1), end)
+        totals = _source_totals(vehicle_ids, window_start, window_end)
+
+        stale = VehicleDailyStat.objects.filter(date__gte=window_start, date__lte=window_end)
+        if vehicle_ids is not None:
+            stale = stale.filter(vehicle_id__in=vehicle_ids)
+        keys = set(totals) | set(stale.values_list('vehicle_id', 'date'))
+
+        _write(keys, totals)
+        written += len(totals)
+        window_start = window_end + timedelta(days=1)
+    return written
@@ -0,0 +1,137 @@
+from django.db import transaction
+from django.db.models.signals import post_init, pre_save, post_save, pre_delete, post_delete
+
+from vehicles.models import Vehicle
+from drivers.models import Driver
+from trips.models import Trip
+from maintenance.models import MaintenanceLog, FuelLog, Expense
+from fleetflow import events
+from . import rollups, status_counts, watermarks
+
+ROLLUP_SOURCES = (Trip, FuelLog, MaintenanceLog, Expense)
+WATERMARKED = (Vehicle, Driver, Trip, MaintenanceLog, FuelLog, Expense)
+COUNTED = (Vehicle, Driver)
+
+
+def _rollup_key(instance):
+    """The (vehicle_id, date) rollup row an instance contributes to, or None"""
+    deferred = instance.get_deferred_fields()
+    if 'vehicle_id' in deferred:
+        # Partially loaded rows (API sparse fieldsets) must not fetch the column one row at a time
+        return None
+    if isinstance(instance, Trip):
+        if {'status', 'completion_date'} & deferred or instance.status != 'COMPLETED' or not instance.completion_date:
+            return None
+        return (instance.vehicle_id, instance.completion_date.date())
+    if 'date' in deferred or not instance.date:
+        return None
+    return (instance.vehicle_id, instance.date)
+
+
+def _remember_key(sender, instance, **kwargs):
+    # Keep the key as loaded so edits that move a record also refresh the old day
+    instance._rollup_key = _rollup_key(instance)
+
+
+def _schedule_refresh(keys):
+    # After commit, so cascading deletes never re-insert rows for a vehicle being removed
+    keys = keys - {None}
+    if keys:
+        transaction.on_commit(lambda: rollups.refresh(keys))
+
+
+def _refresh_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    current = _rollup_key(instance)
+    _schedule_refresh({getattr(instance, '_rollup_key', None), current})
+    instance._rollup_key = current
+
+
+def _refresh_on_delete(sender, instance, **kwargs):
+    _schedule_refresh({getattr(instance, '_rollup_key', None), _rollup_key(instance)})
+
+
+for model in ROLLUP_SOURCES:
+    post_init.connect(_remember_key, sender=model, dispatch_uid=f'rollup_init_{model.__name__}')
+    post_save.connect(_refresh_on_save, sender=model, dispatch_uid=f'rollup_save_{model.__name__}')
+    post_delete.connect(_refresh_on_delete, sender=model, dispatch_uid=f'rollup_delete_{model.__name__}')
+
+
+def _bump_watermark(sender, raw=False, **kwargs):
+    if not raw:
+        watermarks.bump(sender)
+
+
+for model in WATERMARKED:
+    post_save.connect(_bump_watermark, sender=model, dispatch_uid=f'watermark_save_{model.__name__}')
+    post_delete.connect(_bump_watermark, sender=model, dispatch_uid=f'watermark_delete_{model.__name__}')
+
+
+def _region(instance):
+    if isinstance(instance, Vehicle):
+        return instance.region
+    if isinstance(instance, Trip):
+        if Trip.vehicle.is_cached(instance):
+            return instance.vehicle.region
+        return Vehicle.objects.filter(pk=instance.vehicle_id).values_list('region', flat=True).first()
+    return None
+
+
+def _publish_status(instance, status, previous, action):
+    # Saved through the form, the API or the admin; trip actions and maintenance publish their own
+    if status != previous and events.saves_publish():
+        entity = status_counts.entity_of(instance)
+        events.publish([events.status_change(
+            entity, instance.pk, status, previous, _region(instance), f'{entity}.{action}',
+            instance.pk if isinstance(instance, Trip) else None,
+        )])
+
+
+def _read_counted_key(sender, instance, raw=False, **kwargs):
+    # Read inside the save's transaction, so the counters move from what is really stored
+    if not raw:
+        instance._counted_key = status_counts.stored_key(instance)
+
+
+def _count_on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw:
+        old = instance.__dict__.pop('_counted_key', None)
+        status_counts.saved(instance, old, update_fields)
+        if update_fields is None or 'status' in update_fields:
+            _publish_status(instance, instance.status, old and old[0], 'save')
+
+
+def _count_on_delete(sender, instance, **kwargs):
+    old = instance.__dict__.pop('_counted_key', None)
+    if old is not None:
+        status_counts.move(status_counts.entity_of(instance), [(old, None)])
+        _publish_status(instance, None, old[0], 'delete')
+
+
+for model in COUNTED:
+    pre_save.connect(_read_counted_key, sender=model, dispatch_uid=f'status_count_pre_save_{model.__name__}')
+    post_save.connect(_count_on_save, sender=model, dispatch_uid=f'status_count_save_{model.__name__}')
+    pre_delete.connect(_read_counted_key, sender=model, dispatch_uid=f'status_count_pre_delete_{model.__name__}')
+    post_delete.connect(_count_on_delete, sender=model, dispatch_uid=f'status_count_delete_{model.__name__}')
+
+
+def _read_trip_status(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw and events.saves_publish() and (update_fields is None or 'status' in update_fields):
+        instance._stored_status = (
+            Trip.objects.filter(pk=instance.pk).values_list('status', flat=True).first() if instance.pk else None
+        )
+
+
+def _publish_trip_save(sender, instance, raw=False, **kwargs):
+    if not raw and '_stored_status' in instance.__dict__:
+        _publish_status(instance, instance.status, instance.__dict__.pop('_stored_status'), 'save')
+
+
+def _publish_trip_delete(sender, instance, **kwargs):
+    _publish_status(instance, None, instance.status, 'delete')
+
+
+pre_save.connect(_read_trip_status, sender=Trip, dispatch_uid='status_event_pre_save_Trip')
+post_save.connect(_publish_trip_save, sender=Trip, dispatch_uid='status_event_save_Trip')
+post_delete.connect(_publish_trip_delete, sender=Trip, dispatch_uid='status_event_delete_Trip')
@@ -0,0 +1,153 @@
+"""Live vehicle and driver counts per status, so status widgets read a handful of rows.
+
+StatusCount keeps one row per (entity, status, region, vehicle_type); drivers
+leave region and vehicle_type blank. The counters change in the same
+transaction as the rows they count: model signals cover save() and delete(),
+and bulk paths that write statuses with update() or raw inserts call move()
+or record() themselves. reconcile() recounts from the source tables, for
+drift left behind by raw SQL or fixtures.
+"""
+from collections import Counter, defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+
+from vehicles.models import Vehicle
+from drivers.models import Driver
+from .models import StatusCount
+
+# Counted fields per entity, in counter key order
+KEY_FIELDS = {
+    'vehicle': ('status', 'region', 'vehicle_type'),
+    'driver': ('status',),
+}
+MODELS = {'vehicle': Vehicle, 'driver': Driver}
+COLUMNS = ('entity', 'status', 'region', 'vehicle_type', 'count')
+
+
+def entity_of(model_or_instance):
+    return model_or_instance._meta.model_name
+
+
+def _padded(key):
+    return tuple(key) + ('',) * (3 - len(key))
+
+
+def key(instance, status=None):
+    """The counter key instance falls under, with status in place of its own when given"""
+    values = tuple(getattr(instance, name) for name in KEY_FIELDS[entity_of(instance)])
+    return values if status is None else (status,) + values[1:]
+
+
+def stored_key(instance):
+    """The key instance's row is counted under in the database, None when it has no row.
+
+    The row stays locked until the save's transaction ends, so two concurrent
+    saves of one row never both move the counters away from the same key.
+    """
+    if instance.pk is None:
+        return None
+    return type(instance)._default_manager.select_for_update().filter(pk=instance.pk).values_list(
+        *KEY_FIELDS[entity_of(instance)]
+    ).first()
+
+
+def _add(entity, deltas):
+    """Add {key: change} onto entity's counters with one prepared upsert, creating missing rows"""
+    rows = sorted((_padded(k), n) for k, n in deltas.items() if n)
+    if not rows:
+        return
+    ops = connection.ops
+    meta = StatusCount._meta
+    table = ops.quote_name(meta.db_table)
+    columns = [ops.quote_name(meta.get_field(name).column) for name in COLUMNS]
+    sql = (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+        f"ON CONFLICT ({', '.join(columns[:-1])}) DO UPDATE SET "
+        f"{columns[-1]} = {table}.{columns[-1]} + excluded.{columns[-1]}"
+    )
+    with transaction.atomic(savepoint=False):
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, [(entity, *k, n) for k, n in rows])
+
+
+def move(entity, changes):
+    """Apply (old key, new key) pairs to entity's counters; None stands for no row (inserted or deleted)"""
+    deltas = Counter()
+    for old, new in changes:
+        if old == new:
+            continue
+        if old is not None:
+            deltas[old] -= 1
+        if new is not None:
+            deltas[new] += 1
+    _add(entity, deltas)
+
+
+def record(changes):
+    """Count status changes written with update(): changes are (vehicle or driver, previous, status).
+
+    The instances only supply the rest of the key; their own status is not read.
+    """
+    moves = defaultdict(list)
+    for instance, previous, status in changes:
+        moves[entity_of(instance)].append((key(instance, previous), key(instance, status)))
+    for entity, pairs in moves.items():
+        move(entity, pairs)
+
+
+def inserted(model, rows):
+    """Count rows of field values inserted without save(); fields a row leaves out took their defaults"""
+    entity = entity_of(model)
+    fields = [model._meta.get_field(name) for name in KEY_FIELDS[entity]]
+    defaults = [field.get_default() for field in fields]
+    move(entity, [
+        (None, tuple(values.get(field.attname, default) for field, default in zip(fields, defaults)))
+        for values in rows
+    ])
+
+
+def saved(instance, old, update_fields=None):
+    """Move instance from old (its stored key before the save) to the key just written"""
+    new = key(instance)
+    if old is not None and update_fields is not None:
+        # Fields left out of the UPDATE kept their stored values
+        fields = KEY_FIELDS[entity_of(instance)]
+        new = tuple(value if name in update_fields else stored for name, value, stored in zip(fields, new, old))
+    move(entity_of(instance), [(old, new)])
+
+
+def counts(entity, by=('status',), **filters):
+    """{value of by (a tuple when by has several fields): count} over the counters matching filters"""
+    rows = (
+        StatusCount.objects.filter(entity=entity, **filters).order_by(*by).values_list(*by)
+        .annotate(total=Sum('count')).filter(total__gt=0)
+    )
+    if len(by) == 1:
+        return {value: total for value, total in rows}
+    return {row[:-1]: row[-1] for row in rows}
+
+
+def recount(entity):
+    """{key: count} straight from the source table, one GROUP BY"""
+    fields = KEY_FIELDS[entity]
+    rows = MODELS[entity].objects.order_by().values_list(*fields).annotate(total=Count('pk'))
+    return {_padded(row[:-1]): row[-1] for row in rows}
+
+
+def reconcile():
+    """Reset every counter to a fresh recount; returns the number of counters that were off"""
+    corrected = 0
+    with transaction.atomic():
+        for entity in MODELS:
+            # Locked first, so transitions committing meanwhile land on top of the recount
+            stored = {
+                row[:-1]: row[-1]
+                for row in StatusCount.objects.select_for_update().filter(entity=entity).values_list(*COLUMNS[1:])
+            }
+            actual = recount(entity)
+            deltas = {k: actual.get(k, 0) - stored.get(k, 0) for k in set(stored) | set(actual)}
+            corrected += sum(1 for n in deltas.values() if n)
+            _add(entity, deltas)
+            StatusCount.objects.filter(entity=entity, count=0).delete()
+    return corrected
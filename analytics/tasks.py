@@ -0,0 +1,73 @@
+"""Background tasks for the job queue (see jobs.queue)"""
+from datetime import timedelta
+
+from django.urls import reverse
+from django.utils.dateparse import parse_date
+
+from jobs.queue import task
+from . import imports, reports, rollups
+from .exports import export_queryset, stream_csv
+
+PROGRESS_ROWS = 5000
+IMPORT_ERRORS_FILE = 'import-errors.csv'
+
+
+def export_filename(dataset):
+    return 'fleet_analytics.csv' if dataset == 'vehicles' else f'fleet_{dataset}.csv'
+
+
+@task('analytics.export_csv')
+def export_csv(ctx, dataset, start=None, end=None):
+    """Write a CSV export to the job's directory"""
+    start_date, end_date = parse_date(start or ''), parse_date(end or '')
+    total = export_queryset(dataset, start_date, end_date).count()
+    filename = export_filename(dataset)
+    rows = 0
+    with open(ctx.path(filename), 'w', newline='', encoding='utf-8') as output:
+        for rows, line in enumerate(stream_csv(dataset, start_date, end_date)):
+            output.write(line)
+            if rows % PROGRESS_ROWS == 0 and total:
+                ctx.progress(rows / total, f'{rows} of {total} rows')
+    return {'file': filename, 'rows': rows}
+
+
+@task('analytics.pdf_report')
+def pdf_report(ctx, name):
+    """Generate the PDF report for the current data version into the reports directory.
+
+    name is the version the job was queued for; when the data changed since,
+    the report is drawn under the current name, never under the stale one.
+    """
+    name = reports.report_name()
+    reports.generate(name, ctx.progress).close()
+    return {'url': reverse('export_pdf_download', args=[name])}
+
+
+@task('analytics.rebuild_rollups')
+def rebuild_rollups(ctx, since, until, vehicles=None, window_days=31):
+    """rollups.rebuild() one window at a time, reporting progress between windows"""
+    since, until = parse_date(since), parse_date(until)
+    days = (until - since).days + 1
+    written = 0
+    window_start = since
+    while window_start <= until:
+        window_end = min(window_start + timedelta(days=window_days - 1), until)
+        written += rollups.rebuild(window_start, window_end, vehicle_ids=vehicles, window_days=window_days)
+        ctx.progress(((window_end - since).days + 1) / days, f'Rebuilt up to {window_end}')
+        window_start = window_end + timedelta(days=1)
+    return {'written': written}
+
+
+# Not retried: rows committed before a failure would be imported twice
+@task('analytics.import_data', max_attempts=1)
+def import_data(ctx, dataset, filename, format):
+    """imports.import_file() over an upload stored in the job's directory"""
+    source = ctx.path(filename)
+    size = source.stat().st_size or 1
+    with open(source, 'rb') as stream, open(ctx.path(IMPORT_ERRORS_FILE), 'w', newline='', encoding='utf-8') as errors:
+        created, rejected = imports.import_file(
+            dataset, stream, format, errors,
+            progress=lambda read: ctx.progress(stream.tell() / size, f'{read} rows read'),
+        )
+    source.unlink()
+    return {'created': created, 'rejected': rejected, 'file': IMPORT_ERRORS_FILE}
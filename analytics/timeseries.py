@@ -0,0 +1,80 @@
+from datetime import timedelta
+
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+
+from .models import VehicleDailyStat
+
+BUCKETS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+# Metric name -> aggregate over the daily rollup rows
+METRICS = {
+    'revenue': lambda: Sum('revenue'),
+    'distance': lambda: Sum('distance'),
+    'fuel': lambda: Sum('fuel_liters'),
+    'fuel_cost': lambda: Sum('fuel_cost'),
+    'maintenance_cost': lambda: Sum('maintenance_cost'),
+    'expenses': lambda: Sum('expense_total'),
+    'cost': lambda: Sum(F('fuel_cost') + F('maintenance_cost')),
+}
+
+MAX_BUCKETS = 1000
+
+
+def bucket_start(day, bucket):
+    """First day of the calendar bucket containing day (weeks start on Monday)"""
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(day, bucket):
+    if bucket == 'week':
+        return day + timedelta(days=7)
+    if bucket == 'month':
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def bucket_range(start, end, bucket):
+    """Every bucket start from the one containing start through the one containing end"""
+    buckets = []
+    current = bucket_start(start, bucket)
+    while current <= end:
+        buckets.append(current)
+        current = next_bucket(current, bucket)
+    return buckets
+
+
+def build_series(start, end, bucket='month', metrics=('revenue',)):
+    """Zero-filled series for each metric over [start, end], from one GROUP BY query.
+
+    Returns {'labels': [bucket start dates], 'series': {metric: [floats]}}.
+    """
+    buckets = bucket_range(start, end, bucket)
+    if len(buckets) > MAX_BUCKETS:
+        raise ValueError(f'Range spans more than {MAX_BUCKETS} {bucket} buckets')
+
+    rows = VehicleDailyStat.objects.filter(
+        date__gte=start,
+        date__lte=end
+    ).annotate(
+        period=BUCKETS[bucket]('date')
+    ).order_by().values('period').annotate(
+        **{metric: METRICS[metric]() for metric in metrics}
+    )
+
+    index = {period: position for position, period in enumerate(buckets)}
+    series = {metric: [0.0] * len(buckets) for metric in metrics}
+    for row in rows:
+        position = index[bucket_start(row['period'], bucket)]
+        for metric in metrics:
+            series[metric][position] = float(row[metric] or 0)
+
+    return {'labels': buckets, 'series': series}
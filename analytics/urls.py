@@ -5,5 +5,11 @@ urlpatterns = [
     path('', views.analytics_dashboard, name='analytics_dashboard'),
     path('export/csv/', views.export_csv, name='export_csv'),
     path('export/pdf/', views.export_pdf, name='export_pdf'),
+    path('export/pdf/<str:name>/', views.export_pdf_download, name='export_pdf_download'),
+    path('import/', views.import_data, name='import_data'),
     path('api/chart-data/', views.chart_data, name='chart_data'),
+    path('api/timeseries/', views.timeseries, name='timeseries'),
+    path('api/fuel-efficiency/', views.fuel_efficiency, name='fuel_efficiency'),
+    path('api/events/', views.event_stream, name='event_stream'),
+    path('api/events/poll/', views.event_poll, name='event_poll'),
 ]
@@ -1,55 +1,72 @@
 from django.shortcuts import render
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse, JsonResponse
-from django.db.models import Sum, Count, Avg, F, Q
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST
+from django.db import transaction
+from django.db.models import Sum, Avg, F, Q
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from datetime import timedelta
-import csv
-from io import BytesIO
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+import json
+import time
 from vehicles.models import Vehicle
 from drivers.models import Driver
 from trips.models import Trip
-from maintenance.models import MaintenanceLog, FuelLog
+from maintenance.models import MaintenanceLog, FuelLog, Expense
+from fleetflow import events
+from jobs.queue import enqueue, job_dir
+from jobs.views import job_json
+from .exports import EXPORTS, stream_csv
+from .imports import IMPORTS, READERS, guess_format
+from .tasks import export_filename
+from . import efficiency, reports, status_counts
+from .cache import cached
+from .models import VehicleDailyStat
+from .watermarks import conditional
+from .timeseries import BUCKETS, METRICS, build_series
+
+DASHBOARD_TABLES = (Vehicle, Driver, Trip, MaintenanceLog, FuelLog, Expense, VehicleDailyStat)
+CHART_TABLES = {
+    'vehicle_status': (Vehicle,),
+    'monthly_revenue': (VehicleDailyStat,),
+}
 
 @login_required
+@conditional(*DASHBOARD_TABLES)
 def analytics_dashboard(request):
     # Date range filter
     days = int(request.GET.get('days', 30))
+    context, current = cached('dashboard', {'days': days}, DASHBOARD_TABLES, lambda: _dashboard_context(days))
+    response = render(request, 'analytics/dashboard.html', context)
+    response.stale = not current
+    return response
+
+def _dashboard_context(days):
     start_date = timezone.now() - timedelta(days=days)
     
-    # Fleet Utilization
-    total_vehicles = Vehicle.objects.exclude(status='RETIRED').count()
-    active_vehicles = Vehicle.objects.filter(status='ON_TRIP').count()
+    # Fleet Utilization, from the status counters: a handful of rows at any fleet size
+    vehicle_statuses = status_counts.counts('vehicle')
+    total_vehicles = sum(count for status, count in vehicle_statuses.items() if status != 'RETIRED')
+    active_vehicles = vehicle_statuses.get('ON_TRIP', 0)
     fleet_utilization = (active_vehicles / total_vehicles * 100) if total_vehicles > 0 else 0
     
-    # Fuel Efficiency
-    fuel_data = FuelLog.objects.filter(date__gte=start_date).aggregate(
-        total_liters=Sum('liters'),
-        total_cost=Sum('fuel_cost')
-    )
-    
-    trip_data = Trip.objects.filter(
-        status='COMPLETED',
-        completion_date__gte=start_date
-    ).aggregate(
-        total_distance=Sum('distance')
+    # Fuel, distance and cost totals come from the daily rollups: O(days) rows
+    totals = VehicleDailyStat.objects.filter(date__gte=start_date.date()).aggregate(
+        total_distance=Sum('distance'),
+        total_liters=Sum('fuel_liters'),
+        fuel_cost=Sum('fuel_cost'),
+        maintenance_cost=Sum('maintenance_cost'),
     )
     
-    total_distance = float(trip_data['total_distance'] or 0)
-    total_liters = float(fuel_data['total_liters'] or 0)
+    # Fuel Efficiency
+    total_distance = float(totals['total_distance'] or 0)
+    total_liters = float(totals['total_liters'] or 0)
     fuel_efficiency = (total_distance / total_liters) if total_liters > 0 else 0
     
     # Cost per KM
-    maintenance_cost = MaintenanceLog.objects.filter(
-        date__gte=start_date,
-        status='COMPLETED'
-    ).aggregate(total=Sum('cost'))['total'] or 0
-    
-    fuel_cost = fuel_data['total_cost'] or 0
+    maintenance_cost = totals['maintenance_cost'] or 0
+    fuel_cost = totals['fuel_cost'] or 0
     total_cost = float(maintenance_cost) + float(fuel_cost)
     cost_per_km = (total_cost / total_distance) if total_distance > 0 else 0
     
@@ -58,11 +75,11 @@ def analytics_dashboard(request):
     vehicles_with_roi_table = []
     
     try:
-        for vehicle in Vehicle.objects.exclude(status='RETIRED')[:10]:
+        for vehicle in Vehicle.objects.exclude(status='RETIRED').with_financials()[:10]:
             try:
                 roi_value = vehicle.roi()
-                revenue_value = vehicle.total_revenue()
-                costs_value = vehicle.total_maintenance_cost() + vehicle.total_fuel_cost()
+                revenue_value = vehicle.revenue_total
+                costs_value = vehicle.costs_total
                 
                 # For JSON (charts) - convert all to float
                 vehicles_with_roi_json.append({
@@ -88,22 +105,17 @@ def analytics_dashboard(request):
     except Exception as e:
         print(f"Error processing vehicles: {e}")
     
-    # Driver Performance
+    # Driver Performance: ranked across the whole roster in SQL
     drivers_performance = []
     try:
-        for driver in Driver.objects.all()[:10]:
-            try:
-                drivers_performance.append({
-                    'driver': driver,
-                    'total_trips': driver.total_trips(),
-                    'completion_rate': round(driver.completion_rate(), 1),
-                    'safety_score': round(driver.safety_score(), 1),
-                })
-            except Exception as e:
-                print(f"Error processing driver {driver.name}: {e}")
-                continue
-        
-        drivers_performance.sort(key=lambda x: x['safety_score'], reverse=True)
+        top_drivers = Driver.objects.with_performance().order_by('-safety_pct', '-trip_count', 'pk')[:10]
+        for driver in top_drivers:
+            drivers_performance.append({
+                'driver': driver,
+                'total_trips': driver.total_trips(),
+                'completion_rate': round(driver.completion_rate(), 1),
+                'safety_score': round(driver.safety_score(), 1),
+            })
     except Exception as e:
         print(f"Error processing drivers: {e}")
     
@@ -120,99 +132,266 @@ def analytics_dashboard(request):
         'days': days,
     }
     
-    return render(request, 'analytics/dashboard.html', context)
+    return context
 
 @login_required
 def export_csv(request):
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="fleet_analytics.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Vehicle', 'Type', 'Status', 'Total Revenue', 'Total Costs', 'ROI %'])
-    
-    for vehicle in Vehicle.objects.all():
-        writer.writerow([
-            vehicle.name,
-            vehicle.get_vehicle_type_display(),
-            vehicle.get_status_display(),
-            vehicle.total_revenue(),
-            vehicle.total_maintenance_cost() + vehicle.total_fuel_cost(),
-            round(vehicle.roi(), 2),
-        ])
+    dataset = request.GET.get('dataset', 'vehicles')
+    if dataset not in EXPORTS:
+        return JsonResponse({'error': 'Invalid dataset'}, status=400)
+    
+    # Optional date range (YYYY-MM-DD), ignored for undated datasets
+    try:
+        start_date = parse_date(request.GET.get('start', ''))
+        end_date = parse_date(request.GET.get('end', ''))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid date'}, status=400)
+    
+    # ?mode=async writes the file in a background job; poll the job for its download URL
+    if request.GET.get('mode') == 'async':
+        params = {'dataset': dataset, 'start': start_date and start_date.isoformat(),
+                  'end': end_date and end_date.isoformat()}
+        job = enqueue('analytics.export_csv', params, request.user)
+        return JsonResponse(job_json(job), status=202)
+    
+    filename = export_filename(dataset)
+    response = StreamingHttpResponse(stream_csv(dataset, start_date, end_date), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
     
     return response
 
 @login_required
-def export_pdf(request):
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    elements = []
-    
-    styles = getSampleStyleSheet()
-    title = Paragraph("FleetFlow Analytics Report", styles['Title'])
-    elements.append(title)
-    elements.append(Spacer(1, 12))
-    
-    # Vehicle data
-    data = [['Vehicle', 'Type', 'Status', 'Revenue', 'Costs', 'ROI %']]
-    
-    for vehicle in Vehicle.objects.all():
-        data.append([
-            vehicle.name,
-            vehicle.get_vehicle_type_display(),
-            vehicle.get_status_display(),
-            f"₹{vehicle.total_revenue():.2f}",
-            f"₹{vehicle.total_maintenance_cost() + vehicle.total_fuel_cost():.2f}",
-            f"{vehicle.roi():.2f}%",
-        ])
-    
-    table = Table(data)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-    ]))
-    
-    elements.append(table)
-    doc.build(elements)
-    
-    buffer.seek(0)
-    response = HttpResponse(buffer, content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="fleet_analytics.pdf"'
+@require_POST
+def import_data(request):
+    """Queue a bulk import of an uploaded CSV or NDJSON file (form fields dataset, file and optional format)"""
+    dataset = request.POST.get('dataset')
+    upload = request.FILES.get('file')
+    if dataset not in IMPORTS:
+        return JsonResponse({'error': f'dataset must be one of {", ".join(IMPORTS)}'}, status=400)
+    if upload is None:
+        return JsonResponse({'error': 'No file uploaded'}, status=400)
+    fmt = request.POST.get('format') or guess_format(upload.name)
+    if fmt not in READERS:
+        return JsonResponse({'error': 'format must be csv or ndjson'}, status=400)
     
-    return response
+    filename = f'upload.{fmt}'
+    # The file is in place before the job commits, so no worker can claim it early
+    with transaction.atomic():
+        job = enqueue('analytics.import_data', {'dataset': dataset, 'filename': filename, 'format': fmt},
+                      request.user, unique=False)
+        directory = job_dir(job.pk)
+        directory.mkdir(parents=True, exist_ok=True)
+        with open(directory / filename, 'wb') as destination:
+            for chunk in upload.chunks():
+                destination.write(chunk)
+    return JsonResponse(job_json(job), status=202)
+
+@login_required
+def export_pdf(request):
+    """Vehicle report as a PDF download, served from disk while the data is unchanged.
+
+    ?mode=async never waits: it answers with the download URL when the
+    report is ready, or queues a job to generate it and answers with the job.
+    """
+    name = reports.report_name()
+    if request.GET.get('mode') == 'async':
+        if reports.report_path(name):
+            return JsonResponse({'status': 'ready', 'url': reverse('export_pdf_download', args=[name])})
+        job = enqueue('analytics.pdf_report', {'name': name}, request.user)
+        return JsonResponse(job_json(job), status=202)
+    return _pdf_response(reports.generate(name))
 
 @login_required
+def export_pdf_download(request, name):
+    report = reports.open_report(name)
+    if report is None:
+        return JsonResponse({'error': 'Report not found, it may be outdated; generate it again'}, status=404)
+    return _pdf_response(report)
+
+def _pdf_response(report):
+    return FileResponse(report, as_attachment=True, filename='fleet_analytics.pdf',
+                        content_type='application/pdf')
+
+@login_required
+@conditional(Vehicle, VehicleDailyStat)
 def chart_data(request):
     """API endpoint for chart data"""
     chart_type = request.GET.get('type', 'vehicle_status')
+    if chart_type not in CHART_TABLES:
+        return JsonResponse({'error': 'Invalid chart type'}, status=400)
     
+    # vehicle_status can be narrowed with ?region= and ?vehicle_type=
+    filters = {name: request.GET[name] for name in ('region', 'vehicle_type') if name in request.GET}
+    data, current = cached('chart', {'type': chart_type, **filters}, CHART_TABLES[chart_type],
+                           lambda: _chart_payload(chart_type, filters))
+    response = JsonResponse(data, safe=False)
+    response.stale = not current
+    return response
+
+def _chart_payload(chart_type, filters=None):
     if chart_type == 'vehicle_status':
-        data = Vehicle.objects.values('status').annotate(count=Count('id'))
-        return JsonResponse(list(data), safe=False)
+        counts = status_counts.counts('vehicle', **(filters or {}))
+        return [{'status': status, 'count': count} for status, count in counts.items()]
     
     elif chart_type == 'monthly_revenue':
-        # Last 6 months revenue
-        data = []
-        for i in range(6, 0, -1):
-            month_start = timezone.now() - timedelta(days=30*i)
-            month_end = timezone.now() - timedelta(days=30*(i-1))
-            revenue = Trip.objects.filter(
-                status='COMPLETED',
-                completion_date__gte=month_start,
-                completion_date__lt=month_end
-            ).aggregate(total=Sum('revenue'))['total'] or 0
-            
-            data.append({
-                'month': month_start.strftime('%b'),
-                'revenue': float(revenue)
-            })
+        # Last 6 calendar months revenue, including the current month
+        today = timezone.now().date()
+        start = today.replace(day=1)
+        for _ in range(5):
+            start = (start - timedelta(days=1)).replace(day=1)
+        result = build_series(start, today, 'month', ['revenue'])
         
-        return JsonResponse(data, safe=False)
+        return [
+            {'month': month.strftime('%b'), 'revenue': revenue}
+            for month, revenue in zip(result['labels'], result['series']['revenue'])
+        ]
+
+@login_required
+@conditional(FuelLog, Vehicle)
+def fuel_efficiency(request):
+    """Per-fill km/L with outlier flags: one vehicle's series for ?vehicle=, else the fleet summary (?limit= flagged fills)"""
+    if 'vehicle' in request.GET:
+        try:
+            vehicle_id = int(request.GET['vehicle'])
+        except ValueError:
+            return JsonResponse({'error': 'Invalid vehicle'}, status=400)
+        if not Vehicle.objects.filter(pk=vehicle_id).exists():
+            return JsonResponse({'error': 'Vehicle not found'}, status=404)
+        data, current = cached('fuel_efficiency', {'vehicle': vehicle_id}, (FuelLog,),
+                               lambda: efficiency.vehicle_series(vehicle_id))
+    else:
+        try:
+            limit = int(request.GET.get('limit', 20))
+        except ValueError:
+            return JsonResponse({'error': 'Invalid limit'}, status=400)
+        if not 0 <= limit <= efficiency.MAX_FLAGGED:
+            return JsonResponse({'error': f'limit must be between 0 and {efficiency.MAX_FLAGGED}'}, status=400)
+        # One cached fleet scan serves every limit
+        data, current = cached('fuel_efficiency', {}, (FuelLog,), efficiency.fleet_summary)
+        data = {**data, 'flagged': data['flagged'][:limit]}
+    response = JsonResponse(data)
+    response.stale = not current
+    return response
+
+@login_required
+@conditional(VehicleDailyStat)
+def timeseries(request):
+    """API endpoint for calendar-bucketed metric series"""
+    bucket = request.GET.get('bucket', 'month')
+    if bucket not in BUCKETS:
+        return JsonResponse({'error': 'Invalid bucket'}, status=400)
+    
+    metrics = [m for m in request.GET.get('metrics', 'revenue').split(',') if m]
+    if not metrics or any(m not in METRICS for m in metrics):
+        return JsonResponse({'error': 'Invalid metric'}, status=400)
+    
+    try:
+        end = parse_date(request.GET.get('end', '')) or timezone.now().date()
+        start = parse_date(request.GET.get('start', '')) or end - timedelta(days=180)
+        if start > end:
+            raise ValueError('start is after end')
+        result = build_series(start, end, bucket, metrics)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse({
+        'bucket': bucket,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'labels': [label.isoformat() for label in result['labels']],
+        'series': result['series'],
+    })
+
+def _event_filters(request):
+    """entity, region and status filters, each a comma-separated list or repeated parameter"""
+    def values(name):
+        return {v for raw in request.GET.getlist(name) for v in raw.split(',') if v}
+    return {'entities': values('entity'), 'regions': values('region'), 'statuses': values('status')}
+
+def _event_cursor(value, default):
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return default
+
+class _EventStream:
+    """SSE body generator that gives its subscriber slot back however the response ends"""
+    
+    def __init__(self, after, filters, release):
+        self.after = after
+        self.filters = filters
+        self.release = release
+    
+    def __iter__(self):
+        deadline = time.monotonic() + events.MAX_STREAM_SECONDS
+        # A bare id line moves the browser's Last-Event-ID without firing an event
+        yield f'retry: {events.RECONNECT_MS}\nid: {self.after}\n\n'
+        while time.monotonic() < deadline:
+            batch, missed, self.after = events.bus.read(self.after, events.HEARTBEAT_SECONDS)
+            if missed:
+                yield f'id: {self.after}\nevent: reset\ndata: {{}}\n\n'
+            sent = False
+            for event in batch:
+                if events.matches(event, **self.filters):
+                    sent = True
+                    yield f'id: {event["id"]}\nevent: {event["entity"]}\ndata: {json.dumps(event)}\n\n'
+            if not sent:
+                yield f': keepalive\nid: {self.after}\n\n'
+    
+    def close(self):
+        self.release()
+
+@login_required
+def event_stream(request):
+    """Server-sent events for status changes, filtered by ?entity=, ?region= and ?status=.
+    
+    Resumes after the Last-Event-ID header (or ?after=) when reconnecting; a
+    reset event means changes were missed and the page should reload.
+    """
+    try:
+        release = events.bus.subscribe()
+    except events.TooManySubscribers:
+        response = JsonResponse({'error': 'Too many open event streams'}, status=503)
+        response['Retry-After'] = events.HEARTBEAT_SECONDS
+        return response
+    
+    after = request.headers.get('Last-Event-ID') or request.GET.get('after')
+    stream = _EventStream(_event_cursor(after, events.bus.last_id), _event_filters(request), release)
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@login_required
+def event_poll(request):
+    """Long-poll fallback: status changes after ?after=, waiting up to ?timeout= seconds for one.
+    
+    Without ?after= it answers at once with the current cursor.
+    """
+    filters = _event_filters(request)
+    after = _event_cursor(request.GET.get('after'), None)
+    if after is None:
+        return JsonResponse({'events': [], 'last_id': events.bus.last_id, 'reset': False})
+    timeout = min(_event_cursor(request.GET.get('timeout'), events.POLL_TIMEOUT_SECONDS), events.POLL_TIMEOUT_SECONDS)
+    
+    try:
+        release = events.bus.subscribe()
+    except events.TooManySubscribers:
+        timeout = 0
+        release = None
+    try:
+        deadline = time.monotonic() + timeout
+        reset = False
+        while True:
+            batch, missed, after = events.bus.read(after, max(deadline - time.monotonic(), 0))
+            reset = reset or missed
+            matched = [event for event in batch if events.matches(event, **filters)]
+            # Changes other clients care about wake us too; keep waiting for our own
+            if matched or reset or time.monotonic() >= deadline:
+                break
+    finally:
+        if release:
+            release()
     
-    return JsonResponse({'error': 'Invalid chart type'}, status=400)
+    return JsonResponse({'events': matched, 'last_id': after, 'reset': reset})
@@ -0,0 +1,107 @@
+"""Per-table change versions for conditional GETs.
+
+Every write to a watched table bumps its Watermark row: model signals cover
+save() and delete(), and bulk paths that skip signals call bump() themselves.
+Views hash the versions of the tables they read into an ETag, so a poll that
+comes back with the same ETag gets 304 Not Modified after one primary-key
+lookup instead of the view's queries. The versions live in the database, so
+every worker process agrees on them.
+"""
+import hashlib
+from datetime import datetime, time
+from functools import wraps
+
+from django.contrib import messages
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .models import Watermark
+
+# Vehicle coordinates change with every telemetry batch; only views that
+# show positions depend on this, so trackers do not defeat 304s elsewhere
+VEHICLE_POSITIONS = 'vehicles.vehicle.position'
+
+
+def _label(table):
+    return table if isinstance(table, str) else table._meta.label_lower
+
+
+def bump(*tables):
+    """Record a change to tables (models or scope names) once the transaction commits"""
+    labels = sorted({_label(table) for table in tables})
+    if labels:
+        transaction.on_commit(lambda: _advance(labels))
+
+
+def _advance(labels):
+    now = timezone.now()
+    changed = Watermark.objects.filter(table__in=labels).update(version=F('version') + 1, changed_at=now)
+    if changed < len(labels):
+        # First change ever seen for a table: create its row, then count the change
+        Watermark.objects.bulk_create(
+            [Watermark(table=label, changed_at=now) for label in labels], ignore_conflicts=True
+        )
+        Watermark.objects.filter(table__in=labels, version=0).update(version=1)
+
+
+def versions(tables):
+    """{label: (version, changed_at)} in label order; (0, None) for tables never changed"""
+    labels = sorted({_label(table) for table in tables})
+    stamps = {
+        table: (version, changed_at)
+        for table, version, changed_at in Watermark.objects.filter(table__in=labels).values_list(
+            'table', 'version', 'changed_at'
+        )
+    }
+    return {label: stamps.get(label, (0, None)) for label in labels}
+
+
+def validators(request, tables, extra=()):
+    """(weak ETag, Last-Modified datetime) for what request would see of tables.
+
+    The ETag also covers the user, the full URL and today's date, since
+    pages greet the user and count expiries and date windows against today.
+    """
+    stamps = versions(tables)
+    today = timezone.localdate()
+    key = [request.user.pk, request.get_full_path(), today.isoformat(), *extra]
+    for label, (version, changed_at) in stamps.items():
+        key.append(f'{label}={version}@{changed_at.isoformat() if changed_at else ""}')
+    etag = 'W/"%s"' % hashlib.sha1('|'.join(map(str, key)).encode()).hexdigest()
+    last_modified = max(
+        [changed_at for _, changed_at in stamps.values() if changed_at]
+        + [timezone.make_aware(datetime.combine(today, time.min))]
+    )
+    return etag, last_modified
+
+
+def respond(request, tables, render, extra=()):
+    """render()'s response stamped with ETag and Last-Modified, or 304 when the client's copy is current"""
+    # Pending flash messages are shown (and consumed) by the next page, so it must really render
+    if request.method not in ('GET', 'HEAD') or len(messages.get_messages(request)):
+        return render()
+    etag, last_modified = validators(request, tables, extra)
+    response = get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()))
+    if response is None:
+        response = render()
+    # Per-user pages: browsers may keep them but must revalidate, shared caches must not
+    patch_cache_control(response, private=True, no_cache=True)
+    # A view that served an outdated cached result (response.stale) must not
+    # label it with the current validators, or the client would keep it
+    if response.status_code in (200, 304) and not getattr(response, 'stale', False):
+        response.headers.setdefault('ETag', etag)
+        response.headers.setdefault('Last-Modified', http_date(last_modified.timestamp()))
+    return response
+
+
+def conditional(*tables):
+    """View decorator for respond(); put it under @login_required"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            return respond(request, tables, lambda: view(request, *args, **kwargs))
+        return wrapper
+    return decorator
@@ -0,0 +1,9 @@
+from fleetflow.api import FleetViewSet
+from .models import Driver
+from .serializers import DriverSerializer
+
+
+class DriverViewSet(FleetViewSet):
+    queryset = Driver.objects.all()
+    serializer_class = DriverSerializer
+    filterset_fields = ['status', 'license_category', 'assigned_vehicle']
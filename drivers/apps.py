@@ -3,3 +3,7 @@ from django.apps import AppConfig
 class DriversConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'drivers'
+    
+    def ready(self):
+        from fleetflow.choices import connect_invalidation
+        connect_invalidation(self.get_model('Driver'))
@@ -1,4 +1,6 @@
 from django import forms
+from django.urls import reverse_lazy
+from fleetflow.widgets import TypeaheadSelect
 from .models import Driver
 
 class DriverForm(forms.ModelForm):
@@ -13,5 +15,5 @@ class DriverForm(forms.ModelForm):
             'license_expiry': forms.DateInput(attrs={'class': 'form-input', 'type': 'date'}),
             'phone': forms.TextInput(attrs={'class': 'form-input'}),
             'status': forms.Select(attrs={'class': 'form-select'}),
-            'assigned_vehicle': forms.Select(attrs={'class': 'form-select'}),
+            'assigned_vehicle': TypeaheadSelect(reverse_lazy('vehicle_lookup'), attrs={'class': 'form-select'}),
         }
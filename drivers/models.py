@@ -1,7 +1,31 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, Count, F, FloatField, Q, Value, When
+from django.db.models.functions import Cast, Least
 from django.utils import timezone
 from vehicles.models import Vehicle
 
+
+class DriverQuerySet(models.QuerySet):
+    def with_performance(self):
+        """Annotate trip counts, completion rate and safety score in SQL.
+
+        Order and slice on safety_pct / completion_pct to rank the whole
+        roster in one query; the model's metric methods reuse these values.
+        """
+        return self.annotate(
+            trip_count=Count('trips'),
+            completed_trip_count=Count('trips', filter=Q(trips__status='COMPLETED')),
+        ).annotate(
+            completion_pct=Case(
+                When(trip_count__gt=0, then=Cast('completed_trip_count', FloatField()) * 100 / F('trip_count')),
+                default=Value(0.0),
+                output_field=FloatField(),
+            ),
+        ).annotate(
+            safety_pct=Least(Value(100.0), F('completion_pct'), output_field=FloatField()),
+        )
+
+
 class Driver(models.Model):
     STATUS_CHOICES = [
         ('ON_DUTY', 'On Duty'),
@@ -27,22 +51,36 @@ class Driver(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = DriverQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.name} ({self.license_number})"
     
+    def save(self, *args, **kwargs):
+        # One transaction with the status counters that analytics.signals moves on save
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            super().save(*args, **kwargs)
+    
     def is_license_valid(self):
         return self.license_expiry >= timezone.now().date()
     
     def is_available_for_dispatch(self):
         return self.status == 'ON_DUTY' and self.is_license_valid()
     
+    # The metric methods reuse Driver.objects.with_performance() annotations when present
     def total_trips(self):
+        if hasattr(self, 'trip_count'):
+            return self.trip_count
         return self.trips.count()
     
     def completed_trips(self):
+        if hasattr(self, 'completed_trip_count'):
+            return self.completed_trip_count
         return self.trips.filter(status='COMPLETED').count()
     
     def completion_rate(self):
+        if hasattr(self, 'completion_pct'):
+            return self.completion_pct
         total = self.total_trips()
         if total > 0:
             return (self.completed_trips() / total) * 100
@@ -50,8 +88,14 @@ class Driver(models.Model):
     
     def safety_score(self):
         # Simple safety score based on completion rate
+        if hasattr(self, 'safety_pct'):
+            return self.safety_pct
         return min(100, self.completion_rate())
     
     class Meta:
         db_table = 'drivers'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='drivers_status_created_idx'),
+            models.Index(fields=['created_at', 'id'], name='drivers_created_idx'),
+        ]
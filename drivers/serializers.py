@@ -0,0 +1,10 @@
+from fleetflow.api import SparseFieldsetSerializer
+from .models import Driver
+
+
+class DriverSerializer(SparseFieldsetSerializer):
+    class Meta:
+        model = Driver
+        fields = ['id', 'name', 'license_number', 'license_category', 'license_expiry', 'phone', 'status',
+                  'assigned_vehicle', 'created_at', 'updated_at']
+        read_only_fields = ['created_at', 'updated_at']
@@ -3,6 +3,7 @@ from . import views
 
 urlpatterns = [
     path('', views.driver_list, name='driver_list'),
+    path('lookup/', views.driver_lookup, name='driver_lookup'),
     path('create/', views.driver_create, name='driver_create'),
     path('<int:pk>/', views.driver_detail, name='driver_detail'),
     path('<int:pk>/update/', views.driver_update, name='driver_update'),
@@ -1,11 +1,16 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.http import JsonResponse
 from django.db.models import Q
 from .models import Driver
 from .forms import DriverForm
+from fleetflow.choices import search_choices
+from fleetflow.pagination import paginate_keyset
+from analytics.watermarks import conditional
 
 @login_required
+@conditional(Driver)
 def driver_list(request):
     drivers = Driver.objects.all()
     
@@ -20,8 +25,11 @@ def driver_list(request):
             Q(name__icontains=search) | Q(license_number__icontains=search)
         )
     
+    page = paginate_keyset(request, drivers, ['-created_at', '-id'])
+    
     context = {
-        'drivers': drivers,
+        'drivers': page.object_list,
+        'page': page,
         'status_choices': Driver.STATUS_CHOICES,
     }
     return render(request, 'drivers/driver_list.html', context)
@@ -67,7 +75,7 @@ def driver_delete(request, pk):
 
 @login_required
 def driver_detail(request, pk):
-    driver = get_object_or_404(Driver, pk=pk)
+    driver = get_object_or_404(Driver.objects.with_performance(), pk=pk)
     
     context = {
         'driver': driver,
@@ -79,3 +87,14 @@ def driver_detail(request, pk):
     }
     
     return render(request, 'drivers/driver_detail.html', context)
+
+@login_required
+def driver_lookup(request):
+    """Typeahead endpoint returning matching drivers as id/label pairs"""
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 20)), 50))
+    except ValueError:
+        limit = 20
+    
+    matches = search_choices(Driver, request.GET.get('q', '').strip(), request.GET.get('status'), limit)
+    return JsonResponse([{'id': pk, 'label': label} for pk, label in matches], safe=False)
@@ -0,0 +1,180 @@
+"""Shared plumbing for the REST API: sparse fieldsets, keyset pagination and the compact format"""
+from django.utils import timezone
+from rest_framework import serializers, viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.settings import ISO_8601
+from rest_framework.response import Response
+
+from analytics import watermarks
+from .pagination import PAGE_SIZE, paginate_keyset
+
+MAX_PAGE_SIZE = 500
+MAX_COLUMN_PLANS = 1000
+
+
+def requested_fields(request):
+    """Field names from ?fields=a,b,c, or None for all of them"""
+    raw = request.query_params.get('fields') if request is not None else None
+    if not raw:
+        return None
+    return [name for name in raw.split(',') if name]
+
+
+class SparseFieldsetSerializer(serializers.ModelSerializer):
+    """ModelSerializer that drops every field not named in ?fields="""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        wanted = requested_fields(self.context.get('request'))
+        if wanted is None:
+            return
+        unknown = set(wanted) - set(self.fields)
+        if unknown:
+            raise ValidationError({'fields': f'Unknown fields: {", ".join(sorted(unknown))}'})
+        for name in set(self.fields) - set(wanted) - {'id'}:
+            self.fields.pop(name)
+
+
+class CompactJSONRenderer(JSONRenderer):
+    """?format=compact: list pages as column names once plus one array per row,
+    the same shape the telemetry endpoint accepts"""
+    format = 'compact'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict) and isinstance(data.get('results'), list):
+            rows = data['results']
+            fields = list(rows[0]) if rows else []
+            data = {key: value for key, value in data.items() if key != 'results'}
+            data['fields'] = fields
+            data['rows'] = [[row[name] for name in fields] for row in rows]
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+class KeysetPagination(BasePagination):
+    """DRF adapter for fleetflow.pagination: ?after=/?before= cursors and ?page_size=,
+    ordered by the view's keyset_ordering"""
+
+    def paginate_queryset(self, queryset, request, view=None):
+        try:
+            page_size = min(int(request.query_params.get('page_size', PAGE_SIZE)), MAX_PAGE_SIZE)
+        except ValueError:
+            page_size = PAGE_SIZE
+        self.request = request
+        self.page = paginate_keyset(request, queryset, view.keyset_ordering, max(page_size, 1))
+        return list(self.page)
+
+    def _link(self, url):
+        return self.request.build_absolute_uri(self.request.path + url) if url else None
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self._link(self.page.next_url),
+            'previous': self._link(self.page.previous_url),
+            'results': data,
+        })
+
+
+_column_plans = {}
+
+# Field types whose database value already is their JSON representation
+_PASSTHROUGH_FIELDS = (
+    serializers.IntegerField, serializers.CharField, serializers.ChoiceField, serializers.BooleanField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+def _representer(field):
+    """Fast equivalent of field.to_representation for a raw column value, or None when
+    the value can be used as is"""
+    if isinstance(field, _PASSTHROUGH_FIELDS):
+        return None
+    iso = getattr(field, 'format', ISO_8601)
+    if isinstance(field, serializers.DateTimeField) and iso is not None and iso.lower() == ISO_8601:
+        tz = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+
+        def datetime_iso(value):
+            value = value.astimezone(tz).isoformat() if tz is not None else value.isoformat()
+            return value[:-6] + 'Z' if value.endswith('+00:00') else value
+        return datetime_iso
+    if isinstance(field, serializers.DateField) and iso is not None and iso.lower() == ISO_8601:
+        return lambda value: value.isoformat()
+    return field.to_representation
+
+
+class FleetViewSet(viewsets.ModelViewSet):
+    """Model viewset whose queries load only the columns and joins the requested fields need.
+
+    List pages skip model instances and the serializer altogether: they read
+    values() rows and convert each column the way its serializer field would.
+    Subclasses set queryset, serializer_class and keyset_ordering; the
+    ordering must end in a unique key and should match an index. Lists
+    answer 304 Not Modified while the watermarks of watermark_tables (by
+    default the queryset's model) stay put.
+    """
+    pagination_class = KeysetPagination
+    renderer_classes = [JSONRenderer, CompactJSONRenderer, BrowsableAPIRenderer]
+    keyset_ordering = ['-created_at', '-id']
+    watermark_tables = None
+
+    def _read_columns(self):
+        """(name, lookup path, representer) per serialized field, or None if some field is not a plain column.
+
+        Building a ModelSerializer's fields costs more than formatting a page,
+        so the plan is kept per viewset, ?fields= value and time zone.
+        """
+        key = (type(self), self.request.query_params.get('fields'), timezone.get_current_timezone_name())
+        if key not in _column_plans:
+            if len(_column_plans) >= MAX_COLUMN_PLANS:
+                _column_plans.clear()
+            columns = []
+            for name, field in self.get_serializer().fields.items():
+                if field.write_only:
+                    continue
+                if field.source == '*' or isinstance(field, (
+                        serializers.SerializerMethodField, serializers.ManyRelatedField, serializers.BaseSerializer)):
+                    columns = None
+                    break
+                columns.append((name, field.source.replace('.', '__'), _representer(field)))
+            _column_plans[key] = columns
+        return _column_plans[key]
+
+    def filter_queryset(self, queryset):
+        # django-filter builds a FilterSet and its form even when no filter was asked for
+        if not set(getattr(self, 'filterset_fields', ())) & set(self.request.query_params):
+            return queryset
+        return super().filter_queryset(queryset)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        columns = self._read_columns() if self.request.method in ('GET', 'HEAD') else None
+        if columns is None:
+            return queryset
+        paths = {order.lstrip('-') for order in self.keyset_ordering} | {path for _, path, _ in columns}
+        joins = {path.rsplit('__', 1)[0] for path in paths if '__' in path}
+        if joins:
+            queryset = queryset.select_related(*joins)
+        return queryset.only(*paths)
+
+    def list(self, request, *args, **kwargs):
+        return watermarks.respond(
+            request, self.watermark_tables or (self.queryset.model,), lambda: self._list(request),
+            extra=(request.accepted_renderer.format,),
+        )
+
+    def _list(self, request):
+        columns = self._read_columns()
+        if columns is None:
+            return super().list(request)
+        paths = {order.lstrip('-') for order in self.keyset_ordering} | {path for _, path, _ in columns}
+        queryset = self.filter_queryset(self.get_queryset()).values(*paths)
+        page = self.paginate_queryset(queryset)
+        data = []
+        for row in (page if page is not None else queryset):
+            item = {}
+            for name, path, represent in columns:
+                value = row[path]
+                item[name] = value if represent is None or value is None else represent(value)
+            data.append(item)
+        return self.get_paginated_response(data) if page is not None else Response(data)
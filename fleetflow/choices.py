@@ -0,0 +1,89 @@
+import time
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete
+from django.utils.functional import SimpleLazyObject
+
+# Safety net for writes that bypass model signals (queryset.update())
+CHOICES_TIMEOUT = 60 * 60
+
+# model label -> (display field, unique code field), mirroring each model's __str__
+LABEL_FIELDS = {
+    'vehicles.vehicle': ('name', 'license_plate'),
+    'drivers.driver': ('name', 'license_number'),
+}
+
+
+def _version_key(model):
+    return f'choices:{model._meta.label_lower}:version'
+
+
+def _version(model):
+    key = _version_key(model)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so a lost counter never revives old entries
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_choices(model):
+    """Drop every cached choice list of model by moving to a new version"""
+    try:
+        cache.incr(_version_key(model))
+    except ValueError:
+        cache.set(_version_key(model), time.time_ns(), None)
+
+
+def _label_fields(model):
+    return LABEL_FIELDS[model._meta.label_lower]
+
+
+def _as_choices(queryset, model):
+    name_field, code_field = _label_fields(model)
+    return [
+        (pk, f'{name} ({code})')
+        for pk, name, code in queryset.values_list('pk', name_field, code_field)
+    ]
+
+
+def choice_list(model, status=None):
+    """Cached (id, label) tuples for model, optionally limited to one status"""
+    key = f'choices:{model._meta.label_lower}:{status or "all"}:{_version(model)}'
+    choices = cache.get(key)
+    if choices is None:
+        queryset = model.objects.order_by(_label_fields(model)[0], 'pk')
+        if status:
+            queryset = queryset.filter(status=status)
+        choices = _as_choices(queryset, model)
+        cache.set(key, choices, CHOICES_TIMEOUT)
+    return choices
+
+
+def lazy_choice_list(model, status=None):
+    """choice_list() deferred until a template actually iterates it"""
+    return SimpleLazyObject(lambda: choice_list(model, status))
+
+
+def search_choices(model, term, status=None, limit=20):
+    """Up to limit (id, label) matches on the label fields, for typeahead lookups"""
+    name_field, code_field = _label_fields(model)
+    queryset = model.objects.order_by(name_field, 'pk')
+    if term:
+        queryset = queryset.filter(
+            Q(**{f'{name_field}__icontains': term}) | Q(**{f'{code_field}__icontains': term})
+        )
+    if status:
+        queryset = queryset.filter(status=status)
+    return _as_choices(queryset[:limit], model)
+
+
+def _invalidate_on_change(sender, **kwargs):
+    invalidate_choices(sender)
+
+
+def connect_invalidation(model):
+    post_save.connect(_invalidate_on_change, sender=model, dispatch_uid=f'choices_save_{model._meta.label_lower}')
+    post_delete.connect(_invalidate_on_change, sender=model, dispatch_uid=f'choices_delete_{model._meta.label_lower}')
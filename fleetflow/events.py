@@ -0,0 +1,132 @@
+"""In-process publish/subscribe for vehicle, driver and trip status changes.
+
+Events sit in a bounded ring buffer under increasing ids; readers block on a
+condition until something newer than the last id they saw arrives. The bus
+lives in one process, so with several worker processes a subscriber only sees
+changes made by its own process (see DEPLOYMENT.md).
+"""
+import threading
+from collections import deque
+from contextlib import contextmanager
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+BUFFER_SIZE = 10000
+HEARTBEAT_SECONDS = 15
+RECONNECT_MS = 3000
+POLL_TIMEOUT_SECONDS = 25
+# Streams end after this long and EventSource reconnects with Last-Event-ID,
+# so a worker thread is never held by one client forever
+MAX_STREAM_SECONDS = 300
+MAX_SUBSCRIBERS = 500
+
+
+class TooManySubscribers(Exception):
+    """Every subscriber slot is taken"""
+
+
+class EventBus:
+    def __init__(self, size=BUFFER_SIZE, max_subscribers=MAX_SUBSCRIBERS):
+        self._events = deque(maxlen=size)
+        self._last_id = 0
+        self._condition = threading.Condition()
+        self._subscribers = 0
+        self._max_subscribers = max_subscribers
+
+    @property
+    def last_id(self):
+        return self._last_id
+
+    def publish(self, events):
+        with self._condition:
+            for event in events:
+                self._last_id += 1
+                self._events.append({'id': self._last_id, **event})
+            self._condition.notify_all()
+
+    def read(self, after, timeout=0):
+        """(events newer than after, missed, new cursor), waiting up to timeout seconds for one.
+
+        missed is True when events after the cursor already fell out of the
+        buffer (or the cursor came from another process), so the reader
+        should reload its full state.
+        """
+        with self._condition:
+            if timeout and self._last_id == after:
+                self._condition.wait_for(lambda: self._last_id != after, timeout)
+            if after > self._last_id:
+                return [], True, self._last_id
+            oldest = self._events[0]['id'] if self._events else self._last_id + 1
+            missed = after + 1 < oldest
+            start = max(after + 1 - oldest, 0)
+            return list(islice(self._events, start, None)), missed, self._last_id
+
+    def subscribe(self):
+        """Take a subscriber slot; call the returned function to give it back"""
+        with self._condition:
+            if self._subscribers >= self._max_subscribers:
+                raise TooManySubscribers
+            self._subscribers += 1
+        released = threading.Event()
+
+        def release():
+            if not released.is_set():
+                released.set()
+                with self._condition:
+                    self._subscribers -= 1
+        return release
+
+
+bus = EventBus()
+
+
+def status_change(entity, pk, status, previous, region, cause, trip=None):
+    """One event dict: entity is 'vehicle', 'driver' or 'trip', cause the action behind it"""
+    return {
+        'entity': entity,
+        'pk': pk,
+        'status': status,
+        'previous': previous,
+        'region': region,
+        'cause': cause,
+        'trip': trip,
+        'at': timezone.now().isoformat(),
+    }
+
+
+_local = threading.local()
+
+
+@contextmanager
+def published_by_caller():
+    """Saves inside the block leave their status events to the caller, which publishes them with a cause"""
+    depth = getattr(_local, 'depth', 0)
+    _local.depth = depth + 1
+    try:
+        yield
+    finally:
+        _local.depth = depth
+
+
+def saves_publish():
+    """Whether save and delete hooks should publish the status changes they see"""
+    return not getattr(_local, 'depth', 0)
+
+
+def publish(events):
+    """Publish once the surrounding transaction commits, so rolled back changes are never seen"""
+    events = [event for event in events if event['status'] != event['previous']]
+    if events:
+        transaction.on_commit(lambda: bus.publish(events))
+
+
+def matches(event, entities=None, regions=None, statuses=None):
+    """Filter on entity, vehicle region and status; a status filter also
+    matches changes away from that status so watchers see rows leave"""
+    return (
+        (not entities or event['entity'] in entities)
+        and (not regions or event['region'] in regions)
+        and (not statuses or event['status'] in statuses or event['previous'] in statuses)
+    )
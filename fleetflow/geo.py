@@ -0,0 +1,79 @@
+import math
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+# Along a meridian, on the same sphere haversine_km measures
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# Fixed lat/lon grid; a cell is row * GRID_COLUMNS + column, so the cells of one grid row are contiguous
+CELL_DEGREES = 0.1
+GRID_ROWS = int(round(180 / CELL_DEGREES))
+GRID_COLUMNS = int(round(360 / CELL_DEGREES))
+
+# Nearest-neighbour searches start at this radius and double until they find enough
+INITIAL_SEARCH_KM = 10.0
+MAX_SEARCH_KM = math.pi * EARTH_RADIUS_KM
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between every point of the first set (rows) and the second (columns)"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=float)) for a in (lat1, lon1, lat2, lon2))
+    d = np.sin((lat1[:, None] - lat2[None, :]) / 2) ** 2
+    d += np.cos(lat1)[:, None] * np.cos(lat2)[None, :] * np.sin((lon1[:, None] - lon2[None, :]) / 2) ** 2
+    np.sqrt(d, out=d)
+    np.minimum(d, 1.0, out=d)
+    np.arcsin(d, out=d)
+    d *= 2 * EARTH_RADIUS_KM
+    return d
+
+
+def _row(lat):
+    return min(GRID_ROWS - 1, max(0, int(math.floor((float(lat) + 90) / CELL_DEGREES))))
+
+
+def _column(lon):
+    return min(GRID_COLUMNS - 1, max(0, int(math.floor((float(lon) + 180) / CELL_DEGREES))))
+
+
+def cell_for(lat, lon):
+    """Grid cell containing a position, or None when it is unknown"""
+    if lat is None or lon is None:
+        return None
+    return _row(lat) * GRID_COLUMNS + _column(lon)
+
+
+def cell_ranges(lat, lon, radius_km):
+    """(first, last) cell pairs covering every point within radius_km, in cell order.
+
+    A grid row gets one pair, or two when the area crosses the ±180°
+    meridian and wraps round to the other edge of the grid.
+    """
+    lat, lon = float(lat), float(lon)
+    lat_span = radius_km / KM_PER_DEGREE
+    south, north = max(-90.0, lat - lat_span), min(90.0, lat + lat_span)
+    # Longitude degrees shrink towards the poles; size the box for the widest row it touches
+    widest = max(abs(south), abs(north))
+    cos_lat = math.cos(math.radians(widest)) if widest < 90 else 0
+    if cos_lat <= 0 or radius_km / (KM_PER_DEGREE * cos_lat) >= 180:
+        columns = [(0, GRID_COLUMNS - 1)]
+    else:
+        lon_span = radius_km / (KM_PER_DEGREE * cos_lat)
+        west, east = lon - lon_span, lon + lon_span
+        if west < -180:
+            columns = [(0, _column(east)), (_column(west + 360), GRID_COLUMNS - 1)]
+        elif east > 180:
+            columns = [(0, _column(east - 360)), (_column(west), GRID_COLUMNS - 1)]
+        else:
+            columns = [(_column(west), _column(east))]
+
+    ranges = []
+    for row in range(_row(south), _row(north) + 1):
+        for first_col, last_col in columns:
+            first, last = row * GRID_COLUMNS + first_col, row * GRID_COLUMNS + last_col
+            if ranges and ranges[-1][1] + 1 >= first:
+                # Full-width rows, and a row's east edge with the next row's west edge, are contiguous
+                ranges[-1] = (ranges[-1][0], max(ranges[-1][1], last))
+            else:
+                ranges.append((first, last))
+    return ranges
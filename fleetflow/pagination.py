@@ -0,0 +1,108 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+PAGE_SIZE = 50
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+
+def decode_cursor(cursor, ordering):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != len(ordering):
+        return None
+    return values
+
+
+def _seek(ordering, values, forward):
+    """Rows strictly past values in the given ordering, e.g. (a < x) OR (a = x AND b < y)"""
+    condition = Q()
+    equal = Q()
+    for order, value in zip(ordering, values):
+        field = order.lstrip('-')
+        descending = order.startswith('-')
+        lookup = 'lt' if descending == forward else 'gt'
+        condition |= equal & Q(**{f'{field}__{lookup}': value})
+        equal &= Q(**{field: value})
+    return condition
+
+
+class KeysetPage:
+    def __init__(self, request, object_list, ordering, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self._request = request
+        self._ordering = ordering
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def _cursor(self, obj):
+        if isinstance(obj, dict):
+            return encode_cursor([obj[order.lstrip('-')] for order in self._ordering])
+        return encode_cursor([getattr(obj, order.lstrip('-')) for order in self._ordering])
+
+    def _url(self, key, obj):
+        params = self._request.GET.copy()
+        params.pop('after', None)
+        params.pop('before', None)
+        if obj is not None:
+            params[key] = self._cursor(obj)
+        return f'?{params.urlencode()}'
+
+    @property
+    def next_url(self):
+        return self._url('after', self.object_list[-1]) if self.has_next else None
+
+    @property
+    def previous_url(self):
+        return self._url('before', self.object_list[0]) if self.has_previous else None
+
+    @property
+    def first_url(self):
+        return self._url(None, None)
+
+
+def paginate_keyset(request, queryset, ordering, page_size=PAGE_SIZE):
+    """Cursor-paginate queryset on ordering (which must end in a unique key).
+
+    Reads ?after=/&before= cursors from the request. Each page is one LIMIT
+    query that seeks past the cursor, so deep pages cost the same as the
+    first and no COUNT(*) is needed.
+    """
+    after = decode_cursor(request.GET.get('after', ''), ordering)
+    before = decode_cursor(request.GET.get('before', ''), ordering) if after is None else None
+
+    try:
+        if before is not None:
+            seek = queryset.filter(_seek(ordering, before, forward=False))
+        elif after is not None:
+            seek = queryset.filter(_seek(ordering, after, forward=True))
+        else:
+            seek = queryset
+    except (ValidationError, ValueError, TypeError):
+        # A tampered cursor falls back to the first page
+        before = after = None
+        seek = queryset
+
+    if before is not None:
+        reverse_ordering = [order[1:] if order.startswith('-') else f'-{order}' for order in ordering]
+        rows = list(seek.order_by(*reverse_ordering)[:page_size + 1])
+        has_previous = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        return KeysetPage(request, rows, ordering, has_next=bool(rows), has_previous=has_previous)
+
+    rows = list(seek.order_by(*ordering)[:page_size + 1])
+    return KeysetPage(request, rows[:page_size], ordering, has_next=len(rows) > page_size,
+                      has_previous=after is not None)
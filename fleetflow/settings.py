@@ -24,6 +24,7 @@ INSTALLED_APPS = [
     'trips',
     'maintenance',
     'analytics',
+    'jobs',
 ]
 
 MIDDLEWARE = [
@@ -93,6 +94,32 @@ DEFAULT_FROM_EMAIL = config('EMAIL_HOST_USER', default='noreply@fleetflow.com')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Shared secret GPS trackers send in the X-Telemetry-Token header; ingestion is off while empty
+TELEMETRY_TOKEN = config('TELEMETRY_TOKEN', default='')
+
+# Per-process memory cache by default; point CACHE_DIR at a directory shared by
+# every worker so they reuse each other's analytics results
+CACHE_DIR = config('CACHE_DIR', default='')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_DIR,
+    } if CACHE_DIR else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Analytics results (analytics.cache): how long one is kept, and for how long
+# after it was computed an outdated one may still be served while it refreshes
+ANALYTICS_CACHE_TIMEOUT = config('ANALYTICS_CACHE_TIMEOUT', default=60 * 60, cast=int)
+ANALYTICS_CACHE_STALE_SECONDS = config('ANALYTICS_CACHE_STALE_SECONDS', default=30, cast=int)
+
+# Finished PDF reports, one per data version (analytics.reports); keep it out of MEDIA_ROOT
+REPORTS_DIR = config('REPORTS_DIR', default=str(BASE_DIR / 'reports'))
+
+# Files produced by background jobs (jobs.queue), one directory per job
+JOBS_DIR = config('JOBS_DIR', default=str(BASE_DIR / 'job_files'))
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
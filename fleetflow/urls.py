@@ -1,8 +1,21 @@
 from django.contrib import admin
 from django.urls import path, include
+from rest_framework.routers import DefaultRouter
 from django.conf import settings
 from django.conf.urls.static import static
 from core import views as core_views
+from vehicles.api import VehicleViewSet
+from drivers.api import DriverViewSet
+from trips.api import TripViewSet
+from maintenance.api import MaintenanceLogViewSet, FuelLogViewSet, ExpenseViewSet
+
+router = DefaultRouter()
+router.register('vehicles', VehicleViewSet)
+router.register('drivers', DriverViewSet)
+router.register('trips', TripViewSet)
+router.register('maintenance', MaintenanceLogViewSet)
+router.register('fuel', FuelLogViewSet)
+router.register('expenses', ExpenseViewSet)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -13,6 +26,8 @@ urlpatterns = [
     path('trips/', include('trips.urls')),
     path('maintenance/', include('maintenance.urls')),
     path('analytics/', include('analytics.urls')),
+    path('jobs/', include('jobs.urls')),
+    path('api/', include(router.urls)),
 ]
 
 if settings.DEBUG:
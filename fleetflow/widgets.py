@@ -0,0 +1,38 @@
+from django import forms
+from django.utils.html import format_html
+
+
+class TypeaheadSelect(forms.Select):
+    """Select that renders only the chosen option and fetches the rest on demand.
+
+    The search box next to it queries url (a typeahead endpoint returning
+    [{"id": ..., "label": ...}]) so forms no longer render every row as an
+    <option>. The field's queryset still validates the submitted value.
+    """
+
+    def __init__(self, url, attrs=None):
+        super().__init__(attrs)
+        self.url = url
+
+    def optgroups(self, name, value, attrs=None):
+        selected = [v for v in value if v not in (None, '')]
+        choices = [('', '---------')]
+        if selected and hasattr(self.choices, 'queryset'):
+            choices += [self.choices.choice(obj) for obj in self.choices.queryset.filter(pk__in=selected)]
+
+        groups = []
+        for index, (option_value, option_label) in enumerate(choices):
+            option = self.create_option(
+                name, option_value, option_label, str(option_value) in selected, index, attrs=attrs
+            )
+            groups.append((None, [option], index))
+        return groups
+
+    def render(self, name, value, attrs=None, renderer=None):
+        select = super().render(name, value, attrs, renderer)
+        select_id = (attrs or {}).get('id') or self.attrs.get('id') or f'id_{name}'
+        return format_html(
+            '<input type="search" class="form-input mb-1" placeholder="Search..." autocomplete="off" '
+            'data-typeahead-url="{}" data-typeahead-for="{}">{}',
+            self.url, select_id, select,
+        )
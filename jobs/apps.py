@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+class JobsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'jobs'
+    
+    def ready(self):
+        from django.utils.module_loading import autodiscover_modules
+        # Each app registers its background tasks in a tasks module
+        autodiscover_modules('tasks')
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.queue import remove_files
+
+
+class Command(BaseCommand):
+    help = 'Delete finished background jobs and the files they produced'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=float, default=7,
+                            help='Keep jobs that finished within this many days')
+
+    def handle(self, *args, **options):
+        if options['days'] < 0:
+            raise CommandError('--days must not be negative')
+
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        finished = Job.objects.exclude(status__in=Job.ACTIVE_STATUSES).filter(finished_at__lt=cutoff)
+        ids = list(finished.values_list('pk', flat=True))
+        for pk in ids:
+            remove_files(pk)
+        Job.objects.filter(pk__in=ids).delete()
+        self.stdout.write(self.style.SUCCESS(f'Purged {len(ids)} finished jobs'))
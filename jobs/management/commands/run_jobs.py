@@ -0,0 +1,58 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from jobs.process import serve
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs until stopped (SIGTERM/Ctrl-C lets running jobs finish first)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1,
+                            help='Worker processes; use several to spread CPU-bound jobs over cores')
+        parser.add_argument('--threads', type=int, default=2,
+                            help='Jobs run at once in each process')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds an idle worker waits before looking for new jobs')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once no job is due instead of waiting for more')
+
+    def handle(self, *args, **options):
+        processes, threads = options['processes'], options['threads']
+        if processes < 1 or threads < 1 or options['poll_interval'] <= 0:
+            raise CommandError('--processes, --threads and --poll-interval must be positive')
+
+        self.stdout.write(f'Running jobs on {processes} process(es) x {threads} thread(s)')
+        if processes == 1:
+            worker = Worker(threads, options['poll_interval'], options['burst'])
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda *args: worker.stop.set())
+            worker.run()
+        else:
+            self._run_processes(processes, threads, options['poll_interval'], options['burst'])
+        self.stdout.write(self.style.SUCCESS('Job worker stopped'))
+
+    def _run_processes(self, processes, threads, poll_interval, burst):
+        # spawn, not fork: children must not share this process's database connections
+        context = multiprocessing.get_context('spawn')
+        connections.close_all()
+        children = [
+            context.Process(target=serve, args=(threads, poll_interval, burst), name=f'job-worker-{i}')
+            for i in range(processes)
+        ]
+        for child in children:
+            child.start()
+
+        def stop(*args):
+            for child in children:
+                if child.is_alive():
+                    child.terminate()
+
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, stop)
+        for child in children:
+            child.join()
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.db import models
+
+
+class Job(models.Model):
+    """One unit of background work, queued in the database and run by `manage.py run_jobs`"""
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),
+        ('RUNNING', 'Running'),
+        ('SUCCEEDED', 'Succeeded'),
+        ('FAILED', 'Failed'),
+        ('CANCELLED', 'Cancelled'),
+    ]
+    ACTIVE_STATUSES = ('QUEUED', 'RUNNING')
+    
+    kind = models.CharField(max_length=100)
+    params = models.JSONField(default=dict, blank=True)
+    # Hash of kind and params, so identical requests share one active job
+    key = models.CharField(max_length=40, db_index=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='QUEUED')
+    progress = models.FloatField(default=0)
+    message = models.CharField(max_length=200, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    cancel_requested = models.BooleanField(default=False)
+    run_after = models.DateTimeField()
+    worker = models.CharField(max_length=100, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+    
+    class Meta:
+        db_table = 'jobs'
+        ordering = ['-created_at']
+        indexes = [
+            # Workers look for due work in queue order
+            models.Index(fields=['status', 'run_after', 'id'], name='jobs_due_idx'),
+            models.Index(fields=['created_by', 'created_at'], name='jobs_owner_idx'),
+        ]
@@ -0,0 +1,18 @@
+"""Entry point for worker processes started by run_jobs --processes.
+
+Kept free of model imports: spawned processes import this module before
+Django is set up.
+"""
+import signal
+
+
+def serve(threads, poll_interval, burst):
+    import django
+    django.setup()
+    from .worker import Worker
+
+    worker = Worker(threads, poll_interval, burst)
+    # The parent asks children to stop with SIGTERM; finish running jobs first
+    signal.signal(signal.SIGTERM, lambda *args: worker.stop.set())
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    worker.run()
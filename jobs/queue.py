@@ -0,0 +1,122 @@
+"""Task registry and the enqueue/cancel side of the job queue.
+
+Apps register functions in their tasks module with @task('app.name'); a
+task is called as func(ctx, **params) by a worker and returns a JSON-able
+result. Long tasks report through ctx.progress(), which is also where a
+cancellation request reaches them.
+"""
+import hashlib
+import json
+import shutil
+import threading
+from collections import namedtuple
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Job
+
+# Seconds before the first retry; doubles with every further attempt
+RETRY_DELAY = 30
+# A running job reports at most this often, so progress updates stay cheap
+PROGRESS_INTERVAL = 1.0
+
+Task = namedtuple('Task', ['func', 'max_attempts', 'retry_delay'])
+TASKS = {}
+
+
+class Cancelled(Exception):
+    """Raised inside a task once its job has been cancelled"""
+
+
+def task(name, max_attempts=3, retry_delay=RETRY_DELAY):
+    """Register func under name as a background task"""
+    def decorator(func):
+        TASKS[name] = Task(func, max_attempts, retry_delay)
+        return func
+    return decorator
+
+
+def job_key(kind, params):
+    return hashlib.sha1(json.dumps([kind, params], sort_keys=True, default=str).encode()).hexdigest()
+
+
+def enqueue(kind, params=None, user=None, unique=True):
+    """Queue a job, or with unique return the user's queued or running job for the same kind and params.
+
+    Jobs are only shared within one user, who is the only one (staff aside)
+    allowed to see them.
+    """
+    if kind not in TASKS:
+        raise KeyError(f'Unknown task {kind}')
+    params = params or {}
+    key = job_key(kind, params)
+    created_by = user if user and user.is_authenticated else None
+    with transaction.atomic():
+        if unique:
+            existing = Job.objects.filter(
+                key=key, created_by=created_by, status__in=Job.ACTIVE_STATUSES
+            ).order_by('pk').first()
+            if existing:
+                return existing
+        return Job.objects.create(
+            kind=kind, params=params, key=key, run_after=timezone.now(),
+            max_attempts=TASKS[kind].max_attempts, created_by=created_by,
+        )
+
+
+def cancel(job):
+    """Cancel a queued job at once, or ask a running one to stop; returns whether anything changed"""
+    now = timezone.now()
+    if Job.objects.filter(pk=job.pk, status='QUEUED').update(status='CANCELLED', finished_at=now):
+        return True
+    return bool(Job.objects.filter(pk=job.pk, status='RUNNING').update(cancel_requested=True))
+
+
+def job_dir(job_id):
+    """Directory for the files a job produces"""
+    return Path(settings.JOBS_DIR) / str(job_id)
+
+
+def remove_files(job_id):
+    shutil.rmtree(job_dir(job_id), ignore_errors=True)
+
+
+class JobContext:
+    """What a running task sees of its job"""
+
+    def __init__(self, job, cancelled=None):
+        self.job = job
+        self._cancelled = cancelled or threading.Event()
+        self._reported = 0.0
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def check(self):
+        """Raise Cancelled if the job was cancelled"""
+        if self.cancelled:
+            raise Cancelled
+
+    def progress(self, fraction, message=''):
+        """Record progress as a fraction from 0 to 1, and stop here if the job was cancelled"""
+        self.check()
+        now = timezone.now()
+        if now.timestamp() - self._reported >= PROGRESS_INTERVAL or fraction >= 1:
+            self._reported = now.timestamp()
+            cancel_requested = Job.objects.filter(pk=self.job.pk).values_list('cancel_requested', flat=True).first()
+            if cancel_requested:
+                self._cancelled.set()
+                raise Cancelled
+            Job.objects.filter(pk=self.job.pk, status='RUNNING').update(
+                progress=min(max(fraction, 0), 1), message=message[:200], heartbeat_at=now
+            )
+
+    def path(self, filename):
+        """Where to write an output file; name it in the result as {'file': filename}"""
+        directory = job_dir(self.job.pk)
+        directory.mkdir(parents=True, exist_ok=True)
+        return directory / filename
@@ -0,0 +1,71 @@
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+
+from .models import Job
+from . import queue
+
+RECENT_JOBS = 50
+
+
+def _visible_jobs(user):
+    jobs = Job.objects.all()
+    return jobs if user.is_staff else jobs.filter(created_by=user)
+
+
+def job_json(job):
+    data = {
+        'id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': round(job.progress, 3),
+        'message': job.message,
+        'result': job.result,
+        'error': job.error,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'cancel_requested': job.cancel_requested,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+        'status_url': reverse('job_detail', args=[job.pk]),
+    }
+    if job.status == 'SUCCEEDED' and isinstance(job.result, dict) and job.result.get('file'):
+        data['download_url'] = reverse('job_download', args=[job.pk])
+    return data
+
+
+@login_required
+def job_list(request):
+    """The user's most recent jobs, optionally filtered by ?status="""
+    jobs = _visible_jobs(request.user)
+    if request.GET.get('status'):
+        jobs = jobs.filter(status=request.GET['status'])
+    return JsonResponse({'jobs': [job_json(job) for job in jobs[:RECENT_JOBS]]})
+
+
+@login_required
+def job_detail(request, pk):
+    return JsonResponse(job_json(get_object_or_404(_visible_jobs(request.user), pk=pk)))
+
+
+@login_required
+@require_POST
+def job_cancel(request, pk):
+    job = get_object_or_404(_visible_jobs(request.user), pk=pk)
+    if not queue.cancel(job):
+        return JsonResponse({'error': f'Job is already {job.get_status_display().lower()}'}, status=409)
+    job.refresh_from_db()
+    return JsonResponse(job_json(job))
+
+
+@login_required
+def job_download(request, pk):
+    job = get_object_or_404(_visible_jobs(request.user), pk=pk, status='SUCCEEDED')
+    filename = job.result.get('file') if isinstance(job.result, dict) else None
+    path = queue.job_dir(job.pk) / filename if filename else None
+    if path is None or path.name != filename or not path.is_file():
+        raise Http404('This job has no file to download')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=filename)
@@ -0,0 +1,154 @@
+"""Runs queued jobs on a pool of threads in this process.
+
+Jobs are claimed with a conditional UPDATE from QUEUED to RUNNING, so any
+number of worker processes can share the table without a broker or row
+locks: when two reach for the same job exactly one update matches. Running
+jobs send heartbeats; a job whose worker stops beating (killed, machine
+lost) is put back in the queue as a failed attempt.
+"""
+import logging
+import os
+import socket
+import threading
+from datetime import timedelta
+
+from django.db import close_old_connections, connections
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+from .queue import TASKS, Cancelled, JobContext
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_SECONDS = 10
+# Running jobs whose last heartbeat is older than this are presumed orphaned
+STALE_AFTER = timedelta(seconds=HEARTBEAT_SECONDS * 6)
+CLAIM_CANDIDATES = 10
+MAX_ERROR_LENGTH = 500
+
+
+def _error_message(exc):
+    """What a failed job shows its owner: the message of a ValueError (bad input), else only the kind of failure.
+
+    The traceback goes to the log; it names files and internals owners must not see.
+    """
+    if isinstance(exc, ValueError) and str(exc):
+        return str(exc).splitlines()[0][:MAX_ERROR_LENGTH]
+    return f'{type(exc).__name__}; see the worker log for details'
+
+
+def _retry_at(job, delay):
+    return timezone.now() + timedelta(seconds=delay * 2 ** max(job.attempts - 1, 0))
+
+
+class Worker:
+    def __init__(self, threads=1, poll_interval=1.0, burst=False):
+        self.threads = threads
+        self.poll_interval = poll_interval
+        # Burst mode: exit once the queue has nothing due instead of waiting for more
+        self.burst = burst
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self.stop = threading.Event()
+        self._running = {}
+        self._running_lock = threading.Lock()
+
+    def run(self):
+        pool = [threading.Thread(target=self._loop, name=f'job-worker-{i}', daemon=True) for i in range(self.threads)]
+        heartbeat = threading.Thread(target=self._heartbeat, name='job-heartbeat', daemon=True)
+        heartbeat.start()
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        self.stop.set()
+        heartbeat.join()
+
+    def _loop(self):
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                job = self.claim()
+                if job is not None:
+                    self.execute(job)
+                elif self.burst:
+                    return
+                else:
+                    self.stop.wait(self.poll_interval)
+        finally:
+            connections.close_all()
+
+    def _heartbeat(self):
+        try:
+            while not self.stop.wait(HEARTBEAT_SECONDS):
+                close_old_connections()
+                with self._running_lock:
+                    running = dict(self._running)
+                if running:
+                    Job.objects.filter(pk__in=running, worker=self.name).update(heartbeat_at=timezone.now())
+                    for pk in Job.objects.filter(pk__in=running, cancel_requested=True).values_list('pk', flat=True):
+                        running[pk].set()
+                self.requeue_stale()
+        finally:
+            connections.close_all()
+
+    def requeue_stale(self):
+        """Put jobs of dead workers back in the queue, or fail them when out of attempts"""
+        cutoff = timezone.now() - STALE_AFTER
+        for job in Job.objects.filter(status='RUNNING', heartbeat_at__lt=cutoff):
+            self._finish_failed(job, 'Worker stopped responding', expected_worker=job.worker)
+
+    def claim(self):
+        """Take the oldest due job, or None"""
+        now = timezone.now()
+        candidates = list(
+            Job.objects.filter(status='QUEUED', run_after__lte=now)
+            .order_by('run_after', 'id').values_list('pk', flat=True)[:CLAIM_CANDIDATES]
+        )
+        for pk in candidates:
+            claimed = Job.objects.filter(pk=pk, status='QUEUED').update(
+                status='RUNNING', worker=self.name, started_at=now, heartbeat_at=now,
+                attempts=F('attempts') + 1, cancel_requested=False,
+            )
+            if claimed:
+                return Job.objects.get(pk=pk)
+        return None
+
+    def execute(self, job):
+        cancelled = threading.Event()
+        with self._running_lock:
+            self._running[job.pk] = cancelled
+        try:
+            task = TASKS.get(job.kind)
+            if task is None:
+                self._finish(job, 'FAILED', error=f'Unknown task {job.kind}')
+                return
+            try:
+                result = task.func(JobContext(job, cancelled), **job.params)
+            except Cancelled:
+                self._finish(job, 'CANCELLED')
+            except Exception as exc:
+                logger.exception('Job %s (%s) failed', job.pk, job.kind)
+                self._finish_failed(job, _error_message(exc), task.retry_delay)
+            else:
+                self._finish(job, 'SUCCEEDED', result=result, progress=1)
+        finally:
+            with self._running_lock:
+                self._running.pop(job.pk, None)
+
+    def _finish(self, job, status, expected_worker=None, **fields):
+        # Only the worker holding the job may finish it; a requeued job belongs to someone else now
+        Job.objects.filter(pk=job.pk, status='RUNNING', worker=expected_worker or self.name).update(
+            status=status, finished_at=timezone.now(), **fields
+        )
+
+    def _finish_failed(self, job, error, retry_delay=None, expected_worker=None):
+        if retry_delay is None:
+            task = TASKS.get(job.kind)
+            retry_delay = task.retry_delay if task else 0
+        if job.attempts < job.max_attempts:
+            Job.objects.filter(pk=job.pk, status='RUNNING', worker=expected_worker or self.name).update(
+                status='QUEUED', run_after=_retry_at(job, retry_delay), error=error, worker='', progress=0,
+            )
+        else:
+            self._finish(job, 'FAILED', expected_worker=expected_worker, error=error)
@@ -0,0 +1,74 @@
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from fleetflow.api import FleetViewSet
+from vehicles.models import Vehicle
+from .models import MaintenanceLog, FuelLog, Expense
+from .serializers import MaintenanceLogSerializer, MaintenanceLogBatchSerializer, FuelLogSerializer, ExpenseSerializer
+from . import services
+
+
+class MaintenanceLogViewSet(FleetViewSet):
+    # Saving a log moves its vehicle in or out of the shop, as in the HTML views
+    queryset = MaintenanceLog.objects.all()
+    watermark_tables = (MaintenanceLog, Vehicle)
+    serializer_class = MaintenanceLogSerializer
+    keyset_ordering = ['-date', '-id']
+    filterset_fields = ['vehicle', 'status', 'service_type', 'date']
+    http_method_names = ['get', 'post', 'put', 'patch', 'head', 'options']
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """Create up to MAX_BATCH_SIZE logs from a JSON list; invalid items are reported, the rest created.
+
+        Vehicle statuses end up as if the logs had been saved one by one in list order.
+        """
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response({'error': 'Expected a non-empty JSON list of logs'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > services.MAX_BATCH_SIZE:
+            return Response({'error': f'At most {services.MAX_BATCH_SIZE} logs per batch'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # One child serializer for every item, as ListSerializer does, but keeping the valid ones
+        child = MaintenanceLogBatchSerializer(context=self.get_serializer_context())
+        results, valid = [None] * len(items), []
+        for index, item in enumerate(items):
+            try:
+                valid.append((index, child.run_validation(item)))
+            except serializers.ValidationError as e:
+                results[index] = {'ok': False, 'errors': e.detail}
+
+        known = set(Vehicle.objects.filter(pk__in={data['vehicle'] for _, data in valid}).values_list('pk', flat=True))
+        logs, indexes = [], []
+        for index, data in valid:
+            if data['vehicle'] not in known:
+                error = f'Invalid pk "{data["vehicle"]}" - object does not exist.'
+                results[index] = {'ok': False, 'errors': {'vehicle': [error]}}
+                continue
+            data['vehicle_id'] = data.pop('vehicle')
+            logs.append(MaintenanceLog(**data))
+            indexes.append(index)
+
+        for index, log in zip(indexes, services.bulk_add(logs)):
+            results[index] = {'ok': True, 'id': log.pk}
+        return Response({'created': len(logs), 'failed': len(items) - len(logs), 'results': results})
+
+
+class FuelLogViewSet(FleetViewSet):
+    queryset = FuelLog.objects.all()
+    watermark_tables = (FuelLog, Vehicle)
+    serializer_class = FuelLogSerializer
+    keyset_ordering = ['-date', '-id']
+    filterset_fields = ['vehicle', 'date']
+    http_method_names = ['get', 'post', 'head', 'options']
+
+
+class ExpenseViewSet(FleetViewSet):
+    queryset = Expense.objects.all()
+    watermark_tables = (Expense, Vehicle)
+    serializer_class = ExpenseSerializer
+    keyset_ordering = ['-date', '-id']
+    filterset_fields = ['vehicle', 'expense_type', 'date']
+    http_method_names = ['get', 'post', 'head', 'options']
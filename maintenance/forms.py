@@ -1,4 +1,6 @@
 from django import forms
+from django.urls import reverse_lazy
+from fleetflow.widgets import TypeaheadSelect
 from .models import MaintenanceLog, FuelLog, Expense
 
 class MaintenanceLogForm(forms.ModelForm):
@@ -6,7 +8,7 @@ class MaintenanceLogForm(forms.ModelForm):
         model = MaintenanceLog
         fields = ['vehicle', 'service_type', 'cost', 'date', 'status', 'notes']
         widgets = {
-            'vehicle': forms.Select(attrs={'class': 'form-select'}),
+            'vehicle': TypeaheadSelect(reverse_lazy('vehicle_lookup'), attrs={'class': 'form-select'}),
             'service_type': forms.Select(attrs={'class': 'form-select'}),
             'cost': forms.NumberInput(attrs={'class': 'form-input', 'step': '0.01'}),
             'date': forms.DateInput(attrs={'class': 'form-input', 'type': 'date'}),
@@ -19,7 +21,7 @@ class FuelLogForm(forms.ModelForm):
         model = FuelLog
         fields = ['vehicle', 'liters', 'fuel_cost', 'date', 'odometer_reading', 'notes']
         widgets = {
-            'vehicle': forms.Select(attrs={'class': 'form-select'}),
+            'vehicle': TypeaheadSelect(reverse_lazy('vehicle_lookup'), attrs={'class': 'form-select'}),
             'liters': forms.NumberInput(attrs={'class': 'form-input', 'step': '0.01'}),
             'fuel_cost': forms.NumberInput(attrs={'class': 'form-input', 'step': '0.01'}),
             'date': forms.DateInput(attrs={'class': 'form-input', 'type': 'date'}),
@@ -32,7 +34,7 @@ class ExpenseForm(forms.ModelForm):
         model = Expense
         fields = ['vehicle', 'expense_type', 'amount', 'date', 'description']
         widgets = {
-            'vehicle': forms.Select(attrs={'class': 'form-select'}),
+            'vehicle': TypeaheadSelect(reverse_lazy('vehicle_lookup'), attrs={'class': 'form-select'}),
             'expense_type': forms.Select(attrs={'class': 'form-select'}),
             'amount': forms.NumberInput(attrs={'class': 'form-input', 'step': '0.01'}),
             'date': forms.DateInput(attrs={'class': 'form-input', 'type': 'date'}),
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0001_initial'),
+        ('vehicles', '0003_vehicle_vehicles_status_created_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['vehicle', 'date'], name='expense_vehicle_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['expense_type', 'date'], name='expense_type_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['date', 'id'], name='expense_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fuellog',
+            index=models.Index(fields=['vehicle', 'date'], name='fuel_vehicle_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fuellog',
+            index=models.Index(fields=['date', 'id'], name='fuel_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancelog',
+            index=models.Index(fields=['vehicle', 'status'], name='maint_vehicle_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancelog',
+            index=models.Index(fields=['status', 'date'], name='maint_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancelog',
+            index=models.Index(fields=['date', 'id'], name='maint_date_idx'),
+        ),
+    ]
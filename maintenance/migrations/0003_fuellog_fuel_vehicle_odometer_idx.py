@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenance', '0002_expense_expense_vehicle_date_idx_and_more'),
+        ('vehicles', '0006_vehicletrackchunk'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fuellog',
+            index=models.Index(fields=['vehicle', 'odometer_reading'], name='fuel_vehicle_odometer_idx'),
+        ),
+    ]
@@ -31,26 +31,38 @@ class MaintenanceLog(models.Model):
         return f"{self.vehicle.name} - {self.get_service_type_display()} - {self.date}"
     
     def save(self, *args, **kwargs):
+        from fleetflow import events
+        
+        previous = self.vehicle.status
         # Auto-update vehicle status based on maintenance status
-        if self.status in ['PENDING', 'IN_PROGRESS']:
-            self.vehicle.status = 'IN_SHOP'
-            self.vehicle.save()
-        elif self.status == 'COMPLETED':
-            # Only set to available if no other pending maintenance
-            other_pending = MaintenanceLog.objects.filter(
-                vehicle=self.vehicle,
-                status__in=['PENDING', 'IN_PROGRESS']
-            ).exclude(pk=self.pk).exists()
-            
-            if not other_pending:
-                self.vehicle.status = 'AVAILABLE'
+        with events.published_by_caller():
+            if self.status in ['PENDING', 'IN_PROGRESS']:
+                self.vehicle.status = 'IN_SHOP'
                 self.vehicle.save()
+            elif self.status == 'COMPLETED':
+                # Only set to available if no other pending maintenance
+                other_pending = MaintenanceLog.objects.filter(
+                    vehicle=self.vehicle,
+                    status__in=['PENDING', 'IN_PROGRESS']
+                ).exclude(pk=self.pk).exists()
+                
+                if not other_pending:
+                    self.vehicle.status = 'AVAILABLE'
+                    self.vehicle.save()
         
         super().save(*args, **kwargs)
+        events.publish([events.status_change(
+            'vehicle', self.vehicle_id, self.vehicle.status, previous, self.vehicle.region, 'maintenance.save'
+        )])
     
     class Meta:
         db_table = 'maintenance_logs'
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['vehicle', 'status'], name='maint_vehicle_status_idx'),
+            models.Index(fields=['status', 'date'], name='maint_status_date_idx'),
+            models.Index(fields=['date', 'id'], name='maint_date_idx'),
+        ]
 
 
 class FuelLog(models.Model):
@@ -73,6 +85,11 @@ class FuelLog(models.Model):
     class Meta:
         db_table = 'fuel_logs'
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['vehicle', 'date'], name='fuel_vehicle_date_idx'),
+            models.Index(fields=['date', 'id'], name='fuel_date_idx'),
+            models.Index(fields=['vehicle', 'odometer_reading'], name='fuel_vehicle_odometer_idx'),
+        ]
 
 
 class Expense(models.Model):
@@ -99,3 +116,8 @@ class Expense(models.Model):
     class Meta:
         db_table = 'expenses'
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['vehicle', 'date'], name='expense_vehicle_date_idx'),
+            models.Index(fields=['expense_type', 'date'], name='expense_type_date_idx'),
+            models.Index(fields=['date', 'id'], name='expense_date_idx'),
+        ]
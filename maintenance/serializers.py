@@ -0,0 +1,39 @@
+from fleetflow.api import SparseFieldsetSerializer
+from rest_framework import serializers
+from .models import MaintenanceLog, FuelLog, Expense
+
+
+class MaintenanceLogSerializer(SparseFieldsetSerializer):
+    vehicle_name = serializers.CharField(source='vehicle.name', read_only=True)
+
+    class Meta:
+        model = MaintenanceLog
+        fields = ['id', 'vehicle', 'vehicle_name', 'service_type', 'cost', 'date', 'status', 'notes', 'created_at']
+        read_only_fields = ['created_at']
+
+
+class MaintenanceLogBatchSerializer(MaintenanceLogSerializer):
+    # Checked for the whole batch with one query instead of one lookup per item
+    vehicle = serializers.IntegerField()
+
+    class Meta(MaintenanceLogSerializer.Meta):
+        fields = ['vehicle', 'service_type', 'cost', 'date', 'status', 'notes']
+
+
+class FuelLogSerializer(SparseFieldsetSerializer):
+    vehicle_name = serializers.CharField(source='vehicle.name', read_only=True)
+
+    class Meta:
+        model = FuelLog
+        fields = ['id', 'vehicle', 'vehicle_name', 'liters', 'fuel_cost', 'date', 'odometer_reading', 'notes',
+                  'created_at']
+        read_only_fields = ['created_at']
+
+
+class ExpenseSerializer(SparseFieldsetSerializer):
+    vehicle_name = serializers.CharField(source='vehicle.name', read_only=True)
+
+    class Meta:
+        model = Expense
+        fields = ['id', 'vehicle', 'vehicle_name', 'expense_type', 'amount', 'date', 'description', 'created_at']
+        read_only_fields = ['created_at']
@@ -0,0 +1,103 @@
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from vehicles.models import Vehicle
+from fleetflow import events
+from fleetflow.choices import invalidate_choices
+from analytics import rollups, status_counts, watermarks
+from .models import MaintenanceLog
+
+MAX_BATCH_SIZE = 5000
+BULK_CREATE_SIZE = 1000
+OPEN_STATUSES = ('PENDING', 'IN_PROGRESS')
+
+
+def _settled_status(current, last, open_logs, opened_in_batch):
+    """A vehicle's status after MaintenanceLog.save() ran for each new log in order.
+
+    last is the status of the vehicle's last new log, open_logs its open logs
+    now stored (new ones included), opened_in_batch whether a new one is open.
+    """
+    if last in OPEN_STATUSES:
+        return 'IN_SHOP'
+    if not open_logs:
+        # The last log completed with nothing else open
+        return 'AVAILABLE'
+    # Completing leaves the status alone while other work is open; an open new log put it in the shop
+    return 'IN_SHOP' if opened_in_batch else current
+
+
+def settle_vehicles(logs, cause='maintenance.bulk_add'):
+    """Give the vehicles of freshly inserted logs the status per-row saves would have.
+
+    logs are (vehicle_id, status) pairs in insertion order. One grouped query
+    reads every affected vehicle with its open log count, then one UPDATE
+    per resulting status moves the vehicles that change. Must run inside the
+    inserting transaction, which holds the vehicle rows until it ends.
+    """
+    last, opened = {}, set()
+    for vehicle_id, status in logs:
+        last[vehicle_id] = status
+        if status in OPEN_STATUSES:
+            opened.add(vehicle_id)
+    if not last:
+        return {}
+
+    # Locked before the read (in pk order, against deadlocks), so no concurrent save changes a status
+    # between the read and the UPDATE; FOR UPDATE cannot go on the grouped query itself
+    list(Vehicle.objects.select_for_update().filter(pk__in=last).order_by('pk').values_list('pk', flat=True))
+    vehicles = Vehicle.objects.filter(pk__in=last).annotate(
+        open_logs=Count('maintenance_logs', filter=Q(maintenance_logs__status__in=OPEN_STATUSES)),
+    ).values_list('pk', 'status', 'region', 'vehicle_type', 'open_logs')
+
+    changes, groups = {}, {}
+    for pk, status, region, vehicle_type, open_logs in vehicles:
+        settled = _settled_status(status, last[pk], open_logs, pk in opened)
+        if settled != status:
+            changes[pk] = (settled, status)
+            groups[pk] = (region, vehicle_type)
+
+    now = timezone.now()
+    for settled in {settled for settled, _ in changes.values()}:
+        Vehicle.objects.filter(pk__in=[pk for pk, (s, _) in changes.items() if s == settled]).update(
+            status=settled, updated_at=now
+        )
+    status_counts.move('vehicle', [
+        ((previous, *groups[pk]), (settled, *groups[pk])) for pk, (settled, previous) in changes.items()
+    ])
+    if changes:
+        invalidate_choices(Vehicle)
+        watermarks.bump(Vehicle)
+        events.publish([
+            events.status_change('vehicle', pk, settled, previous, groups[pk][0], cause)
+            for pk, (settled, previous) in changes.items()
+        ])
+    return changes
+
+
+def record_completed(logs):
+    """Add completed new logs to the daily maintenance rollups; logs are (vehicle_id, date, cost, status)"""
+    totals = {}
+    for vehicle_id, day, cost, status in logs:
+        if status == 'COMPLETED':
+            amounts = totals.setdefault((vehicle_id, day), {'maintenance_cost': 0})
+            amounts['maintenance_cost'] += cost
+    rollups.add(totals)
+
+
+def bulk_add(logs):
+    """Insert many unsaved MaintenanceLog instances at once; returns them with their ids.
+
+    Vehicle statuses end up as if each log had been saved on its own, in
+    list order, but are settled once per vehicle after the insert.
+    """
+    logs = list(logs)
+    if not logs:
+        return logs
+    with transaction.atomic():
+        created = MaintenanceLog.objects.bulk_create(logs, batch_size=BULK_CREATE_SIZE)
+        settle_vehicles([(log.vehicle_id, log.status) for log in created])
+        record_completed([(log.vehicle_id, log.date, log.cost, log.status) for log in created])
+        watermarks.bump(MaintenanceLog)
+    return created
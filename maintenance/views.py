@@ -4,8 +4,12 @@ from django.contrib import messages
 from .models import MaintenanceLog, FuelLog, Expense
 from .forms import MaintenanceLogForm, FuelLogForm, ExpenseForm
 from vehicles.models import Vehicle
+from fleetflow.choices import lazy_choice_list
+from fleetflow.pagination import paginate_keyset
+from analytics.watermarks import conditional
 
 @login_required
+@conditional(MaintenanceLog, Vehicle)
 def maintenance_list(request):
     maintenance_logs = MaintenanceLog.objects.select_related('vehicle').all()
     
@@ -17,9 +21,12 @@ def maintenance_list(request):
     if status:
         maintenance_logs = maintenance_logs.filter(status=status)
     
+    page = paginate_keyset(request, maintenance_logs, ['-date', '-id'])
+    
     context = {
-        'maintenance_logs': maintenance_logs,
-        'vehicles': Vehicle.objects.all(),
+        'maintenance_logs': page.object_list,
+        'page': page,
+        'vehicles': lazy_choice_list(Vehicle),
         'status_choices': MaintenanceLog.STATUS_CHOICES,
     }
     return render(request, 'maintenance/maintenance_list.html', context)
@@ -53,6 +60,7 @@ def maintenance_update(request, pk):
     return render(request, 'maintenance/maintenance_form.html', {'form': form, 'action': 'Update'})
 
 @login_required
+@conditional(FuelLog, Vehicle)
 def fuel_list(request):
     fuel_logs = FuelLog.objects.select_related('vehicle').all()
     
@@ -60,9 +68,12 @@ def fuel_list(request):
     if vehicle_id:
         fuel_logs = fuel_logs.filter(vehicle_id=vehicle_id)
     
+    page = paginate_keyset(request, fuel_logs, ['-date', '-id'])
+    
     context = {
-        'fuel_logs': fuel_logs,
-        'vehicles': Vehicle.objects.all(),
+        'fuel_logs': page.object_list,
+        'page': page,
+        'vehicles': lazy_choice_list(Vehicle),
     }
     return render(request, 'maintenance/fuel_list.html', context)
 
@@ -80,6 +91,7 @@ def fuel_create(request):
     return render(request, 'maintenance/fuel_form.html', {'form': form, 'action': 'Create'})
 
 @login_required
+@conditional(Expense, Vehicle)
 def expense_list(request):
     expenses = Expense.objects.select_related('vehicle').all()
     
@@ -91,9 +103,12 @@ def expense_list(request):
     if expense_type:
         expenses = expenses.filter(expense_type=expense_type)
     
+    page = paginate_keyset(request, expenses, ['-date', '-id'])
+    
     context = {
-        'expenses': expenses,
-        'vehicles': Vehicle.objects.all(),
+        'expenses': page.object_list,
+        'page': page,
+        'vehicles': lazy_choice_list(Vehicle),
         'expense_types': Expense.EXPENSE_TYPES,
     }
     return render(request, 'maintenance/expense_list.html', context)
@@ -0,0 +1,69 @@
+from django.core.exceptions import ValidationError
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from vehicles.models import Vehicle
+from drivers.models import Driver
+from fleetflow.api import FleetViewSet
+from .models import Trip
+from .serializers import TripSerializer, TripCompleteSerializer
+
+TRANSITIONS = {'dispatch_trip', 'complete', 'cancel'}
+
+
+class TripViewSet(FleetViewSet):
+    queryset = Trip.objects.all()
+    serializer_class = TripSerializer
+    filterset_fields = ['status', 'vehicle', 'driver']
+    watermark_tables = (Trip, Vehicle, Driver)
+    http_method_names = ['get', 'post', 'put', 'patch', 'head', 'options']
+
+    def get_queryset(self):
+        if self.action in TRANSITIONS:
+            return Trip.objects.select_related('vehicle', 'driver')
+        return super().get_queryset()
+
+    def _error(self, message, code=status.HTTP_400_BAD_REQUEST):
+        return Response({'error': message}, status=code)
+
+    def update(self, request, *args, **kwargs):
+        if self.get_object().status != 'DRAFT':
+            return self._error('Only draft trips can be edited')
+        return super().update(request, *args, **kwargs)
+
+    def _transitioned(self, trip):
+        return Response(TripSerializer(trip, context=self.get_serializer_context()).data)
+
+    # Named so it does not shadow APIView.dispatch
+    @action(detail=True, methods=['post'], url_path='dispatch', url_name='dispatch')
+    def dispatch_trip(self, request, pk=None):
+        trip = self.get_object()
+        if trip.status != 'DRAFT':
+            return self._error('Only draft trips can be dispatched')
+        try:
+            trip.full_clean()
+            trip.dispatch()
+        except ValidationError as e:
+            # DispatchConflict means someone else claimed the vehicle or driver first
+            code = status.HTTP_409_CONFLICT if hasattr(e, 'resource') else status.HTTP_400_BAD_REQUEST
+            return self._error(e.messages[0], code)
+        return self._transitioned(trip)
+
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        trip = self.get_object()
+        if trip.status != 'DISPATCHED':
+            return self._error('Only dispatched trips can be completed')
+        form = TripCompleteSerializer(data=request.data)
+        form.is_valid(raise_exception=True)
+        trip.complete(form.validated_data['distance'])
+        return self._transitioned(trip)
+
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        trip = self.get_object()
+        if trip.status not in ('DRAFT', 'DISPATCHED'):
+            return self._error(f'{trip.get_status_display()} trips cannot be cancelled')
+        trip.cancel()
+        return self._transitioned(trip)
@@ -0,0 +1,251 @@
+import hashlib
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from vehicles.models import Vehicle
+from drivers.models import Driver
+from fleetflow.geo import haversine_km
+from analytics import watermarks
+from .models import Trip
+
+LICENSE_RANK = {'A': 1, 'B': 2, 'C': 3, 'D': 4}
+REQUIRED_LICENSE = {'BIKE': 'A', 'VAN': 'B', 'TRUCK': 'C'}
+
+# Costs are in km of empty pickup driving
+MAX_PICKUP_KM = 250.0
+CAPACITY_SLACK_KM = 50.0       # what running a vehicle completely empty is worth
+UNKNOWN_LOCATION_KM = MAX_PICKUP_KM
+UNASSIGNED_TRIP_COST = MAX_PICKUP_KM + CAPACITY_SLACK_KM + 1
+
+# Driver costs: a driver already assigned to the vehicle is free, then prefer the lowest sufficient license
+OTHER_VEHICLE_COST = 1.0
+UNASSIGNED_DRIVER_COST = 100.0
+
+MAX_ROUNDS = 3
+PREVIEW_ROWS = 200
+ROW_CHUNK = 1024
+
+
+def solve_assignment(cost, reject_cost):
+    """Minimum-cost matching of rows to distinct columns, where any row may stay
+    unmatched at reject_cost instead. Infeasible pairs are np.inf.
+
+    Returns the matched column per row, -1 for unmatched rows.
+
+    Shortest augmenting paths (Jonker-Volgenant) with the column scan of each
+    step vectorized; the reject option caps path lengths, which keeps large
+    square problems fast.
+    """
+    n, m = cost.shape
+    col_of = np.full(n, -1, dtype=np.intp)
+    if n == 0 or m == 0:
+        return col_of
+    row_of = np.full(m, -1, dtype=np.intp)
+    v = np.zeros(m)
+
+    # Greedy start: every row takes its cheapest column unless another row already did
+    best = cost.argmin(axis=1)
+    best_cost = cost[np.arange(n), best]
+    free = []
+    for i, (j, c) in enumerate(zip(best.tolist(), best_cost.tolist())):
+        if c >= reject_cost:
+            continue
+        if row_of[j] < 0:
+            row_of[j] = i
+            col_of[i] = j
+        else:
+            free.append(i)
+
+    way = np.empty(m, dtype=np.intp)
+    cur = np.empty(m)
+    limit = np.empty(m)
+    todo = np.empty(m)
+    better = np.empty(m, dtype=bool)
+
+    for i in free:
+        # limit holds tentative distances (-inf once scanned), todo the same with scanned columns at +inf
+        np.subtract(cost[i], v, out=limit)
+        todo[:] = limit
+        way.fill(-1)
+        scanned, dist = [], []
+        reject_dist, reject_row = reject_cost, i
+        while True:
+            j = int(todo.argmin())
+            dj = todo[j]
+            if reject_dist <= dj:
+                end, dj = reject_row, reject_dist
+                break
+            scanned.append(j)
+            dist.append(dj)
+            todo[j] = np.inf
+            limit[j] = -np.inf
+            row = row_of[j]
+            if row < 0:
+                end = None
+                break
+            np.subtract(cost[row], v, out=cur)
+            base = dj - cur[j]
+            cur += base
+            if base + reject_cost < reject_dist:
+                reject_dist, reject_row = base + reject_cost, row
+            np.less(cur, limit, out=better)
+            np.copyto(limit, cur, where=better)
+            np.copyto(todo, cur, where=better)
+            np.copyto(way, j, where=better)
+
+        if scanned:
+            v[scanned] += np.array(dist) - dj
+        if end is not None:
+            # The path ends by dropping a row; its column passes down the path
+            if end == i:
+                continue
+            j = col_of[end]
+            col_of[end] = -1
+        while True:
+            prev = way[j]
+            r = i if prev < 0 else row_of[prev]
+            row_of[j] = r
+            col_of[r] = j
+            if prev < 0:
+                break
+            j = prev
+    return col_of
+
+
+def _vehicle_costs(trips, vehicles):
+    cargo = np.array([t[1] for t in trips], dtype=float)
+    trip_lat = np.array([np.nan if t[2] is None else float(t[2]) for t in trips])
+    trip_lon = np.array([np.nan if t[3] is None else float(t[3]) for t in trips])
+    capacity = np.array([v[2] for v in vehicles], dtype=float)
+    vehicle_lat = np.array([np.nan if v[3] is None else float(v[3]) for v in vehicles])
+    vehicle_lon = np.array([np.nan if v[4] is None else float(v[4]) for v in vehicles])
+
+    cost = np.empty((len(trips), len(vehicles)))
+    pickup = np.empty_like(cost)
+    for start in range(0, len(trips), ROW_CHUNK):
+        rows = slice(start, start + ROW_CHUNK)
+        km = haversine_km(trip_lat[rows], trip_lon[rows], vehicle_lat, vehicle_lon)
+        # Unknown vehicle position: assume the worst acceptable pickup; unknown pickup point: ignore distance
+        km[:, np.isnan(vehicle_lat)] = UNKNOWN_LOCATION_KM
+        km[np.isnan(trip_lat[rows]), :] = 0.0
+        pickup[rows] = km
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slack = 1.0 - cargo[rows, None] / capacity[None, :]
+        km += CAPACITY_SLACK_KM * np.clip(slack, 0.0, 1.0)
+        km[(cargo[rows, None] > capacity[None, :]) | (pickup[rows] > MAX_PICKUP_KM)] = np.inf
+        cost[rows] = km
+    return cost, pickup
+
+
+def _driver_costs(vehicles, drivers):
+    required = np.array([LICENSE_RANK[REQUIRED_LICENSE[v[1]]] for v in vehicles])
+    rank = np.array([LICENSE_RANK.get(d[1], 0) for d in drivers])
+    surplus = (rank[None, :] - required[:, None]).astype(float)
+    assigned = np.array([v[0] for v in vehicles])[:, None] == np.array([d[2] or 0 for d in drivers])[None, :]
+    cost = np.where(assigned, 0.0, OTHER_VEHICLE_COST + surplus)
+    cost[surplus < 0] = np.inf
+    return cost
+
+
+def build_plan(trips=None):
+    """Propose a vehicle and driver for every draft trip without writing anything.
+
+    Trips are first matched to available vehicles on pickup distance and
+    spare capacity, then the chosen vehicles to on-duty drivers holding a
+    sufficient, unexpired license. Trips that missed a driver get another
+    round with whatever is left.
+    """
+    today = timezone.now().date()
+    if trips is None:
+        trips = Trip.objects.filter(status='DRAFT')
+    trips = list(trips.order_by('pk').values_list('pk', 'cargo_weight', 'pickup_latitude', 'pickup_longitude'))
+    vehicles = list(
+        Vehicle.objects.filter(status='AVAILABLE').order_by('pk')
+        .values_list('pk', 'vehicle_type', 'max_capacity', 'latitude', 'longitude')
+    )
+    drivers = list(
+        Driver.objects.filter(status='ON_DUTY', license_expiry__gte=today).order_by('pk')
+        .values_list('pk', 'license_category', 'assigned_vehicle_id')
+    )
+
+    assignments = []
+    for _ in range(MAX_ROUNDS):
+        if not trips or not vehicles or not drivers:
+            break
+        # Skip vehicle types nobody left can drive
+        best_rank = max(LICENSE_RANK.get(d[1], 0) for d in drivers)
+        usable = [v for v in vehicles if LICENSE_RANK[REQUIRED_LICENSE[v[1]]] <= best_rank]
+        if not usable:
+            break
+
+        cost, pickup = _vehicle_costs(trips, usable)
+        vehicle_for = solve_assignment(cost, UNASSIGNED_TRIP_COST)
+        matched = np.nonzero(vehicle_for >= 0)[0]
+        if not len(matched):
+            break
+        chosen = [usable[j] for j in vehicle_for[matched]]
+
+        driver_for = solve_assignment(_driver_costs(chosen, drivers), UNASSIGNED_DRIVER_COST)
+        used_vehicles, used_drivers, done = set(), set(), set()
+        for k, i in enumerate(matched.tolist()):
+            if driver_for[k] < 0:
+                continue
+            j = vehicle_for[i]
+            trip, vehicle, driver = trips[i], usable[j], drivers[driver_for[k]]
+            assignments.append({
+                'trip': trip[0],
+                'vehicle': vehicle[0],
+                'driver': driver[0],
+                'pickup_km': None if trip[2] is None or vehicle[3] is None else round(float(pickup[i, j]), 1),
+                'cost': round(float(cost[i, j]), 2),
+            })
+            used_vehicles.add(vehicle[0])
+            used_drivers.add(driver[0])
+            done.add(trip[0])
+        if not done:
+            break
+        trips = [t for t in trips if t[0] not in done]
+        vehicles = [v for v in vehicles if v[0] not in used_vehicles]
+        drivers = [d for d in drivers if d[0] not in used_drivers]
+
+    return {'assignments': assignments, 'unassigned': [t[0] for t in trips]}
+
+
+def plan_fingerprint(plan):
+    """Digest of a plan's (trip, vehicle, driver) choices, so a commit can check it is the plan previewed"""
+    choices = sorted((a['trip'], a['vehicle'], a['driver']) for a in plan['assignments'])
+    return hashlib.sha1(repr(choices).encode()).hexdigest()
+
+
+def commit_plan(plan):
+    """Write a plan's vehicles and drivers onto its trips and dispatch them, in one transaction.
+
+    Trips that then fail to dispatch, because their vehicle or driver was
+    taken meanwhile, get back the vehicle and driver they had.
+    """
+    from .services import bulk_dispatch
+
+    proposals = {a['trip']: a for a in plan['assignments']}
+    if not proposals:
+        return []
+    now = timezone.now()
+    with transaction.atomic():
+        trips = list(Trip.objects.select_for_update().filter(pk__in=proposals, status='DRAFT'))
+        previous = {trip.pk: (trip.vehicle_id, trip.driver_id, trip.updated_at) for trip in trips}
+        for trip in trips:
+            trip.vehicle_id = proposals[trip.pk]['vehicle']
+            trip.driver_id = proposals[trip.pk]['driver']
+            trip.updated_at = now
+        Trip.objects.bulk_update(trips, ['vehicle', 'driver', 'updated_at'], batch_size=500)
+        results = bulk_dispatch(list(proposals))
+
+        dispatched = {result['id'] for result in results if result['ok']}
+        failed = [trip for trip in trips if trip.pk not in dispatched]
+        for trip in failed:
+            trip.vehicle_id, trip.driver_id, trip.updated_at = previous[trip.pk]
+        Trip.objects.bulk_update(failed, ['vehicle', 'driver', 'updated_at'], batch_size=500)
+        watermarks.bump(Trip)
+    return results
@@ -1,16 +1,21 @@
 from django import forms
+from django.urls import reverse_lazy
+from fleetflow.widgets import TypeaheadSelect
 from .models import Trip
 
 class TripForm(forms.ModelForm):
     class Meta:
         model = Trip
-        fields = ['vehicle', 'driver', 'cargo_weight', 'source', 'destination', 'revenue', 'notes']
+        fields = ['vehicle', 'driver', 'cargo_weight', 'source', 'destination', 'pickup_latitude', 'pickup_longitude',
+                  'revenue', 'notes']
         widgets = {
-            'vehicle': forms.Select(attrs={'class': 'form-select'}),
-            'driver': forms.Select(attrs={'class': 'form-select'}),
+            'vehicle': TypeaheadSelect(reverse_lazy('vehicle_lookup'), attrs={'class': 'form-select'}),
+            'driver': TypeaheadSelect(reverse_lazy('driver_lookup'), attrs={'class': 'form-select'}),
             'cargo_weight': forms.NumberInput(attrs={'class': 'form-input', 'step': '0.01'}),
             'source': forms.TextInput(attrs={'class': 'form-input'}),
             'destination': forms.TextInput(attrs={'class': 'form-input'}),
+            'pickup_latitude': forms.NumberInput(attrs={'class': 'form-input', 'step': '0.000001'}),
+            'pickup_longitude': forms.NumberInput(attrs={'class': 'form-input', 'step': '0.000001'}),
             'revenue': forms.NumberInput(attrs={'class': 'form-input', 'step': '0.01'}),
             'notes': forms.Textarea(attrs={'class': 'form-textarea', 'rows': 3}),
         }
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drivers', '0002_driver_drivers_status_created_idx_and_more'),
+        ('trips', '0001_initial'),
+        ('vehicles', '0003_vehicle_vehicles_status_created_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['status', 'completion_date'], name='trips_status_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['status', 'created_at'], name='trips_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['created_at', 'id'], name='trips_created_idx'),
+        ),
+    ]
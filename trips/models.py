@@ -4,6 +4,14 @@ from django.core.exceptions import ValidationError
 from vehicles.models import Vehicle
 from drivers.models import Driver
 
+class DispatchConflict(ValidationError):
+    """Raised when another dispatch claimed the trip, vehicle or driver first"""
+    
+    def __init__(self, resource, message):
+        super().__init__(message)
+        self.resource = resource
+
+
 class Trip(models.Model):
     STATUS_CHOICES = [
         ('DRAFT', 'Draft'),
@@ -17,6 +25,8 @@ class Trip(models.Model):
     cargo_weight = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
     source = models.CharField(max_length=200)
     destination = models.CharField(max_length=200)
+    pickup_latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    pickup_longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     revenue = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(0)])
     distance = models.DecimalField(max_digits=10, decimal_places=2, default=0, validators=[MinValueValidator(0)])
     status = models.CharField(max_length=15, choices=STATUS_CHOICES, default='DRAFT')
@@ -55,51 +65,107 @@ class Trip(models.Model):
             )
     
     def dispatch(self):
-        """Dispatch the trip and update statuses"""
+        """Dispatch the trip, atomically claiming its vehicle and driver.
+        
+        Each claim is a conditional UPDATE, so when two dispatchers race for
+        the same vehicle or driver exactly one wins; the loser gets a
+        DispatchConflict naming the resource and nothing is written.
+        """
+        from django.db import transaction
         from django.utils import timezone
+        from fleetflow.choices import invalidate_choices
+        from analytics import status_counts, watermarks
         
-        self.status = 'DISPATCHED'
-        self.dispatch_date = timezone.now()
-        self.save()
+        now = timezone.now()
+        with transaction.atomic():
+            claimed = Vehicle.objects.filter(pk=self.vehicle_id, status='AVAILABLE').update(
+                status='ON_TRIP', updated_at=now
+            )
+            if not claimed:
+                raise DispatchConflict('vehicle', f'Vehicle {self.vehicle} is no longer available')
+            
+            claimed = Driver.objects.filter(
+                pk=self.driver_id, status='ON_DUTY', license_expiry__gte=now.date()
+            ).update(status='ON_TRIP', updated_at=now)
+            if not claimed:
+                raise DispatchConflict('driver', f'Driver {self.driver} is no longer on duty')
+            
+            claimed = Trip.objects.filter(pk=self.pk, status='DRAFT').update(
+                status='DISPATCHED', dispatch_date=now, updated_at=now
+            )
+            if not claimed:
+                raise DispatchConflict('trip', f'Trip {self.pk} is no longer a draft')
+            status_counts.record([(self.vehicle, 'AVAILABLE', 'ON_TRIP'), (self.driver, 'ON_DUTY', 'ON_TRIP')])
         
-        # Update vehicle and driver status
+        self.status = 'DISPATCHED'
+        self.dispatch_date = now
+        self.updated_at = now
         self.vehicle.status = 'ON_TRIP'
-        self.vehicle.save()
-        
         self.driver.status = 'ON_TRIP'
-        self.driver.save()
+        
+        # Conditional updates skip model signals
+        invalidate_choices(Vehicle)
+        invalidate_choices(Driver)
+        watermarks.bump(Trip, Vehicle, Driver)
+        self._publish_changes('dispatch', 'DRAFT', 'AVAILABLE', 'ON_DUTY')
     
     def complete(self, distance_traveled):
         """Complete the trip and update statuses"""
         from django.utils import timezone
+        from fleetflow import events
         
-        self.status = 'COMPLETED'
-        self.completion_date = timezone.now()
-        self.distance = distance_traveled
-        self.save()
-        
-        # Update vehicle odometer and status
-        self.vehicle.odometer += distance_traveled
-        self.vehicle.status = 'AVAILABLE'
-        self.vehicle.save()
-        
-        # Update driver status
-        self.driver.status = 'ON_DUTY'
-        self.driver.save()
+        previous = (self.status, self.vehicle.status, self.driver.status)
+        with events.published_by_caller():
+            self.status = 'COMPLETED'
+            self.completion_date = timezone.now()
+            self.distance = distance_traveled
+            self.save()
+            
+            # Update vehicle odometer and status
+            self.vehicle.odometer += distance_traveled
+            self.vehicle.status = 'AVAILABLE'
+            self.vehicle.save()
+            
+            # Update driver status
+            self.driver.status = 'ON_DUTY'
+            self.driver.save()
+        self._publish_changes('complete', *previous)
     
     def cancel(self):
         """Cancel the trip and revert statuses"""
-        self.status = 'CANCELLED'
-        self.save()
+        from fleetflow import events
         
-        if self.vehicle.status == 'ON_TRIP':
-            self.vehicle.status = 'AVAILABLE'
-            self.vehicle.save()
+        previous = (self.status, self.vehicle.status, self.driver.status)
+        with events.published_by_caller():
+            self.status = 'CANCELLED'
+            self.save()
+            
+            # A draft never took its vehicle and driver, which may be out on another trip
+            if previous[0] == 'DISPATCHED' and self.vehicle.status == 'ON_TRIP':
+                self.vehicle.status = 'AVAILABLE'
+                self.vehicle.save()
+            
+            if previous[0] == 'DISPATCHED' and self.driver.status == 'ON_TRIP':
+                self.driver.status = 'ON_DUTY'
+                self.driver.save()
+        self._publish_changes('cancel', *previous)
+    
+    def _publish_changes(self, action, trip_previous, vehicle_previous, driver_previous):
+        from fleetflow import events
         
-        if self.driver.status == 'ON_TRIP':
-            self.driver.status = 'ON_DUTY'
-            self.driver.save()
+        cause = f'trip.{action}'
+        region = self.vehicle.region
+        events.publish([
+            events.status_change('trip', self.pk, self.status, trip_previous, region, cause, self.pk),
+            events.status_change('vehicle', self.vehicle_id, self.vehicle.status, vehicle_previous, region, cause, self.pk),
+            events.status_change('driver', self.driver_id, self.driver.status, driver_previous, region, cause, self.pk),
+        ])
     
     class Meta:
         db_table = 'trips'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'completion_date'], name='trips_status_completed_idx'),
+            models.Index(fields=['status', 'created_at'], name='trips_status_created_idx'),
+            models.Index(fields=['created_at', 'id'], name='trips_created_idx'),
+        ]
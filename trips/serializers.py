@@ -0,0 +1,38 @@
+from copy import copy
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework import serializers
+
+from fleetflow.api import SparseFieldsetSerializer
+from .models import Trip
+
+
+class TripSerializer(SparseFieldsetSerializer):
+    vehicle_name = serializers.CharField(source='vehicle.name', read_only=True)
+    driver_name = serializers.CharField(source='driver.name', read_only=True)
+
+    class Meta:
+        model = Trip
+        fields = ['id', 'vehicle', 'vehicle_name', 'driver', 'driver_name', 'cargo_weight', 'source', 'destination',
+                  'pickup_latitude', 'pickup_longitude', 'revenue', 'distance', 'status', 'dispatch_date',
+                  'completion_date', 'notes', 'created_at', 'updated_at']
+        # Status only moves through the dispatch, complete and cancel actions
+        read_only_fields = ['distance', 'status', 'dispatch_date', 'completion_date', 'created_at', 'updated_at']
+
+    def validate(self, attrs):
+        """Apply Trip.clean(), as the trip forms do through full_clean()"""
+        if self.instance is not None:
+            trip = copy(self.instance)
+            for name, value in attrs.items():
+                setattr(trip, name, value)
+        else:
+            trip = Trip(**attrs)
+        try:
+            trip.clean()
+        except DjangoValidationError as e:
+            raise serializers.ValidationError({'non_field_errors': e.messages})
+        return attrs
+
+
+class TripCompleteSerializer(serializers.Serializer):
+    distance = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
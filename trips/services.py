@@ -0,0 +1,259 @@
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import F, Value
+from django.utils import timezone
+
+from vehicles.models import Vehicle
+from drivers.models import Driver
+from fleetflow import events
+from fleetflow.choices import invalidate_choices
+from analytics import rollups, status_counts, watermarks
+from .models import Trip, DispatchConflict
+
+MAX_BATCH_SIZE = 5000
+
+
+class _Contended(Exception):
+    """A set-based claim touched fewer rows than expected; retry trip by trip"""
+
+
+def _result(trip_id, ok, status=None, error=None):
+    return {'id': trip_id, 'ok': ok, 'status': status, 'error': error}
+
+
+def _load(trip_ids, allowed_statuses, action):
+    """Fetch trips with vehicle and driver in one query and split off the ones that cannot change"""
+    trips = Trip.objects.select_related('vehicle', 'driver').in_bulk(trip_ids)
+    results = {}
+    candidates = []
+    for trip_id in trip_ids:
+        trip = trips.get(trip_id)
+        if trip is None:
+            results[trip_id] = _result(trip_id, False, error='Trip not found')
+        elif trip.status not in allowed_statuses:
+            results[trip_id] = _result(trip_id, False, trip.status, f'{trip.get_status_display()} trips cannot be {action}')
+        else:
+            candidates.append(trip)
+    return candidates, results
+
+
+def _status_events(cause, trips, trip_previous, vehicles, drivers):
+    """Events for a batch: trip_previous maps trip id to its old status, vehicles and
+    drivers map id to (status, previous) for the rows that changed"""
+    vehicle_region = {trip.vehicle_id: trip.vehicle.region for trip in trips}
+    driver_region = {trip.driver_id: trip.vehicle.region for trip in trips}
+    changes = [
+        events.status_change('trip', trip.pk, trip.status, trip_previous[trip.pk], trip.vehicle.region, cause, trip.pk)
+        for trip in trips
+    ]
+    changes += [events.status_change('vehicle', pk, status, previous, vehicle_region[pk], cause)
+                for pk, (status, previous) in vehicles.items()]
+    changes += [events.status_change('driver', pk, status, previous, driver_region[pk], cause)
+                for pk, (status, previous) in drivers.items()]
+    return changes
+
+
+def _dispatch_errors(trip, today, taken_vehicles, taken_drivers):
+    """The Trip.clean() rules plus in-batch conflicts, without extra queries"""
+    if trip.cargo_weight > trip.vehicle.max_capacity:
+        return f'Cargo weight ({trip.cargo_weight} kg) exceeds vehicle capacity ({trip.vehicle.max_capacity} kg)'
+    if trip.driver.license_expiry < today:
+        return f'Driver license expired on {trip.driver.license_expiry}'
+    if trip.driver.status != 'ON_DUTY' or trip.driver_id in taken_drivers:
+        return f'Driver {trip.driver} is not on duty'
+    if trip.vehicle.status != 'AVAILABLE' or trip.vehicle_id in taken_vehicles:
+        return f'Vehicle {trip.vehicle} is not available'
+    return None
+
+
+def bulk_dispatch(trip_ids):
+    """Dispatch many draft trips; returns one result dict per requested id"""
+    trip_ids = list(dict.fromkeys(trip_ids))
+    candidates, results = _load(trip_ids, {'DRAFT'}, 'dispatched')
+    now = timezone.now()
+
+    ready = []
+    taken_vehicles, taken_drivers = set(), set()
+    for trip in candidates:
+        error = _dispatch_errors(trip, now.date(), taken_vehicles, taken_drivers)
+        if error:
+            results[trip.pk] = _result(trip.pk, False, trip.status, error)
+            continue
+        taken_vehicles.add(trip.vehicle_id)
+        taken_drivers.add(trip.driver_id)
+        ready.append(trip)
+
+    if ready:
+        try:
+            # Fast path: three set-based conditional claims for the whole batch
+            with transaction.atomic():
+                claimed = Vehicle.objects.filter(pk__in=taken_vehicles, status='AVAILABLE').update(
+                    status='ON_TRIP', updated_at=now
+                )
+                if claimed != len(taken_vehicles):
+                    raise _Contended
+                claimed = Driver.objects.filter(
+                    pk__in=taken_drivers, status='ON_DUTY', license_expiry__gte=now.date()
+                ).update(status='ON_TRIP', updated_at=now)
+                if claimed != len(taken_drivers):
+                    raise _Contended
+                claimed = Trip.objects.filter(pk__in=[t.pk for t in ready], status='DRAFT').update(
+                    status='DISPATCHED', dispatch_date=now, updated_at=now
+                )
+                if claimed != len(ready):
+                    raise _Contended
+                status_counts.record(
+                    [(t.vehicle, 'AVAILABLE', 'ON_TRIP') for t in ready] + [(t.driver, 'ON_DUTY', 'ON_TRIP') for t in ready]
+                )
+            for trip in ready:
+                trip.status = 'DISPATCHED'
+                results[trip.pk] = _result(trip.pk, True, 'DISPATCHED')
+            events.publish(_status_events(
+                'trip.dispatch', ready, {t.pk: 'DRAFT' for t in ready},
+                {pk: ('ON_TRIP', 'AVAILABLE') for pk in taken_vehicles},
+                {pk: ('ON_TRIP', 'ON_DUTY') for pk in taken_drivers},
+            ))
+        except _Contended:
+            # Someone else changed a row meanwhile: claim one trip at a time
+            for trip in ready:
+                try:
+                    trip.dispatch()
+                    results[trip.pk] = _result(trip.pk, True, 'DISPATCHED')
+                except DispatchConflict as e:
+                    results[trip.pk] = _result(trip.pk, False, trip.status, e.messages[0])
+        invalidate_choices(Vehicle)
+        invalidate_choices(Driver)
+        watermarks.bump(Trip, Vehicle, Driver)
+
+    return [results[trip_id] for trip_id in trip_ids]
+
+
+def bulk_complete(distances):
+    """Complete many dispatched trips; distances maps trip id to distance traveled"""
+    trip_ids = list(distances)
+    candidates, results = _load(trip_ids, {'DISPATCHED'}, 'completed')
+    now = timezone.now()
+
+    valid = []
+    for trip in candidates:
+        try:
+            distance = Decimal(str(distances[trip.pk]))
+        except (InvalidOperation, ValueError):
+            distance = None
+        if distance is None or not distance.is_finite() or distance < 0:
+            results[trip.pk] = _result(trip.pk, False, trip.status, 'Distance must be a non-negative number')
+            continue
+        trip.status = 'COMPLETED'
+        trip.completion_date = now
+        trip.updated_at = now
+        trip.distance = distance.quantize(Decimal('0.01'))
+        valid.append(trip)
+
+    if valid:
+        with transaction.atomic():
+            # Re-check status inside the transaction so a concurrent cancel wins cleanly
+            still_dispatched = set(
+                Trip.objects.select_for_update().filter(pk__in=[t.pk for t in valid], status='DISPATCHED')
+                .values_list('pk', flat=True)
+            )
+            for trip in valid:
+                if trip.pk not in still_dispatched:
+                    results[trip.pk] = _result(trip.pk, False, None, 'Trip changed status during the batch')
+            valid = [t for t in valid if t.pk in still_dispatched]
+
+            # Locked, so the counted and published previous statuses are the ones being replaced
+            vehicle_rows = list(Vehicle.objects.select_for_update().filter(
+                pk__in={t.vehicle_id for t in valid}
+            ).values_list('pk', 'status', 'region', 'vehicle_type'))
+            driver_previous = dict(Driver.objects.select_for_update().filter(
+                pk__in={t.driver_id for t in valid}
+            ).values_list('pk', 'status'))
+
+            # Several trips on one vehicle add up into a single F() increment
+            odometer_delta = defaultdict(Decimal)
+            for trip in valid:
+                odometer_delta[trip.vehicle_id] += trip.distance
+            vehicles = [
+                Vehicle(pk=vehicle_id, odometer=F('odometer') + Value(delta), status='AVAILABLE', updated_at=now)
+                for vehicle_id, delta in odometer_delta.items()
+            ]
+
+            Trip.objects.bulk_update(valid, ['status', 'completion_date', 'distance', 'updated_at'], batch_size=500)
+            Vehicle.objects.bulk_update(vehicles, ['odometer', 'status', 'updated_at'], batch_size=500)
+            Driver.objects.filter(pk__in=driver_previous).update(status='ON_DUTY', updated_at=now)
+            status_counts.move('vehicle', [
+                ((status, region, vehicle_type), ('AVAILABLE', region, vehicle_type))
+                for _, status, region, vehicle_type in vehicle_rows
+            ])
+            status_counts.move('driver', [((status,), ('ON_DUTY',)) for status in driver_previous.values()])
+
+        for trip in valid:
+            results[trip.pk] = _result(trip.pk, True, 'COMPLETED')
+        events.publish(_status_events(
+            'trip.complete', valid, {t.pk: 'DISPATCHED' for t in valid},
+            {pk: ('AVAILABLE', status) for pk, status, _, _ in vehicle_rows},
+            {pk: ('ON_DUTY', status) for pk, status in driver_previous.items()},
+        ))
+        # Bulk writes skip model signals
+        rollups.refresh({(trip.vehicle_id, now.date()) for trip in valid})
+        invalidate_choices(Vehicle)
+        invalidate_choices(Driver)
+        watermarks.bump(Trip, Vehicle, Driver)
+
+    return [results[trip_id] for trip_id in trip_ids]
+
+
+def bulk_cancel(trip_ids):
+    """Cancel many draft or dispatched trips, reverting the vehicles and drivers of dispatched ones"""
+    trip_ids = list(dict.fromkeys(trip_ids))
+    candidates, results = _load(trip_ids, {'DRAFT', 'DISPATCHED'}, 'cancelled')
+    now = timezone.now()
+
+    if candidates:
+        with transaction.atomic():
+            previous = dict(
+                Trip.objects.select_for_update().filter(
+                    pk__in=[t.pk for t in candidates], status__in=['DRAFT', 'DISPATCHED']
+                ).values_list('pk', 'status')
+            )
+            cancelled = set(previous)
+            Trip.objects.filter(pk__in=cancelled).update(status='CANCELLED', updated_at=now)
+            trips = [t for t in candidates if t.pk in cancelled]
+            # Only dispatched trips hold their vehicle and driver; a draft's may be out on another trip
+            dispatched = [t for t in trips if previous[t.pk] == 'DISPATCHED']
+            # Lock the rows being reverted first so the published events name exactly those
+            vehicle_rows = list(Vehicle.objects.select_for_update().filter(
+                pk__in={t.vehicle_id for t in dispatched}, status='ON_TRIP'
+            ).values_list('pk', 'region', 'vehicle_type'))
+            vehicle_ids = [pk for pk, _, _ in vehicle_rows]
+            driver_ids = list(Driver.objects.select_for_update().filter(
+                pk__in={t.driver_id for t in dispatched}, status='ON_TRIP'
+            ).values_list('pk', flat=True))
+            Vehicle.objects.filter(pk__in=vehicle_ids).update(status='AVAILABLE', updated_at=now)
+            Driver.objects.filter(pk__in=driver_ids).update(status='ON_DUTY', updated_at=now)
+            status_counts.move('vehicle', [
+                (('ON_TRIP', region, vehicle_type), ('AVAILABLE', region, vehicle_type))
+                for _, region, vehicle_type in vehicle_rows
+            ])
+            status_counts.move('driver', [(('ON_TRIP',), ('ON_DUTY',))] * len(driver_ids))
+
+            for trip in trips:
+                trip.status = 'CANCELLED'
+            events.publish(_status_events(
+                'trip.cancel', trips, previous,
+                {pk: ('AVAILABLE', 'ON_TRIP') for pk in vehicle_ids},
+                {pk: ('ON_DUTY', 'ON_TRIP') for pk in driver_ids},
+            ))
+
+        for trip in candidates:
+            if trip.pk in cancelled:
+                results[trip.pk] = _result(trip.pk, True, 'CANCELLED')
+            else:
+                results[trip.pk] = _result(trip.pk, False, None, 'Trip changed status during the batch')
+        invalidate_choices(Vehicle)
+        invalidate_choices(Driver)
+        watermarks.bump(Trip, Vehicle, Driver)
+
+    return [results[trip_id] for trip_id in trip_ids]
@@ -3,6 +3,8 @@ from . import views
 
 urlpatterns = [
     path('', views.trip_list, name='trip_list'),
+    path('assign/', views.trip_assign, name='trip_assign'),
+    path('batch/', views.trip_batch, name='trip_batch'),
     path('create/', views.trip_create, name='trip_create'),
     path('<int:pk>/', views.trip_detail, name='trip_detail'),
     path('<int:pk>/update/', views.trip_update, name='trip_update'),
@@ -1,14 +1,23 @@
+import json
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.views.decorators.http import require_POST
 from django.contrib import messages
 from django.core.exceptions import ValidationError
 from django.db.models import Q
 from .models import Trip
+from . import services, assignment
 from .forms import TripForm, TripCompleteForm
 from vehicles.models import Vehicle
 from drivers.models import Driver
+from fleetflow.choices import lazy_choice_list
+from fleetflow.pagination import paginate_keyset
+from analytics.watermarks import conditional
 
 @login_required
+@conditional(Trip, Vehicle, Driver)
 def trip_list(request):
     trips = Trip.objects.select_related('vehicle', 'driver').all()
     
@@ -24,11 +33,14 @@ def trip_list(request):
     if driver_id:
         trips = trips.filter(driver_id=driver_id)
     
+    page = paginate_keyset(request, trips, ['-created_at', '-id'])
+    
     context = {
-        'trips': trips,
+        'trips': page.object_list,
+        'page': page,
         'status_choices': Trip.STATUS_CHOICES,
-        'vehicles': Vehicle.objects.all(),
-        'drivers': Driver.objects.all(),
+        'vehicles': lazy_choice_list(Vehicle),
+        'drivers': lazy_choice_list(Driver),
     }
     return render(request, 'trips/trip_list.html', context)
 
@@ -50,8 +62,8 @@ def trip_create(request):
         form = TripForm()
     
     # Get available vehicles and drivers
-    available_vehicles = Vehicle.objects.filter(status='AVAILABLE')
-    available_drivers = Driver.objects.filter(status='ON_DUTY')
+    available_vehicles = lazy_choice_list(Vehicle, 'AVAILABLE')
+    available_drivers = lazy_choice_list(Driver, 'ON_DUTY')
     
     context = {
         'form': form,
@@ -93,7 +105,7 @@ def trip_update(request, pk):
 
 @login_required
 def trip_dispatch(request, pk):
-    trip = get_object_or_404(Trip, pk=pk)
+    trip = get_object_or_404(Trip.objects.select_related('vehicle', 'driver'), pk=pk)
     
     if trip.status != 'DRAFT':
         messages.error(request, 'Only draft trips can be dispatched')
@@ -144,6 +156,85 @@ def trip_cancel(request, pk):
     
     return render(request, 'trips/trip_confirm_cancel.html', {'trip': trip})
 
+@login_required
+@require_POST
+def trip_batch(request):
+    """Dispatch, complete or cancel many trips from one JSON body.
+
+    {"action": "dispatch" | "cancel", "trips": [1, 2, ...]} or
+    {"action": "complete", "trips": [{"id": 1, "distance": "120.5"}, ...]}
+    """
+    try:
+        payload = json.loads(request.body)
+        action = payload['action']
+        items = payload['trips']
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({'error': 'Expected a JSON object with action and trips'}, status=400)
+    
+    if not isinstance(items, list) or not items:
+        return JsonResponse({'error': 'trips must be a non-empty list'}, status=400)
+    if len(items) > services.MAX_BATCH_SIZE:
+        return JsonResponse({'error': f'At most {services.MAX_BATCH_SIZE} trips per batch'}, status=400)
+    
+    try:
+        if action == 'complete':
+            results = services.bulk_complete({int(item['id']): item.get('distance') for item in items})
+        elif action == 'dispatch':
+            results = services.bulk_dispatch([int(item) for item in items])
+        elif action == 'cancel':
+            results = services.bulk_cancel([int(item) for item in items])
+        else:
+            return JsonResponse({'error': 'Invalid action'}, status=400)
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return JsonResponse({'error': 'Invalid trip id'}, status=400)
+    
+    succeeded = sum(1 for result in results if result['ok'])
+    return JsonResponse({
+        'action': action,
+        'succeeded': succeeded,
+        'failed': len(results) - succeeded,
+        'results': results,
+    })
+
+@login_required
+def trip_assign(request):
+    """Preview (GET) or dispatch (POST) an automatic vehicle and driver for every draft trip"""
+    if request.method == 'POST':
+        plan = assignment.build_plan()
+        if request.POST.get('fingerprint') != assignment.plan_fingerprint(plan):
+            messages.error(request, 'Trips, vehicles or drivers changed since the preview. Review the new plan before dispatching.')
+            return redirect('trip_assign')
+        results = assignment.commit_plan(plan)
+        dispatched = sum(1 for result in results if result['ok'])
+        if dispatched:
+            messages.success(request, f'{dispatched} trips assigned and dispatched.')
+        if len(results) > dispatched:
+            messages.error(request, f'{len(results) - dispatched} trips changed meanwhile and were not dispatched.')
+        if not results:
+            messages.error(request, 'No draft trip could be matched to an available vehicle and driver.')
+        return redirect('trip_list')
+    
+    plan = assignment.build_plan()
+    plan['fingerprint'] = assignment.plan_fingerprint(plan)
+    if request.GET.get('format') == 'json':
+        return JsonResponse(plan)
+    
+    preview = plan['assignments'][:assignment.PREVIEW_ROWS]
+    trips = Trip.objects.in_bulk([a['trip'] for a in preview])
+    vehicles = Vehicle.objects.in_bulk([a['vehicle'] for a in preview])
+    drivers = Driver.objects.in_bulk([a['driver'] for a in preview])
+    rows = [
+        dict(a, trip=trips[a['trip']], vehicle=vehicles[a['vehicle']], driver=drivers[a['driver']])
+        for a in preview
+    ]
+    context = {
+        'rows': rows,
+        'assigned_count': len(plan['assignments']),
+        'unassigned_count': len(plan['unassigned']),
+        'fingerprint': plan['fingerprint'],
+    }
+    return render(request, 'trips/trip_assign.html', context)
+
 @login_required
 def trip_detail(request, pk):
     trip = get_object_or_404(Trip, pk=pk)
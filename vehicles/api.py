@@ -0,0 +1,11 @@
+from analytics.watermarks import VEHICLE_POSITIONS
+from fleetflow.api import FleetViewSet
+from .models import Vehicle
+from .serializers import VehicleSerializer
+
+
+class VehicleViewSet(FleetViewSet):
+    queryset = Vehicle.objects.all()
+    serializer_class = VehicleSerializer
+    filterset_fields = ['status', 'vehicle_type', 'region']
+    watermark_tables = (Vehicle, VEHICLE_POSITIONS)
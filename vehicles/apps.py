@@ -3,3 +3,11 @@ from django.apps import AppConfig
 class VehiclesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'vehicles'
+    
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from fleetflow.choices import connect_invalidation
+        from fleetflow.db import configure_sqlite
+        connect_invalidation(self.get_model('Vehicle'))
+        # Telemetry ingestion writes constantly; WAL keeps SQLite readers unblocked
+        connection_created.connect(configure_sqlite, dispatch_uid='fleetflow_configure_sqlite')
@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from vehicles import tracks
+
+
+class Command(BaseCommand):
+    help = 'Pack older GPS pings into compressed per-vehicle-day track chunks and delete the raw rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-hours', type=float, default=1,
+                            help='Leave pings newer than this many hours as raw rows')
+        parser.add_argument('--vehicle-batch', type=int, default=500,
+                            help='Vehicles packed per transaction, bounds memory and lock time')
+
+    def handle(self, *args, **options):
+        if options['keep_hours'] < 0 or options['vehicle_batch'] < 1:
+            raise CommandError('--keep-hours must not be negative and --vehicle-batch must be positive')
+
+        before = timezone.now() - timedelta(hours=options['keep_hours'])
+        compacted, written = tracks.compact(before, vehicle_batch=options['vehicle_batch'])
+        self.stdout.write(self.style.SUCCESS(f'Compacted {compacted} pings into {written} track chunks'))
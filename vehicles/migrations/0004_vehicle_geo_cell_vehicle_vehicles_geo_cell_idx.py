@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:57
+
+from django.db import migrations, models
+
+from fleetflow.geo import cell_for
+
+
+def backfill_geo_cells(apps, schema_editor):
+    Vehicle = apps.get_model('vehicles', 'Vehicle')
+    batch = []
+    located = Vehicle.objects.filter(latitude__isnull=False, longitude__isnull=False).only('latitude', 'longitude')
+    for vehicle in located.iterator(chunk_size=2000):
+        vehicle.geo_cell = cell_for(vehicle.latitude, vehicle.longitude)
+        batch.append(vehicle)
+        if len(batch) >= 2000:
+            Vehicle.objects.bulk_update(batch, ['geo_cell'])
+            batch = []
+    if batch:
+        Vehicle.objects.bulk_update(batch, ['geo_cell'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0003_vehicle_vehicles_status_created_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicle',
+            name='geo_cell',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['geo_cell'], name='vehicles_geo_cell_idx'),
+        ),
+        migrations.RunPython(backfill_geo_cells, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0004_vehicle_geo_cell_vehicle_vehicles_geo_cell_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VehiclePing',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recorded_at', models.DateTimeField()),
+                ('latitude', models.DecimalField(decimal_places=6, max_digits=9)),
+                ('longitude', models.DecimalField(decimal_places=6, max_digits=9)),
+                ('speed', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pings', to='vehicles.vehicle')),
+            ],
+            options={
+                'db_table': 'vehicle_pings',
+                'ordering': ['-recorded_at'],
+                'indexes': [models.Index(fields=['vehicle', 'recorded_at'], name='pings_vehicle_recorded_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0005_vehicleping'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VehicleTrackChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('point_count', models.PositiveIntegerField(default=0)),
+                ('start_time', models.DateTimeField()),
+                ('end_time', models.DateTimeField()),
+                ('data', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='track_chunks', to='vehicles.vehicle')),
+            ],
+            options={
+                'db_table': 'vehicle_track_chunks',
+                'ordering': ['-date'],
+                'unique_together': {('vehicle', 'date')},
+            },
+        ),
+    ]
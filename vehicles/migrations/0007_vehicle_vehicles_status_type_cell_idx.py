@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0006_vehicletrackchunk'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['status', 'vehicle_type', 'geo_cell'], name='vehicles_status_type_cell_idx'),
+        ),
+    ]
@@ -1,5 +1,42 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator
+from fleetflow import geo
+
+
+def _sum_subquery(queryset, field):
+    """Correlated per-vehicle SUM, so several totals never multiply rows like joins would"""
+    totals = queryset.filter(vehicle=OuterRef('pk')).order_by().values('vehicle').annotate(total=Sum(field))
+    return Coalesce(
+        Subquery(totals.values('total')),
+        Value(0),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+
+
+class VehicleQuerySet(models.QuerySet):
+    def with_financials(self):
+        """Annotate revenue and cost totals for every vehicle in one query.
+
+        roi() on the resulting instances reuses these totals instead of
+        running its own aggregates.
+        """
+        from trips.models import Trip
+        from maintenance.models import MaintenanceLog, FuelLog, Expense
+
+        return self.annotate(
+            revenue_total=_sum_subquery(Trip.objects.filter(status='COMPLETED'), 'revenue'),
+            maintenance_total=_sum_subquery(MaintenanceLog.objects.all(), 'cost'),
+            fuel_total=_sum_subquery(FuelLog.objects.all(), 'fuel_cost'),
+            expense_total=_sum_subquery(Expense.objects.all(), 'amount'),
+        ).annotate(
+            costs_total=ExpressionWrapper(
+                F('maintenance_total') + F('fuel_total'),
+                output_field=DecimalField(max_digits=14, decimal_places=2),
+            ),
+        )
+
 
 class Vehicle(models.Model):
     STATUS_CHOICES = [
@@ -27,12 +64,25 @@ class Vehicle(models.Model):
     latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     last_location_update = models.DateTimeField(null=True, blank=True)
+    geo_cell = models.IntegerField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = VehicleQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.name} ({self.license_plate})"
     
+    def save(self, *args, **kwargs):
+        # Keep the grid cell in step with the position it indexes
+        self.geo_cell = geo.cell_for(self.latitude, self.longitude)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geo_cell'}
+        # One transaction with the status counters that analytics.signals moves on save
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            super().save(*args, **kwargs)
+    
     def is_available_for_dispatch(self):
         return self.status == 'AVAILABLE'
     
@@ -46,8 +96,13 @@ class Vehicle(models.Model):
         return self.trips.filter(status='COMPLETED').aggregate(models.Sum('revenue'))['revenue__sum'] or 0
     
     def roi(self):
-        revenue = self.total_revenue()
-        costs = self.total_maintenance_cost() + self.total_fuel_cost()
+        # Reuse totals annotated by Vehicle.objects.with_financials() when present
+        if hasattr(self, 'revenue_total'):
+            revenue = self.revenue_total
+            costs = self.costs_total
+        else:
+            revenue = self.total_revenue()
+            costs = self.total_maintenance_cost() + self.total_fuel_cost()
         if self.acquisition_cost > 0:
             return ((revenue - costs) / self.acquisition_cost) * 100
         return 0
@@ -55,3 +110,48 @@ class Vehicle(models.Model):
     class Meta:
         db_table = 'vehicles'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='vehicles_status_created_idx'),
+            models.Index(fields=['created_at', 'id'], name='vehicles_created_idx'),
+            models.Index(fields=['geo_cell'], name='vehicles_geo_cell_idx'),
+            models.Index(fields=['status', 'vehicle_type', 'geo_cell'], name='vehicles_status_type_cell_idx'),
+        ]
+
+
+class VehiclePing(models.Model):
+    """One GPS fix reported by a vehicle's tracker"""
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='pings')
+    recorded_at = models.DateTimeField()
+    latitude = models.DecimalField(max_digits=9, decimal_places=6)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6)
+    speed = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.vehicle_id} @ {self.recorded_at}"
+    
+    class Meta:
+        db_table = 'vehicle_pings'
+        ordering = ['-recorded_at']
+        indexes = [
+            models.Index(fields=['vehicle', 'recorded_at'], name='pings_vehicle_recorded_idx'),
+        ]
+
+
+class VehicleTrackChunk(models.Model):
+    """One vehicle-day of GPS history packed into a single row (see vehicles.tracks)"""
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='track_chunks')
+    date = models.DateField()
+    point_count = models.PositiveIntegerField(default=0)
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+    data = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.vehicle_id} track {self.date}"
+    
+    class Meta:
+        db_table = 'vehicle_track_chunks'
+        ordering = ['-date']
+        unique_together = ['vehicle', 'date']
@@ -0,0 +1,10 @@
+from fleetflow.api import SparseFieldsetSerializer
+from .models import Vehicle
+
+
+class VehicleSerializer(SparseFieldsetSerializer):
+    class Meta:
+        model = Vehicle
+        fields = ['id', 'name', 'license_plate', 'vehicle_type', 'max_capacity', 'acquisition_cost', 'odometer',
+                  'status', 'region', 'latitude', 'longitude', 'last_location_update', 'created_at', 'updated_at']
+        read_only_fields = ['last_location_update', 'created_at', 'updated_at']
@@ -0,0 +1,87 @@
+import math
+
+from django.db import connection
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+
+from fleetflow import geo
+from analytics import status_counts
+from .models import Vehicle
+
+NEARBY_FIELDS = ['pk', 'name', 'license_plate', 'vehicle_type', 'status', 'latitude', 'longitude', 'last_location_update']
+# Past this many OR'ed terms (SQLite caps expression depth at 1000) one covering range per filter pair is cheaper
+MAX_CELL_RANGES = 200
+
+
+def _pairs(status=None, vehicle_type=None):
+    """(status, type) pairs a filtered search seeks in the vehicles_status_type_cell index, None unfiltered"""
+    if status is None and vehicle_type is None:
+        return None
+    statuses = [status] if status is not None else [value for value, _ in Vehicle.STATUS_CHOICES]
+    types = [vehicle_type] if vehicle_type is not None else [value for value, _ in Vehicle.TYPE_CHOICES]
+    return [(s, t) for s in statuses for t in types]
+
+
+def _column(name):
+    return connection.ops.quote_name(Vehicle._meta.get_field(name).column)
+
+
+def _cells(ranges, pairs=None):
+    """One prepared OR of cell range terms; hundreds of Q lookups take longer to compile than to run"""
+    term = f'{_column("geo_cell")} BETWEEN %s AND %s'
+    if pairs is None:
+        params = [bound for cell_range in ranges for bound in cell_range]
+    else:
+        term = f'{_column("status")} = %s AND {_column("vehicle_type")} = %s AND {term}'
+        params = [value for cell_range in ranges for pair in pairs for value in (*pair, *cell_range)]
+    terms = len(ranges) * len(pairs or [None])
+    return RawSQL(' OR '.join([f'({term})'] * terms), params, output_field=BooleanField())
+
+
+def within(lat, lon, radius_km, status=None, vehicle_type=None):
+    """Vehicles within radius_km of a point as dicts, nearest first, with distance_km.
+
+    Unfiltered queries run off the geo_cell index. Filtered ones spell out
+    every (status, type, cell range) term, so each is one seek in the
+    composite index whether or not SQLite has statistics, and only matching
+    rows are read.
+    """
+    pairs = _pairs(status, vehicle_type)
+    ranges = geo.cell_ranges(lat, lon, radius_km)
+    if len(ranges) * len(pairs or [None]) > MAX_CELL_RANGES:
+        ranges = [(ranges[0][0], ranges[-1][1])]
+    candidates = list(Vehicle.objects.filter(_cells(ranges, pairs)).order_by().values(*NEARBY_FIELDS))
+    if not candidates:
+        return []
+
+    distances = geo.haversine_km(
+        [lat], [lon], [row['latitude'] for row in candidates], [row['longitude'] for row in candidates]
+    )[0]
+    nearby = []
+    for row, distance in zip(candidates, distances.tolist()):
+        if distance <= radius_km:
+            row['distance_km'] = distance
+            nearby.append(row)
+    nearby.sort(key=lambda row: (row['distance_km'], row['pk']))
+    return nearby
+
+
+def nearest(lat, lon, k=10, status=None, vehicle_type=None, max_radius_km=geo.MAX_SEARCH_KM):
+    """The k vehicles closest to a point, searching outwards in doubling radii"""
+    radius = geo.INITIAL_SEARCH_KM
+    if status is not None or vehicle_type is not None:
+        fleet = status_counts.counts('vehicle', by=('status', 'vehicle_type'))
+        matching = sum(n for (s, t), n in fleet.items()
+                       if status in (None, s) and vehicle_type in (None, t))
+        if not matching:
+            # Nothing matches anywhere, so widening the search would only scan the grid
+            return []
+        # Start as much wider as the matches are sparser, so rare filters need few rounds
+        radius *= math.sqrt(sum(fleet.values()) / matching)
+    while True:
+        radius = min(radius, max_radius_km)
+        found = within(lat, lon, radius, status, vehicle_type)
+        # Everything inside the radius was seen, so the first k are exact
+        if len(found) >= k or radius >= max_radius_km:
+            return found[:k]
+        radius *= 2
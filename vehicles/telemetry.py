@@ -0,0 +1,169 @@
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from fleetflow.geo import cell_for
+from analytics import watermarks
+from .models import Vehicle, VehiclePing
+
+FIELDS = ['vehicle', 'ts', 'lat', 'lon', 'speed']
+MAX_BATCH_PINGS = 50000
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+
+
+class TelemetryError(ValueError):
+    """The request body is not a telemetry batch at all"""
+
+
+def _timestamp(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.fromtimestamp(value, tz=dt_timezone.utc)
+    parsed = parse_datetime(value) if isinstance(value, str) else None
+    if parsed is None:
+        raise ValueError('Invalid timestamp')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+
+def _ping(values):
+    """(vehicle_id, recorded_at, lat, lon, speed) from raw values, or ValueError"""
+    vehicle, ts, lat, lon = values[:4]
+    speed = values[4] if len(values) > 4 else None
+    if isinstance(vehicle, bool) or not isinstance(vehicle, int):
+        raise ValueError('Invalid vehicle')
+    lat, lon = float(lat), float(lon)
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError('Position out of range')
+    if speed is not None:
+        speed = float(speed)
+        if not 0 <= speed < 10000:
+            raise ValueError('Invalid speed')
+    return vehicle, _timestamp(ts), lat, lon, speed
+
+
+def parse_ndjson(lines):
+    """One JSON object per line: {"vehicle": 12, "ts": 1760800000, "lat": 19.07, "lon": 72.87, "speed": 42}.
+
+    Returns (pings, rejected count).
+    """
+    pings, rejected = [], 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if len(pings) + rejected >= MAX_BATCH_PINGS:
+            raise TelemetryError(f'At most {MAX_BATCH_PINGS} pings per batch')
+        try:
+            record = json.loads(line)
+            pings.append(_ping([record.get(field) for field in FIELDS]))
+        except (ValueError, TypeError, AttributeError, OverflowError):
+            rejected += 1
+    return pings, rejected
+
+
+def parse_compact(payload):
+    """Column names once, then one array per ping:
+    {"fields": ["vehicle", "ts", "lat", "lon"], "rows": [[12, 1760800000, 19.07, 72.87], ...]}
+
+    Returns (pings, rejected count).
+    """
+    try:
+        fields, rows = payload['fields'], payload['rows']
+        positions = [fields.index(field) for field in FIELDS[:4]]
+    except (KeyError, TypeError, ValueError, AttributeError):
+        raise TelemetryError('Expected fields including vehicle, ts, lat and lon, and rows')
+    if 'speed' in fields:
+        positions.append(fields.index('speed'))
+    if not isinstance(rows, list):
+        raise TelemetryError('rows must be a list')
+    if len(rows) > MAX_BATCH_PINGS:
+        raise TelemetryError(f'At most {MAX_BATCH_PINGS} pings per batch')
+
+    pings, rejected = [], 0
+    for row in rows:
+        try:
+            pings.append(_ping([row[i] for i in positions]))
+        except (ValueError, TypeError, IndexError, KeyError, OverflowError):
+            rejected += 1
+    return pings, rejected
+
+
+def _apply_latest(latest):
+    """Move each vehicle to its newest fix with one prepared UPDATE run over the batch.
+
+    The WHERE clause re-checks the stored timestamp, so a concurrent batch
+    that already wrote a newer fix is never overwritten.
+    """
+    ops = connection.ops
+    table = ops.quote_name(Vehicle._meta.db_table)
+    columns = {name: ops.quote_name(Vehicle._meta.get_field(name).column)
+               for name in ('id', 'latitude', 'longitude', 'geo_cell', 'last_location_update')}
+    sql = (
+        f"UPDATE {table} SET {columns['latitude']} = %s, {columns['longitude']} = %s, "
+        f"{columns['geo_cell']} = %s, {columns['last_location_update']} = %s "
+        f"WHERE {columns['id']} = %s AND ({columns['last_location_update']} IS NULL "
+        f"OR {columns['last_location_update']} < %s)"
+    )
+    params = []
+    for vehicle_id, (recorded_at, lat, lon) in latest.items():
+        ts = ops.adapt_datetimefield_value(recorded_at)
+        params.append((
+            ops.adapt_decimalfield_value(lat, 9, 6),
+            ops.adapt_decimalfield_value(lon, 9, 6),
+            cell_for(lat, lon),
+            ts,
+            vehicle_id,
+            ts,
+        ))
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def ingest(pings, rejected=0):
+    """Store a batch of pings and move every reporting vehicle to its newest fix.
+
+    Pings for unknown vehicles or too far in the future are rejected; pings
+    no newer than the vehicle's current fix (or repeated in the batch) are
+    dropped as stale.
+    """
+    now = timezone.now()
+    known = dict(
+        Vehicle.objects.filter(pk__in={p[0] for p in pings}).values_list('pk', 'last_location_update')
+    )
+
+    rows = []
+    seen = set()
+    latest = {}
+    stale = 0
+    for vehicle_id, recorded_at, lat, lon, speed in pings:
+        if vehicle_id not in known or recorded_at > now + MAX_CLOCK_SKEW:
+            rejected += 1
+            continue
+        current = known[vehicle_id]
+        if (current is not None and recorded_at <= current) or (vehicle_id, recorded_at) in seen:
+            stale += 1
+            continue
+        seen.add((vehicle_id, recorded_at))
+        lat, lon = Decimal(f'{lat:.6f}'), Decimal(f'{lon:.6f}')
+        rows.append(VehiclePing(
+            vehicle_id=vehicle_id,
+            recorded_at=recorded_at,
+            latitude=lat,
+            longitude=lon,
+            speed=None if speed is None else Decimal(f'{speed:.2f}'),
+        ))
+        if vehicle_id not in latest or recorded_at > latest[vehicle_id][0]:
+            latest[vehicle_id] = (recorded_at, lat, lon)
+
+    with transaction.atomic():
+        VehiclePing.objects.bulk_create(rows, batch_size=2000)
+        _apply_latest(latest)
+        if latest:
+            watermarks.bump(watermarks.VEHICLE_POSITIONS)
+
+    return {'accepted': len(rows), 'stale': stale, 'rejected': rejected, 'vehicles': len(latest)}
@@ -0,0 +1,235 @@
+import struct
+import zlib
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.db import transaction
+
+from .models import VehiclePing, VehicleTrackChunk
+
+FORMAT_VERSION = 1
+COMPRESSION_LEVEL = 6
+MS_PER_DAY = 86400000
+# Fixed-point units: milliseconds, micro-degrees (the 6 decimals the models keep) and centi-km/h
+DEGREE_SCALE = 1000000
+SPEED_SCALE = 100
+NO_SPEED = -1
+# Replay window limits for the track endpoint and the detail page
+DEFAULT_SPAN = timedelta(days=1)
+MAX_SPAN = timedelta(days=31)
+MAX_POINTS = 20000
+# Packed ping ids per DELETE, under the bound-parameter limits of SQLite and PostgreSQL
+DELETE_CHUNK_SIZE = 5000
+
+_HEADER = struct.Struct('<BI')
+# Stored columns in order with their delta dtype; positions and speed deltas always fit 32 bits
+_COLUMNS = (('time', '<i8'), ('lat', '<i4'), ('lon', '<i4'), ('speed', '<i4'))
+
+Track = namedtuple('Track', ['time', 'lat', 'lon', 'speed'])
+Track.__doc__ = 'Parallel int arrays: epoch ms, micro-degrees, micro-degrees, centi-km/h (NO_SPEED when unknown)'
+
+
+def empty_track():
+    return Track(*(np.empty(0, dtype=np.int64) for _ in _COLUMNS))
+
+
+def encode(track):
+    """Delta-encode each column and zlib-compress them into one blob"""
+    parts = [_HEADER.pack(FORMAT_VERSION, len(track.time))]
+    for (_, dtype), values in zip(_COLUMNS, track):
+        parts.append(np.diff(values, prepend=0).astype(dtype).tobytes())
+    return zlib.compress(b''.join(parts), COMPRESSION_LEVEL)
+
+
+def decode(blob):
+    raw = zlib.decompress(bytes(blob))
+    version, count = _HEADER.unpack_from(raw)
+    if version != FORMAT_VERSION:
+        raise ValueError(f'Unknown track chunk format {version}')
+    columns = []
+    offset = _HEADER.size
+    for _, dtype in _COLUMNS:
+        deltas = np.frombuffer(raw, dtype=dtype, count=count, offset=offset)
+        offset += deltas.nbytes
+        columns.append(np.cumsum(deltas, dtype=np.int64))
+    return Track(*columns)
+
+
+def merge(*tracks):
+    """One time-ordered track; for repeated timestamps the later track wins"""
+    tracks = [t for t in tracks if len(t.time)]
+    if not tracks:
+        return empty_track()
+    if len(tracks) == 1:
+        combined = tracks[0]
+    else:
+        combined = Track(*(np.concatenate(columns) for columns in zip(*tracks)))
+    # Stable sort of the reversed arrays puts the latest copy of each timestamp first
+    reverse = slice(None, None, -1)
+    order = np.argsort(combined.time[reverse], kind='stable')
+    times = combined.time[reverse][order]
+    keep = np.ones(len(times), dtype=bool)
+    keep[1:] = times[1:] != times[:-1]
+    return Track(*(column[reverse][order][keep] for column in combined))
+
+
+def clip(track, start_ms, end_ms):
+    lo = np.searchsorted(track.time, start_ms, side='left')
+    hi = np.searchsorted(track.time, end_ms, side='right')
+    return Track(*(column[lo:hi] for column in track))
+
+
+def epoch_ms(moment):
+    return int(round(moment.timestamp() * 1000))
+
+
+def from_ms(value):
+    return datetime.fromtimestamp(value / 1000, tz=dt_timezone.utc)
+
+
+def from_pings(rows):
+    """Track from (recorded_at, latitude, longitude, speed) tuples"""
+    if not rows:
+        return empty_track()
+    return Track(
+        np.array([epoch_ms(r[0]) for r in rows], dtype=np.int64),
+        np.rint(np.array([float(r[1]) for r in rows]) * DEGREE_SCALE).astype(np.int64),
+        np.rint(np.array([float(r[2]) for r in rows]) * DEGREE_SCALE).astype(np.int64),
+        np.array([NO_SPEED if r[3] is None else round(float(r[3]) * SPEED_SCALE) for r in rows], dtype=np.int64),
+    )
+
+
+def _split_days(track):
+    """{day number since epoch: sub-track} for a time-ordered track"""
+    days = track.time // MS_PER_DAY
+    boundaries = np.flatnonzero(np.diff(days)) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [len(days)]))
+    return {int(days[s]): Track(*(column[s:e] for column in track)) for s, e in zip(starts, ends)}
+
+
+def append(tracks):
+    """Merge {vehicle_id: Track} into the vehicle-day chunks.
+
+    All affected chunks are read in one query and written back with one
+    bulk_create and one bulk_update. Returns the number of chunks written.
+    """
+    pending = {}
+    for vehicle_id, track in tracks.items():
+        track = merge(track)
+        if len(track.time):
+            for day, part in _split_days(track).items():
+                pending[(vehicle_id, day)] = part
+    if not pending:
+        return 0
+
+    epoch = datetime(1970, 1, 1).date()
+    dates = {day: epoch + timedelta(days=day) for _, day in pending}
+    with transaction.atomic():
+        existing = {
+            (chunk.vehicle_id, (chunk.date - epoch).days): chunk
+            for chunk in VehicleTrackChunk.objects.select_for_update().filter(
+                vehicle_id__in={vehicle_id for vehicle_id, _ in pending}, date__in=set(dates.values())
+            )
+        }
+        created, updated = [], []
+        for (vehicle_id, day), part in pending.items():
+            chunk = existing.get((vehicle_id, day))
+            if chunk is None:
+                chunk = VehicleTrackChunk(vehicle_id=vehicle_id, date=dates[day])
+                created.append(chunk)
+            else:
+                part = merge(decode(chunk.data), part)
+                updated.append(chunk)
+            chunk.data = encode(part)
+            chunk.point_count = len(part.time)
+            chunk.start_time = from_ms(part.time[0])
+            chunk.end_time = from_ms(part.time[-1])
+        VehicleTrackChunk.objects.bulk_create(created, batch_size=500)
+        VehicleTrackChunk.objects.bulk_update(
+            updated, ['data', 'point_count', 'start_time', 'end_time', 'updated_at'], batch_size=500
+        )
+    return len(created) + len(updated)
+
+
+def replay(vehicle_id, start, end):
+    """Every fix of a vehicle between two datetimes, from chunks plus not-yet-compacted pings"""
+    chunks = VehicleTrackChunk.objects.filter(
+        vehicle_id=vehicle_id, date__gte=start.astimezone(dt_timezone.utc).date(),
+        date__lte=end.astimezone(dt_timezone.utc).date(),
+    ).order_by('date').values_list('data', flat=True)
+    pings = VehiclePing.objects.filter(
+        vehicle_id=vehicle_id, recorded_at__gte=start, recorded_at__lte=end
+    ).order_by('recorded_at').values_list('recorded_at', 'latitude', 'longitude', 'speed')
+    track = merge(*(decode(blob) for blob in chunks), from_pings(list(pings)))
+    return clip(track, epoch_ms(start), epoch_ms(end))
+
+
+def downsample(track, max_points=500, tolerance=0.0001):
+    """Fewer points for drawing a track: Ramer-Douglas-Peucker at tolerance
+    degrees (about 11 m), then an even stride if that is still too many"""
+    count = len(track.time)
+    if count <= 2:
+        return track
+    x = track.lon / DEGREE_SCALE
+    y = track.lat / DEGREE_SCALE
+    keep = np.zeros(count, dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        dx, dy = x[last] - x[first], y[last] - y[first]
+        px, py = x[first + 1:last] - x[first], y[first + 1:last] - y[first]
+        length = np.hypot(dx, dy)
+        if length:
+            distance = np.abs(dx * py - dy * px) / length
+        else:
+            distance = np.hypot(px, py)
+        farthest = int(distance.argmax())
+        if distance[farthest] > tolerance:
+            index = first + 1 + farthest
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+
+    indices = np.flatnonzero(keep)
+    if len(indices) > max_points:
+        picks = np.unique(np.linspace(0, len(indices) - 1, max_points).round().astype(int))
+        indices = indices[picks]
+    return Track(*(column[indices] for column in track))
+
+
+def to_points(track):
+    """[[epoch ms, lat, lon], ...] for JSON"""
+    return np.column_stack((
+        track.time, track.lat / DEGREE_SCALE, track.lon / DEGREE_SCALE
+    )).tolist()
+
+
+def compact(before, vehicle_batch=500):
+    """Pack every ping recorded before a cutoff into track chunks and delete the rows.
+
+    Returns (pings compacted, chunks written).
+    """
+    vehicle_ids = list(
+        VehiclePing.objects.filter(recorded_at__lt=before).order_by().values_list('vehicle_id', flat=True).distinct()
+    )
+    compacted = written = 0
+    for start in range(0, len(vehicle_ids), vehicle_batch):
+        batch = vehicle_ids[start:start + vehicle_batch]
+        with transaction.atomic():
+            pings = VehiclePing.objects.filter(vehicle_id__in=batch, recorded_at__lt=before)
+            rows, packed = {}, []
+            for ping_id, vehicle_id, *fix in pings.order_by('vehicle_id', 'recorded_at').values_list(
+                'id', 'vehicle_id', 'recorded_at', 'latitude', 'longitude', 'speed'
+            ).iterator(chunk_size=5000):
+                rows.setdefault(vehicle_id, []).append(fix)
+                packed.append(ping_id)
+            written += append({vehicle_id: from_pings(fixes) for vehicle_id, fixes in rows.items()})
+            # Only the rows just packed: a late upload committed since the read must survive to the next run
+            for chunk in range(0, len(packed), DELETE_CHUNK_SIZE):
+                compacted += VehiclePing.objects.filter(pk__in=packed[chunk:chunk + DELETE_CHUNK_SIZE]).delete()[0]
+    return compacted, written
@@ -3,8 +3,12 @@ from . import views
 
 urlpatterns = [
     path('', views.vehicle_list, name='vehicle_list'),
+    path('lookup/', views.vehicle_lookup, name='vehicle_lookup'),
+    path('nearby/', views.vehicle_nearby, name='vehicle_nearby'),
+    path('telemetry/ingest/', views.telemetry_ingest, name='telemetry_ingest'),
     path('create/', views.vehicle_create, name='vehicle_create'),
     path('<int:pk>/', views.vehicle_detail, name='vehicle_detail'),
+    path('<int:pk>/track/', views.vehicle_track, name='vehicle_track'),
     path('<int:pk>/update/', views.vehicle_update, name='vehicle_update'),
     path('<int:pk>/delete/', views.vehicle_delete, name='vehicle_delete'),
 ]
@@ -1,11 +1,25 @@
+import hmac
+import json
+
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from .models import Vehicle
+from . import spatial, telemetry, tracks
 from .forms import VehicleForm
+from fleetflow.choices import search_choices
+from fleetflow.pagination import paginate_keyset
+from analytics.watermarks import conditional
 
 @login_required
+@conditional(Vehicle)
 def vehicle_list(request):
     vehicles = Vehicle.objects.all()
     
@@ -26,8 +40,11 @@ def vehicle_list(request):
             Q(name__icontains=search) | Q(license_plate__icontains=search)
         )
     
+    page = paginate_keyset(request, vehicles, ['-created_at', '-id'])
+    
     context = {
-        'vehicles': vehicles,
+        'vehicles': page.object_list,
+        'page': page,
         'status_choices': Vehicle.STATUS_CHOICES,
         'type_choices': Vehicle.TYPE_CHOICES,
     }
@@ -81,6 +98,112 @@ def vehicle_detail(request, pk):
         'maintenance_logs': vehicle.maintenance_logs.all()[:10],
         'fuel_logs': vehicle.fuel_logs.all()[:10],
         'trips': vehicle.trips.all()[:10],
+        'track': [],
     }
+    if vehicle.last_location_update:
+        end = vehicle.last_location_update
+        track = tracks.replay(vehicle.pk, end - tracks.DEFAULT_SPAN, end)
+        context['track'] = [[lat, lon] for _, lat, lon in tracks.to_points(tracks.downsample(track))]
     
     return render(request, 'vehicles/vehicle_detail.html', context)
+
+@login_required
+def vehicle_track(request, pk):
+    """Location history between ?start= and ?end= (ISO datetimes, default the last day),
+    simplified to at most ?max_points= points"""
+    vehicle = get_object_or_404(Vehicle, pk=pk)
+    try:
+        end = parse_datetime(request.GET['end']) if request.GET.get('end') else timezone.now()
+        start = parse_datetime(request.GET['start']) if request.GET.get('start') else end - tracks.DEFAULT_SPAN
+        max_points = min(int(request.GET.get('max_points', 1000)), tracks.MAX_POINTS)
+    except (TypeError, ValueError):
+        return JsonResponse({'error': 'start and end must be ISO datetimes, max_points a number'}, status=400)
+    if start is None or end is None:
+        return JsonResponse({'error': 'start and end must be ISO datetimes'}, status=400)
+    if timezone.is_naive(start):
+        start = timezone.make_aware(start)
+    if timezone.is_naive(end):
+        end = timezone.make_aware(end)
+    if start > end or end - start > tracks.MAX_SPAN or max_points < 2:
+        return JsonResponse({'error': f'Need start <= end, at most {tracks.MAX_SPAN.days} days apart, '
+                                      'and max_points of at least 2'}, status=400)
+    
+    track = tracks.replay(vehicle.pk, start, end)
+    simplified = tracks.downsample(track, max_points)
+    return JsonResponse({
+        'vehicle': vehicle.pk,
+        'start': start,
+        'end': end,
+        'total_points': len(track.time),
+        'points': tracks.to_points(simplified),
+    })
+
+@login_required
+def vehicle_lookup(request):
+    """Typeahead endpoint returning matching vehicles as id/label pairs"""
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 20)), 50))
+    except ValueError:
+        limit = 20
+    
+    matches = search_choices(Vehicle, request.GET.get('q', '').strip(), request.GET.get('status'), limit)
+    return JsonResponse([{'id': pk, 'label': label} for pk, label in matches], safe=False)
+
+@login_required
+def vehicle_nearby(request):
+    """Nearest vehicles to ?lat=&lon=, optionally within ?radius_km= and filtered by ?status= / ?type="""
+    try:
+        lat = float(request.GET['lat'])
+        lon = float(request.GET['lon'])
+        k = min(int(request.GET.get('k', 10)), 100)
+        radius_km = float(request.GET['radius_km']) if request.GET.get('radius_km') else None
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'lat and lon are required numbers'}, status=400)
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180) or k < 1 or (radius_km is not None and radius_km <= 0):
+        return JsonResponse({'error': 'Invalid position, k or radius'}, status=400)
+    
+    status = request.GET.get('status') or None
+    vehicle_type = request.GET.get('type') or None
+    if (status is not None and status not in dict(Vehicle.STATUS_CHOICES)) or (
+        vehicle_type is not None and vehicle_type not in dict(Vehicle.TYPE_CHOICES)
+    ):
+        return JsonResponse({'error': 'Unknown status or type'}, status=400)
+    if radius_km is not None:
+        found = spatial.within(lat, lon, radius_km, status, vehicle_type)[:k]
+    else:
+        found = spatial.nearest(lat, lon, k, status, vehicle_type)
+    
+    return JsonResponse([
+        {
+            'id': v['pk'],
+            'name': v['name'],
+            'license_plate': v['license_plate'],
+            'type': v['vehicle_type'],
+            'status': v['status'],
+            'latitude': float(v['latitude']),
+            'longitude': float(v['longitude']),
+            'distance_km': round(v['distance_km'], 3),
+            'last_location_update': v['last_location_update'],
+        }
+        for v in found
+    ], safe=False)
+
+@csrf_exempt
+@require_POST
+def telemetry_ingest(request):
+    """Batch of GPS pings from trackers, as NDJSON or a compact fields/rows JSON document"""
+    token = settings.TELEMETRY_TOKEN
+    if not token or not hmac.compare_digest(request.headers.get('X-Telemetry-Token', ''), token):
+        return JsonResponse({'error': 'Invalid telemetry token'}, status=403)
+    
+    try:
+        if request.content_type == 'application/x-ndjson':
+            # Parse line by line straight off the request stream
+            pings, rejected = telemetry.parse_ndjson(request)
+        else:
+            pings, rejected = telemetry.parse_compact(json.loads(request.body))
+    except (ValueError, UnicodeDecodeError) as e:
+        return JsonResponse({'error': str(e) if isinstance(e, telemetry.TelemetryError) else 'Invalid JSON'},
+                            status=400)
+    
+    return JsonResponse(telemetry.ingest(pings, rejected))